@@ -0,0 +1,138 @@
+"""
+Throughput of the fetch layer against the local replay server (benchmarks/replay_server.py),
+for a grid of worker counts and chunk sizes. Runs offline, the api key is a dummy.
+
+    python benchmarks/bench_fetch.py --days 90 --workers 1 4 8 --chunk-freq MS W --latency 0.2
+    python benchmarks/bench_fetch.py --latency 0.2 --throttle-rate 0.05 --error-rate 0.02 --requests-per-second 10
+
+Every configuration fetches the same jobs (flows of the planned borders plus prices and load per
+zone) with EntsoeFetcher.fetch_batch into a throwaway store, then the weather for the cities
+with each connection count. Throttled (429) and failed (503) entsoe requests are retried by the
+client (entsoe_fetcher.MAX_RETRIES, after Retry-After), so the seconds include the retries and
+the throttled/errors columns count every answer of that kind, retried or not.
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import logging
+import tempfile
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.replay_server import ReplayServer, ReplayConfig
+
+
+def entsoe_jobs(zones) -> list[tuple]:
+    from scripts.flow_planner import plan_flow_jobs
+
+    jobs = [('flows', sender, recipient) for sender, recipient in plan_flow_jobs(zones)]
+    return jobs + [(data_type, zone) for zone in zones for data_type in ('prices', 'load')]
+
+
+def run_entsoe(server: ReplayServer, jobs, start, end, workers: int, chunk_freq: str | None,
+               requests_per_second: float | None) -> dict:
+    from scripts.entsoe_fetcher import EntsoeFetcher, entsoe_client
+
+    output_dir = tempfile.mkdtemp(prefix="bench_fetch_")
+    server.reset_stats()
+    try:
+        fetcher = EntsoeFetcher("replay", start, end, output_dir, max_workers=workers,
+                                requests_per_second=requests_per_second, client=entsoe_client("replay"),
+                                chunk_freq=chunk_freq, incremental=False)
+        t0 = time.perf_counter()
+        report = fetcher.fetch_batch(jobs)
+        seconds = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(output_dir, ignore_errors=True)
+
+    stats = server.stats
+    return {
+        'fetch': 'entsoe', 'workers': workers, 'chunk_freq': chunk_freq or '-', 'seconds': seconds,
+        'jobs': len(jobs), 'failed': int((report['status'] == 'failed').sum()),
+        'requests': stats['requests'], 'throttled': stats['status_429'], 'errors': stats['status_503'],
+        'req_per_s': stats['requests'] / seconds, 'rows_per_s': report['rows'].sum() / seconds,
+        'mb': stats['bytes'] / 2**20,
+    }
+
+
+def run_weather(server: ReplayServer, start: str, end: str, connections: int,
+                requests_per_second: float | None) -> dict:
+    from scripts.weather_data_fetcher import fetch_weather, CITIES
+
+    cache_dir = tempfile.mkdtemp(prefix="bench_weather_")
+    server.reset_stats()
+    try:
+        t0 = time.perf_counter()
+        hourly, _ = asyncio.run(fetch_weather(CITIES, start, end, cache_path=os.path.join(cache_dir, "geocoding.json"),
+                                              max_connections=connections, requests_per_second=requests_per_second))
+        seconds = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    stats = server.stats
+    rows = 0 if hourly is None else len(hourly)
+    return {
+        'fetch': 'weather', 'workers': connections, 'chunk_freq': '-', 'seconds': seconds,
+        'jobs': sum(len(c) for c in CITIES.values()), 'failed': None,
+        'requests': stats['requests'], 'throttled': stats['status_429'], 'errors': stats['status_503'],
+        'req_per_s': stats['requests'] / seconds, 'rows_per_s': rows / seconds, 'mb': stats['bytes'] / 2**20,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", nargs="+", default=["DE_LU", "HU", "AT", "SK", "CZ", "PL"])
+    parser.add_argument("--start", default="2025-01-01")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--chunk-freq", nargs="+", default=["MS"], help="chunk boundaries, 'none' for one request")
+    parser.add_argument("--requests-per-second", type=float, help="client side limit")
+    parser.add_argument("--no-weather", action="store_true")
+    parser.add_argument("--csv", help="write the results here")
+    # server side
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float)
+    parser.add_argument("--resolution", default="PT15M", choices=["PT15M", "PT60M"])
+    parser.add_argument("--pad-kb", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ["API_CACHE_DIR"] = "off"  # every configuration goes to the server
+    logging.disable(logging.ERROR)  # a line per job and failure otherwise, failures are counted in the table
+    config = ReplayConfig(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                          throttle_rate=args.throttle_rate, max_rps=args.max_rps, resolution=args.resolution,
+                          pad_kb=args.pad_kb, seed=args.seed)
+
+    start = pd.Timestamp(args.start, tz="Europe/Brussels")
+    end = start + pd.Timedelta(days=args.days)
+    rows = []
+    with ReplayServer(config) as server:
+        os.environ.update(server.env())  # before entsoe is imported
+        jobs = entsoe_jobs(args.zones)
+        for chunk_freq in args.chunk_freq:
+            for workers in args.workers:
+                rows.append(run_entsoe(server, jobs, start, end, workers, None if chunk_freq == 'none' else chunk_freq,
+                                       args.requests_per_second))
+                print(f"entsoe workers={workers} chunks={chunk_freq}: {rows[-1]['seconds']:.2f}s", flush=True)
+        if not args.no_weather:
+            last_day = str((end - pd.Timedelta(days=1)).date())
+            for connections in args.workers:
+                rows.append(run_weather(server, str(start.date()), last_day, connections, args.requests_per_second))
+
+    result = pd.DataFrame(rows)
+    print(result.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    if args.csv:
+        result.to_csv(args.csv, index=False)
+
+
+if __name__ == "__main__":
+    main()
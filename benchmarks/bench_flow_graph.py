@@ -0,0 +1,82 @@
+"""
+Memory and build time of the flow graph: per-edge {Timestamp: value} dicts (old design)
+against the shared FlowTensor. Runs offline on synthetic 15-minute flows.
+
+    python benchmarks/bench_flow_graph.py --borders 24 --days 365
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+import numpy as np
+import pandas as pd
+import networkx as nx
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.graph_builder import base_flow_graph, flow_graph_from_series
+
+
+def synthetic_flow_series(n_borders, days, seed=0):
+    """
+    (sender, recipient, series) for both directions of the first n_borders graph edges.
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2024-01-01", periods=days * 96, freq="15min", tz="UTC")
+    pairs = sorted({tuple(sorted(edge)) for edge in base_flow_graph().edges})[:n_borders]
+    out = []
+    for a, b in pairs:
+        for sender, recipient in ((a, b), (b, a)):
+            out.append((sender, recipient, pd.Series(rng.gamma(2.0, 300.0, len(index)), index=index)))
+    return out
+
+
+def dict_flow_graph(flow_series):
+    """
+    The previous build_flow_graph merge loop, kept here as the baseline.
+    """
+    G = base_flow_graph()
+    for sender, recipient, series in flow_series:
+        flow_data = series.to_dict()
+        if G.has_edge(sender, recipient):
+            existing_flows = G.edges[sender, recipient].get('flows', {})
+            existing_flows.update(flow_data)
+            nx.set_edge_attributes(G, {(sender, recipient): {"flows": existing_flows}})
+        elif G.has_edge(recipient, sender):
+            negated_flow_data = {timestamp: -value for timestamp, value in flow_data.items()}
+            existing_flows = G.edges[recipient, sender].get('flows', {})
+            existing_flows.update(negated_flow_data)
+            nx.set_edge_attributes(G, {(recipient, sender): {"flows": existing_flows}})
+    return G
+
+
+def measure(build, flow_series):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    G = build(flow_series)
+    seconds = time.perf_counter() - t0
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return G, seconds, retained, peak
+
+
+def run(n_borders, days):
+    flow_series = synthetic_flow_series(n_borders, days)
+    rows = []
+    for name, build in (("dict", dict_flow_graph), ("tensor", flow_graph_from_series)):
+        _, seconds, retained, peak = measure(build, flow_series)
+        rows.append({'design': name, 'borders': n_borders, 'days': days,
+                     'build_s': seconds, 'retained_mb': retained / 2**20, 'peak_mb': peak / 2**20})
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--borders", type=int, default=21)
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    print(run(args.borders, args.days).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
@@ -0,0 +1,413 @@
+"""
+Local stand-in for the ENTSO-E and Open-Meteo APIs, to load-test the fetch layer offline.
+
+Answers the requests of entsoe-py (GET /api, any securityToken) with ENTSO-E style XML and
+those of scripts/weather_data_fetcher.py (GET /v1/search, GET /v1/archive) with Open-Meteo
+style JSON. Responses are synthetic, or replayed from --record-dir when a recording of the
+same query exists (with --upstream a miss is fetched from the real API and recorded).
+
+Latency, errors, 429 throttling and payload size are configurable. Whether a request fails
+is derived from a hash of the query and how often it was asked before, so a run with the
+same seed fails the same requests whatever the thread interleaving.
+
+    python benchmarks/replay_server.py --port 8765 --latency 0.2 --error-rate 0.02 --throttle-rate 0.05
+    ENTSOE_API_KEY=replay ENTSOE_ENDPOINT_URL=http://127.0.0.1:8765/api python scripts/fetch_entsoe_flow_generation.py
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+UPSTREAM = {
+    '/api': "https://web-api.tp.entsoe.eu/api",
+    '/v1/search': "https://geocoding-api.open-meteo.com/v1/search",
+    '/v1/archive': "https://archive-api.open-meteo.com/v1/archive",
+}
+# query parameters that don't change the answer
+IGNORED_PARAMS = {'securityToken'}
+
+# documentType -> (root element, value element)
+DOCUMENTS = {
+    'A44': ('Publication_MarketDocument', 'price.amount'),  # day-ahead prices
+    'A65': ('GL_MarketDocument', 'quantity'),               # load
+    'A75': ('GL_MarketDocument', 'quantity'),               # generation per type
+    'A11': ('Publication_MarketDocument', 'quantity'),      # physical flows
+    'A25': ('Publication_MarketDocument', 'quantity'),      # net positions
+}
+GENERATION_TYPES = ['B01', 'B04', 'B14', 'B16', 'B19']  # biomass, gas, nuclear, solar, wind onshore
+# geocoding answers a name with one match per country, the fetcher keeps its own
+COUNTRIES = ['AT', 'BE', 'BG', 'CZ', 'DE', 'FR', 'HR', 'HU', 'NL', 'PL', 'RO', 'SI', 'SK']
+
+NO_DATA = """<?xml version="1.0" encoding="UTF-8"?>
+<Acknowledgement_MarketDocument xmlns="urn:iec62325.351:tc57wg16:451-1:acknowledgementdocument:7:0">
+  <mRID>replay</mRID>
+  <Reason>
+    <code>999</code>
+    <text>No matching data found for Data item ({key}).</text>
+  </Reason>
+</Acknowledgement_MarketDocument>"""
+
+
+class ReplayConfig:
+    """
+    Attributes:
+        latency (float): seconds before every answer.
+        jitter (float): up to this many extra seconds, from the request hash.
+        seconds_per_mb (float): extra latency per MB of response, a slow link.
+        error_rate (float): share of requests answered 503.
+        throttle_rate (float): share of requests answered 429.
+        max_rps (float): requests per second over which every request gets 429, None for no limit.
+        no_data_rate (float): share of ENTSO-E requests answered 'No matching data found'.
+        resolution (str): PT15M or PT60M, resolution of the synthetic ENTSO-E series.
+        pad_kb (int): padding added to every ENTSO-E document, for bigger payloads.
+        record_dir (str): recorded responses, replayed before synthetic ones.
+        upstream (bool): fetch a query missing from record_dir from the real API and record it.
+        seed (int): seed of the failure decisions and the synthetic values.
+    """
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, seconds_per_mb: float = 0.0,
+                 error_rate: float = 0.0, throttle_rate: float = 0.0, max_rps: float | None = None,
+                 no_data_rate: float = 0.0, resolution: str = 'PT15M', pad_kb: int = 0,
+                 record_dir: str | None = None, upstream: bool = False, seed: int = 0):
+        if resolution not in ('PT15M', 'PT60M'):
+            raise ValueError("resolution must be PT15M or PT60M.")
+        self.latency = latency
+        self.jitter = jitter
+        self.seconds_per_mb = seconds_per_mb
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_rps = max_rps
+        self.no_data_rate = no_data_rate
+        self.resolution = resolution
+        self.pad_kb = pad_kb
+        self.record_dir = record_dir
+        self.upstream = upstream
+        self.seed = seed
+
+
+def query_key(path: str, params: list) -> str:
+    """
+    Canonical form of a request, the same for every token and parameter order.
+    """
+    kept = sorted((k, v) for k, v in params if k not in IGNORED_PARAMS)
+    return f"{path}?{urlencode(kept)}"
+
+
+def _uniform(*parts) -> float:
+    """
+    Deterministic number in [0, 1) from the parts.
+    """
+    digest = hashlib.sha1("|".join(map(str, parts)).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2**64
+
+
+def _rng(*parts) -> np.random.Generator:
+    return np.random.default_rng(zlib.crc32("|".join(map(str, parts)).encode()))
+
+
+def _entsoe_time(text: str) -> pd.Timestamp:
+    return pd.Timestamp(pd.to_datetime(text, format="%Y%m%d%H%M"), tz='UTC')
+
+
+def entsoe_document(params: dict, config: ReplayConfig) -> str:
+    """
+    ENTSO-E XML with one series (one per production type for generation) over [periodStart, periodEnd).
+    """
+    doc_type = params.get('documentType', 'A44')
+    root, value_tag = DOCUMENTS.get(doc_type, DOCUMENTS['A11'])
+    start, end = _entsoe_time(params['periodStart']), _entsoe_time(params['periodEnd'])
+    step = pd.Timedelta(minutes=15 if config.resolution == 'PT15M' else 60)
+    n = max(int((end - start) / step), 0)
+    hours = (np.arange(n) * step.total_seconds() / 3600 + start.hour) % 24
+    profile = np.sin((hours - 6) / 24 * 2 * np.pi)
+
+    in_domain = params.get('in_Domain') or params.get('in_Domain.mRID') or params.get('outBiddingZone_Domain') or ''
+    out_domain = params.get('out_Domain') or params.get('in_Domain') or ''
+
+    series = []
+    for psr_type in (GENERATION_TYPES if doc_type == 'A75' else [None]):
+        rng = _rng(config.seed, doc_type, in_domain, out_domain, psr_type, params['periodStart'])
+        if doc_type == 'A44':
+            values = 80 + 30 * profile + rng.normal(0, 10, n)
+        elif doc_type == 'A25':
+            values = 500 * profile + rng.normal(0, 200, n)
+        else:
+            values = np.maximum(1000 + 400 * profile + rng.normal(0, 150, n), 0)
+        points = "".join(f"<Point><position>{i + 1}</position><{value_tag}>{v:.2f}</{value_tag}></Point>"
+                         for i, v in enumerate(values))
+
+        domains = f"<inBiddingZone_Domain.mRID codingScheme=\"A01\">{in_domain}</inBiddingZone_Domain.mRID>" \
+            if doc_type in ('A65', 'A75') else \
+            f"<in_Domain.mRID codingScheme=\"A01\">{in_domain}</in_Domain.mRID>" \
+            f"<out_Domain.mRID codingScheme=\"A01\">{out_domain}</out_Domain.mRID>"
+        psr = f"<MktPSRType><psrType>{psr_type}</psrType></MktPSRType>" if psr_type else ""
+        series.append(
+            f"<TimeSeries><mRID>{len(series) + 1}</mRID><businessType>A01</businessType>{domains}{psr}"
+            f"<curveType>A01</curveType><Period><timeInterval>"
+            f"<start>{start:%Y-%m-%dT%H:%MZ}</start><end>{end:%Y-%m-%dT%H:%MZ}</end></timeInterval>"
+            f"<resolution>{config.resolution}</resolution>{points}</Period></TimeSeries>")
+
+    padding = f"<!-- {'x' * (config.pad_kb * 1024)} -->" if config.pad_kb else ""
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<{root}><mRID>replay</mRID><type>{doc_type}</type>'
+            f"{padding}{''.join(series)}</{root}>")
+
+
+def geocoding_result(params: dict) -> dict:
+    name = params.get('name', '')
+    results = []
+    for country in COUNTRIES:
+        results.append({'name': name, 'country_code': country,
+                        'latitude': round(44 + 10 * _uniform('lat', name, country), 4),
+                        'longitude': round(2 + 24 * _uniform('lon', name, country), 4)})
+    return {'results': results}
+
+
+def archive_result(params: dict, config: ReplayConfig):
+    """
+    Open-Meteo archive answer: an object for one location, a list for several.
+    """
+    lats = [float(x) for x in params['latitude'].split(",")]
+    lons = [float(x) for x in params['longitude'].split(",")]
+    days = pd.date_range(params['start_date'], params['end_date'], freq='D')
+    hours = pd.date_range(days[0], days[-1] + pd.Timedelta(hours=23), freq='h')
+    hourly_vars = [v for v in params.get('hourly', '').split(",") if v]
+    daily_vars = [v for v in params.get('daily', '').split(",") if v]
+    daylight = np.maximum(np.sin((hours.hour.to_numpy() - 6) / 24 * 2 * np.pi), 0)
+
+    locations = []
+    for lat, lon in zip(lats, lons):
+        rng = _rng(config.seed, lat, lon, params['start_date'])
+        hourly = {'time': [f"{t:%Y-%m-%dT%H:%M}" for t in hours]}
+        for var in hourly_vars:
+            if 'radiation' in var:
+                values = 800 * daylight * rng.random(len(hours))
+            elif 'wind' in var:
+                values = rng.gamma(2.0, 6.0, len(hours))
+            else:
+                values = 15 + 8 * daylight + rng.normal(0, 2, len(hours))
+            hourly[var] = np.round(values, 1).tolist()
+        daily = {'time': [f"{d:%Y-%m-%d}" for d in days]}
+        for var in daily_vars:
+            daily[var] = np.round(25 + rng.normal(0, 4, len(days)), 1).tolist()
+        location = {'latitude': lat, 'longitude': lon, 'timezone': params.get('timezone', 'GMT')}
+        if hourly_vars:
+            location['hourly'] = hourly
+        if daily_vars:
+            location['daily'] = daily
+        locations.append(location)
+    return locations[0] if len(locations) == 1 else locations
+
+
+class ReplayServer:
+    """
+    The server on a background thread, with counters of what it answered.
+
+        with ReplayServer(ReplayConfig(latency=0.1)) as server:
+            os.environ.update(server.env())  # before entsoe is imported
+            ...
+            print(server.stats)
+    """
+    def __init__(self, config: ReplayConfig | None = None, host: str = '127.0.0.1', port: int = 0):
+        self.config = config or ReplayConfig()
+        self._lock = threading.Lock()
+        self._seen = Counter()
+        self._window = []
+        self.stats = Counter()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def entsoe_url(self) -> str:
+        return f"{self.url}/api"
+
+    def env(self) -> dict:
+        """
+        Environment variables that point the fetchers at this server. entsoe-py reads
+        ENTSOE_ENDPOINT_URL on import, so they have to be set before.
+        """
+        return {'ENTSOE_ENDPOINT_URL': self.entsoe_url,
+                'OPEN_METEO_GEOCODING_URL': f"{self.url}/v1/search",
+                'OPEN_METEO_ARCHIVE_URL': f"{self.url}/v1/archive"}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats.clear()
+
+    def _count(self, **counts):
+        with self._lock:
+            self.stats.update(counts)
+
+    def _decide(self, key: str) -> str | None:
+        """
+        'error', 'throttle', 'no_data' or None for this request, from the query and its attempt number.
+        """
+        config = self.config
+        with self._lock:
+            attempt = self._seen[key]
+            self._seen[key] += 1
+            if config.max_rps:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 1.0]
+                if len(self._window) >= config.max_rps:
+                    return 'throttle'
+                self._window.append(now)
+        if _uniform(config.seed, key, attempt, 'throttle') < config.throttle_rate:
+            return 'throttle'
+        if _uniform(config.seed, key, attempt, 'error') < config.error_rate:
+            return 'error'
+        if key.startswith('/api?') and _uniform(config.seed, key, 'no_data') < config.no_data_rate:
+            return 'no_data'
+        return None
+
+    def _recorded(self, key: str, path: str, params: list) -> tuple[int, str, bytes] | None:
+        """
+        (status, content type, body) of a recording of key, fetched from upstream first if allowed.
+        """
+        record_dir = self.config.record_dir
+        if not record_dir:
+            return None
+        name = hashlib.sha1(key.encode()).hexdigest()
+        body_path = os.path.join(record_dir, f"{name}.body")
+        meta_path = os.path.join(record_dir, f"{name}.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(body_path, 'rb') as f:
+                return meta['status'], meta['content_type'], f.read()
+        if not self.config.upstream or path not in UPSTREAM:
+            return None
+
+        import requests
+        response = requests.get(UPSTREAM[path], params=params, timeout=60)
+        content_type = response.headers.get('content-type', 'application/octet-stream')
+        if response.status_code == 200:
+            os.makedirs(record_dir, exist_ok=True)
+            with open(body_path, 'wb') as f:
+                f.write(response.content)
+            with open(meta_path, 'w') as f:
+                json.dump({'key': key, 'status': 200, 'content_type': content_type}, f)
+        return response.status_code, content_type, response.content
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status: int, content_type: str, body: bytes, headers: dict | None = None):
+                config = server.config
+                delay = config.latency + config.jitter * _uniform(config.seed, self.path, 'jitter') \
+                    + config.seconds_per_mb * len(body) / 2**20
+                if delay > 0:
+                    time.sleep(delay)
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+                server._count(requests=1, **{f"status_{status}": 1}, bytes=len(body))
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                params = parse_qsl(url.query, keep_blank_values=True)
+                key = query_key(url.path, params)
+                is_entsoe = url.path == '/api'
+
+                if url.path not in UPSTREAM:
+                    return self._send(404, "text/plain", b"unknown endpoint")
+
+                decision = server._decide(key)
+                if decision == 'throttle':
+                    body = b"Too many requests" if is_entsoe else json.dumps({'error': True, 'reason': 'Too many requests'}).encode()
+                    return self._send(429, "text/plain" if is_entsoe else "application/json", body, {"Retry-After": "1"})
+                if decision == 'error':
+                    return self._send(503, "text/plain", b"Service unavailable")
+
+                try:
+                    recorded = server._recorded(key, url.path, params)
+                    if recorded:
+                        return self._send(*recorded)
+                    query = dict(params)
+                    if is_entsoe:
+                        # the whole range fits the first page, entsoe-py pages on until 'no data'
+                        paged = int(query.get('offset') or 0) > 0
+                        text = NO_DATA.format(key=key) if decision == 'no_data' or paged else entsoe_document(query, server.config)
+                        return self._send(200, "text/xml", text.encode())
+                    result = geocoding_result(query) if url.path == '/v1/search' else archive_result(query, server.config)
+                    return self._send(200, "application/json", json.dumps(result).encode())
+                except (KeyError, ValueError) as e:
+                    return self._send(400, "text/plain", f"bad request: {e}".encode())
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seconds-per-mb", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float)
+    parser.add_argument("--no-data-rate", type=float, default=0.0)
+    parser.add_argument("--resolution", default="PT15M", choices=["PT15M", "PT60M"])
+    parser.add_argument("--pad-kb", type=int, default=0)
+    parser.add_argument("--record-dir")
+    parser.add_argument("--upstream", action="store_true", help="record misses from the real APIs")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = ReplayConfig(args.latency, args.jitter, args.seconds_per_mb, args.error_rate, args.throttle_rate,
+                          args.max_rps, args.no_data_rate, args.resolution, args.pad_kb, args.record_dir,
+                          args.upstream, args.seed)
+    server = ReplayServer(config, args.host, args.port)
+    for name, value in server.env().items():
+        print(f"export {name}={value}")
+    print("serving, ctrl-c to stop", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print(dict(server.stats))
@@ -0,0 +1,241 @@
+"""
+Times the data and dashboard hot paths on a synthetic tree (benchmarks/synthetic.py) and
+appends the results to a json-lines history, one entry per run with the git commit, so a
+regression shows up as a ratio against the last run with the same parameters.
+
+    python benchmarks/run.py                       # 8 zones x 2 years, all cases
+    python benchmarks/run.py --zones 12 --years 4 --only build_flow_graph_csv app_cold_start
+    python benchmarks/run.py --fail-on-regression  # exit 1 if a case got slower than --threshold
+
+Cases:
+    build_flow_graph_csv / _store   flows -> FlowTensor graph from the csv folder / parquet store
+    process_weather_data            raw weather csvs -> national aggregates
+    get_level_raw / _daily_mean     dashboard level: aggregation plus precomputed frames
+    update_map                      one slider move (patch construction), per call
+    base_figure                     the full figure sent with the page layout
+    app_cold_start / _warm_start    fresh process: import the app and build the map page,
+                                    without and with a flow snapshot
+"""
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import statistics
+import subprocess
+import contextlib
+import tempfile
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from benchmarks.synthetic import synthetic_tree, DEFAULT_DATA_DIR
+
+HISTORY_FILE = os.path.join(project_root, "benchmarks", "history.jsonl")
+THRESHOLD = 0.2        # slower by more than this share counts as a regression
+UPDATE_MAP_CALLS = 50
+
+# a fresh interpreter opening the map page, prints its wall time
+COLD_START = """
+import sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {dashboard!r})
+import app
+sys.modules['pages.map'].layout()
+print(time.perf_counter() - t0)
+"""
+
+
+def git_commit() -> tuple[str | None, bool]:
+    """
+    (HEAD commit, whether the work tree has changes), (None, False) outside a git checkout.
+    """
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=project_root, text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+        status = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"],
+                                         cwd=project_root, text=True, stderr=subprocess.DEVNULL)
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def timed(fn, repeat: int, setup=None, calls: int = 1) -> list[float]:
+    """
+    Seconds per call of fn over repeat runs, setup() runs untimed before each.
+    """
+    seconds = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            for _ in range(calls):
+                fn()
+            seconds.append((time.perf_counter() - t0) / calls)
+    return seconds
+
+
+def dashboard_module(store_dir: str, snapshot_dir: str):
+    """
+    pages.map of the dashboard app, pointed at the synthetic store.
+    """
+    os.environ["FLOW_DATA_DIR"] = store_dir
+    os.environ["FLOW_SNAPSHOT_DIR"] = snapshot_dir
+    os.environ["FLOW_RECHECK_SECONDS"] = "1e9"
+    dashboard = os.path.join(project_root, "dashboard")
+    if dashboard not in sys.path:
+        sys.path.insert(0, dashboard)
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app  # noqa: F401, registers the pages
+    return sys.modules['pages.map']
+
+
+def cold_start(store_dir: str, snapshot_dir: str) -> float:
+    env = dict(os.environ, FLOW_DATA_DIR=store_dir, FLOW_SNAPSHOT_DIR=snapshot_dir)
+    code = COLD_START.format(dashboard=os.path.join(project_root, "dashboard"))
+    output = subprocess.check_output([sys.executable, "-c", code], env=env, text=True, stderr=subprocess.DEVNULL)
+    return float(output.strip().splitlines()[-1])
+
+
+def run_cases(tree: dict, repeat: int, workers: int | None, only=None) -> dict:
+    """
+    {case: [seconds per run]} for the selected cases.
+    """
+    from scripts.graph_builder import build_flow_graph
+    from scripts.process_weather_data import process_weather_data
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    results = {}
+
+    def want(name):
+        return not only or name in only
+
+    try:
+        if want('build_flow_graph_csv'):
+            results['build_flow_graph_csv'] = timed(lambda: build_flow_graph(tree['csv_dir'], max_workers=workers), repeat)
+        if want('build_flow_graph_store'):
+            results['build_flow_graph_store'] = timed(lambda: build_flow_graph(tree['store_dir'], max_workers=workers), repeat)
+        if want('process_weather_data'):
+            processed = os.path.join(work_dir, "processed")
+            results['process_weather_data'] = timed(
+                lambda: process_weather_data(raw_dir=tree['raw_dir'], processed_dir=processed), repeat)
+
+        dashboard_cases = ['get_level_raw', 'get_level_daily_mean', 'update_map', 'base_figure']
+        if any(want(name) for name in dashboard_cases):
+            m = dashboard_module(tree['store_dir'], os.path.join(work_dir, "snapshot"))
+            with contextlib.redirect_stdout(io.StringIO()):
+                data = m.get_page_data()
+
+            for level in ('raw', 'daily_mean'):
+                if want(f'get_level_{level}'):
+                    results[f'get_level_{level}'] = timed(lambda: m.get_level(level), repeat,
+                                                          setup=lambda: data['levels'].pop(level, None))
+
+            frames = m.get_level('raw')['frames']
+            if want('update_map'):
+                timestamps = m.get_level('raw')['timestamps']
+                start, stop = m.view_bounds(timestamps, None, None)
+                view = {'level': 'raw', 'start': int(start), 'stop': int(stop)}
+                positions = iter(range(10 ** 9))
+                results['update_map'] = timed(lambda: m.update_map(next(positions) % (stop - start), view, 'none'),
+                                              repeat, calls=UPDATE_MAP_CALLS)
+            if want('base_figure'):
+                results['base_figure'] = timed(lambda: m.base_figure(frames, 'benchmark'), repeat)
+
+        if want('app_cold_start') or want('app_warm_start'):
+            snapshot = os.path.join(work_dir, "snapshot_app")
+            cold, warm = [], []
+            for _ in range(repeat):
+                shutil.rmtree(snapshot, ignore_errors=True)
+                cold.append(cold_start(tree['store_dir'], snapshot))
+                warm.append(cold_start(tree['store_dir'], snapshot))
+            if want('app_cold_start'):
+                results['app_cold_start'] = cold
+            if want('app_warm_start'):
+                results['app_warm_start'] = warm
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def summarize(results: dict) -> dict:
+    return {name: {'median_s': statistics.median(s), 'min_s': min(s), 'runs': len(s)} for name, s in results.items()}
+
+
+def load_history(path: str) -> list[dict]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(entry: dict, history: list[dict], threshold: float = THRESHOLD) -> list[dict]:
+    """
+    Rows of case, median now, median of the last run with the same params, ratio and whether it regressed.
+    """
+    previous = next((h for h in reversed(history) if h['params'] == entry['params']), None)
+    rows = []
+    for name, result in entry['results'].items():
+        before = previous['results'].get(name) if previous else None
+        ratio = result['median_s'] / before['median_s'] if before and before['median_s'] > 0 else None
+        rows.append({'case': name, 'median_s': result['median_s'], 'previous_s': before['median_s'] if before else None,
+                     'ratio': ratio, 'regression': ratio is not None and ratio > 1 + threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, help="process pool size of build_flow_graph, default one per CPU")
+    parser.add_argument("--only", nargs="+", help="run only these cases")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where the synthetic trees are kept")
+    parser.add_argument("--history", default=HISTORY_FILE)
+    parser.add_argument("--no-record", action="store_true", help="don't append this run to the history")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    tree = synthetic_tree(args.zones, args.years, args.seed, args.data_dir)
+    print(f"synthetic tree {tree['root']}: {len(tree['zones'])} zones, {tree['borders']} borders, "
+          f"{tree['rows']} rows per series ({time.perf_counter() - t0:.1f}s)")
+
+    commit, dirty = git_commit()
+    entry = {
+        'time': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpus",
+        'params': {'zones': args.zones, 'years': args.years, 'seed': args.seed, 'workers': args.workers},
+        'results': summarize(run_cases(tree, args.repeat, args.workers, args.only)),
+    }
+
+    rows = compare(entry, load_history(args.history), args.threshold)
+    print(f"\n{'case':<26}{'median s':>10}{'previous':>10}{'ratio':>8}")
+    for row in rows:
+        previous = f"{row['previous_s']:.4f}" if row['previous_s'] is not None else "-"
+        ratio = f"{row['ratio']:.2f}" if row['ratio'] is not None else "-"
+        flag = "  REGRESSION" if row['regression'] else ""
+        print(f"{row['case']:<26}{row['median_s']:>10.4f}{previous:>10}{ratio:>8}{flag}")
+
+    if not args.no_record:
+        os.makedirs(os.path.dirname(args.history), exist_ok=True)
+        with open(args.history, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        print(f"\nrecorded in {args.history}")
+
+    if args.fail_on_regression and any(row['regression'] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Synthetic ENTSO-E shaped data for the benchmarks, no API keys needed.
+
+Writes the csv layout of the fetchers (flows_<sender>_<recipient>.csv, <zone>_spot_prices.csv,
+<zone>_load.csv, raw weather csvs) for N zones x M years at 15-minute resolution, and the
+same data migrated into a parquet store. Trees are kept per (zones, years, seed) and reused.
+
+    python benchmarks/synthetic.py --zones 8 --years 2
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.config.graph_config import NEIGHBORS
+
+DEFAULT_DATA_DIR = os.path.join(project_root, "data", "cache", "benchmarks")
+START = "2021-01-01"
+ENTSOE_TZ = "Europe/Brussels"  # entsoe-py returns local market time
+WEATHER_CITIES = {
+    "DE": ["Berlin", "Munich", "Frankfurt"],
+    "HU": ["Budapest", "Debrecen", "Szeged"],
+}
+
+
+def zones_and_borders(n_zones: int) -> tuple[list, list]:
+    """
+    First n_zones of the graph in breadth-first order from DE_LU (so they stay connected), and their borders.
+    """
+    order, queue = [], ['DE_LU']
+    while queue and len(order) < n_zones:
+        zone = queue.pop(0)
+        if zone in order:
+            continue
+        order.append(zone)
+        queue += [z for z in NEIGHBORS.get(zone, []) if z not in order]
+    borders = sorted({tuple(sorted((a, b))) for a in order for b in NEIGHBORS.get(a, []) if b in order})
+    return order, borders
+
+
+def _daily_profile(index: pd.DatetimeIndex) -> np.ndarray:
+    hours = np.asarray(index.hour + index.minute / 60)
+    return np.sin((hours - 6) / 24 * 2 * np.pi)
+
+
+def write_csv_tree(csv_dir: str, n_zones: int, years: int, seed: int = 0) -> dict:
+    """
+    Writes the csvs and returns a summary (zones, borders, files, rows per series).
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(START, pd.Timestamp(START) + pd.DateOffset(years=years), freq="15min",
+                          tz="UTC", inclusive="left").tz_convert(ENTSOE_TZ)
+    profile = _daily_profile(index)
+    zones, borders = zones_and_borders(n_zones)
+    os.makedirs(csv_dir, exist_ok=True)
+
+    files = 0
+    for a, b in borders:
+        for sender, recipient in ((a, b), (b, a)):
+            flow = np.maximum(rng.normal(400, 300, len(index)) + 200 * profile, 0).round(1)
+            flow[rng.random(len(index)) < 0.002] = np.nan  # the odd missing quarter-hour
+            pd.Series(flow, index=index).to_csv(os.path.join(csv_dir, f"flows_{sender}_{recipient}.csv"))
+            files += 1
+
+    for zone in zones:
+        price = 80 + 30 * profile + np.cumsum(rng.normal(0, 2, len(index))) * 0.1 + rng.normal(0, 10, len(index))
+        pd.Series(price.round(2), index=index).to_csv(os.path.join(csv_dir, f"{zone}_spot_prices.csv"))
+        load = 5000 + 1500 * profile + rng.normal(0, 200, len(index))
+        pd.DataFrame({'Actual Load': load.round(0)}, index=index).to_csv(os.path.join(csv_dir, f"{zone}_load.csv"))
+        files += 2
+
+    return {'zones': zones, 'borders': len(borders), 'files': files, 'rows': len(index)}
+
+
+def write_weather(raw_dir: str, years: int, seed: int = 0):
+    """
+    Hourly and daily raw weather csvs in the layout of scripts/weather_data_fetcher.py.
+    """
+    rng = np.random.default_rng(seed + 1)
+    hours = pd.date_range(START, pd.Timestamp(START) + pd.DateOffset(years=years), freq="h", inclusive="left")
+    seasonal = -np.cos((np.asarray(hours.dayofyear) - 15) / 365 * 2 * np.pi)
+    daylight = np.maximum(_daily_profile(hours), 0)
+    os.makedirs(raw_dir, exist_ok=True)
+
+    hourly, daily = [], []
+    for country, cities in WEATHER_CITIES.items():
+        for city in cities:
+            temperature = 10 + 12 * seasonal + 5 * daylight + rng.normal(0, 2, len(hours))
+            frame = pd.DataFrame({
+                'country': country, 'city': city, 'datetime': hours,
+                'temperature': temperature.round(1),
+                'irradiance': (800 * daylight * (0.6 + 0.4 * seasonal) * rng.random(len(hours))).round(0),
+                'wind_speed': rng.gamma(2.0, 6.0, len(hours)).round(1),
+            })
+            hourly.append(frame)
+            day = frame.groupby(frame['datetime'].dt.normalize())['temperature'].max()
+            daily.append(pd.DataFrame({'country': country, 'city': city, 'date': day.index, 'max_temperature': day.values}))
+
+    pd.concat(hourly).to_csv(os.path.join(raw_dir, "hourly_weather_HU_DE_weeks29_30.csv"), index=False)
+    pd.concat(daily).to_csv(os.path.join(raw_dir, "daily_max_weather_HU_DE_weeks29_30.csv"), index=False)
+
+
+def synthetic_tree(n_zones: int = 8, years: int = 2, seed: int = 0, data_dir: str = DEFAULT_DATA_DIR,
+                   rebuild: bool = False) -> dict:
+    """
+    Paths of a synthetic tree (csv, store, raw weather), generated on first use.
+
+    Returns:
+        dict: root, csv_dir, store_dir, raw_dir and the summary of write_csv_tree.
+    """
+    from scripts.timeseries_store import TimeSeriesStore, migrate_csv_tree
+
+    root = os.path.join(data_dir, f"z{n_zones}_y{years}_s{seed}")
+    paths = {'root': root, 'csv_dir': os.path.join(root, "csv"), 'store_dir': os.path.join(root, "store"),
+             'raw_dir': os.path.join(root, "raw")}
+    done = os.path.join(root, "summary.json")
+
+    if rebuild:
+        shutil.rmtree(root, ignore_errors=True)
+    if not os.path.exists(done):
+        shutil.rmtree(root, ignore_errors=True)
+        summary = write_csv_tree(paths['csv_dir'], n_zones, years, seed)
+        logging.disable(logging.INFO)  # one line per migrated file
+        try:
+            migrate_csv_tree(paths['csv_dir'], TimeSeriesStore(paths['store_dir']))
+        finally:
+            logging.disable(logging.NOTSET)
+        write_weather(paths['raw_dir'], years, seed)
+        with open(done, "w") as f:
+            json.dump(summary, f)
+
+    with open(done) as f:
+        return {**paths, **json.load(f)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--zones", type=int, default=8)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    print(json.dumps(synthetic_tree(args.zones, args.years, args.seed, args.data_dir, args.rebuild), indent=1))
@@ -0,0 +1,70 @@
+// client-side playback for the flow map: renders buffered frames without a server callback per frame
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    flowmap: {
+        play_tick: function (n_intervals, buffer, prefetch, position, request, figure, meta) {
+            const no_update = window.dash_clientside.no_update;
+            if (!figure || !meta) {
+                return [no_update, no_update, no_update, no_update, no_update];
+            }
+
+            const covers = (b, i) => b && i >= b.start && i < b.start + b.flows.length;
+            let pos = (position === null || position === undefined) ? 0 : position + 1;
+            if (pos >= meta.n_frames) {
+                pos = 0;
+            }
+
+            let buf = buffer;
+            if (!covers(buf, pos)) {
+                if (covers(prefetch, pos)) {
+                    buf = prefetch;
+                } else {
+                    // frame not here yet, ask for it (once) and hold position
+                    const ask = (request && request.start === pos) ? no_update : {start: pos};
+                    return [no_update, no_update, no_update, ask, no_update];
+                }
+            }
+
+            // past the middle of the window: prefetch the next one
+            let newRequest = no_update;
+            let next = buf.start + buf.flows.length;
+            if (next >= meta.n_frames) {
+                next = 0;
+            }
+            const pending = (prefetch && prefetch.start === next) || (request && request.start === next);
+            if (pos - buf.start >= buf.flows.length / 2 && !pending) {
+                newRequest = {start: next};
+            }
+
+            const flows = buf.flows[pos - buf.start];
+            const label = buf.labels[pos - buf.start];
+            const data = figure.data.map(trace => Object.assign({}, trace));
+            const texts = [];
+            meta.edges.forEach(function (edge, i) {
+                const flow = flows[i];
+                const shown = flow !== null && flow !== 0;
+                data[i].visible = shown;
+                data[i].line = Object.assign({}, data[i].line, {
+                    width: Math.max(1.5, Math.log10(Math.abs(flow || 0) + 1)),
+                    color: flow > 0 ? 'green' : 'red',
+                });
+                const [source, target] = flow > 0 ? edge : [edge[1], edge[0]];
+                texts.push(shown ? `Flow from ${source} to ${target}: ${Math.abs(flow).toFixed(2)} MW` : '');
+            });
+            data[meta.hover_trace] = Object.assign({}, data[meta.hover_trace], {text: texts});
+            if (buf.node_sizes) {
+                const node = data[meta.node_trace];
+                data[meta.node_trace] = Object.assign({}, node, {
+                    marker: Object.assign({}, node.marker, {size: buf.node_sizes[pos - buf.start]}),
+                    hovertext: meta.nodes.map((zone, i) => `${zone}: ${buf.overlay_label} ${buf.node_values[pos - buf.start][i]} MW`),
+                });
+            }
+
+            const layout = Object.assign({}, figure.layout, {
+                title: Object.assign({}, figure.layout.title, {text: `Electricity Flow at ${label}`}),
+            });
+
+            return [{data: data, layout: layout}, pos, buf === buffer ? no_update : buf, newRequest, label];
+        }
+    }
+});
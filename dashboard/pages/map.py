@@ -1,130 +1,140 @@
+import os
+import time
+import threading
 import dash
-from dash import dcc, html, callback, Input, Output, State
+from dash import dcc, html, callback, clientside_callback, ClientsideFunction, Input, Output, State, Patch
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
-from functools import lru_cache
 
-from scripts.graph_builder import build_flow_graph
 from scripts.config.graph_config import NODE_POSITIONS
+from scripts.config.market_config import MARKET_TZ
 
 dash.register_page(__name__, path='/map')
 
-#get data with caching
-@lru_cache(maxsize=None)
-def get_flow_graph():
+# frames per playback payload, two days of quarter-hours
+FRAME_WINDOW = 192
+PLAY_SPEEDS = [1, 2, 4, 8, 16]  # frames per second
+# most frames one view (date range x resolution) may hold, keeps the page payload bounded
+MAX_VIEW_FRAMES = 2000
+MAX_SLIDER_MARKS = 10
+DEFAULT_VIEW_DAYS = 7
+# node overlays from scripts.flow_analytics, drawn as marker sizes
+OVERLAYS = {'none': 'No overlay', 'transit': 'Transit', 'loop': 'Loop flow'}
+NODE_SIZE = 14
+NODE_SIZE_RANGE = (8, 40)
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+# where the flows are read from and where the memory-mapped snapshot is kept
+DATA_DIR = os.environ.get("FLOW_DATA_DIR", os.path.join(project_root, "data", "store"))
+SNAPSHOT_DIR = os.environ.get("FLOW_SNAPSHOT_DIR", os.path.join(project_root, "data", "cache", "flow_snapshot"))
+# how often the source files are checked for changes
+RECHECK_SECONDS = float(os.environ.get("FLOW_RECHECK_SECONDS", "30"))
+
+def get_flow_graph(fingerprint=None):
     """
-    Loads and returns the flow graph, caching the result so it runs only once.
+    Loads the flow graph from the shared snapshot, building it first if the source files changed.
     """
-    print("--- Loading and building the flow graph... ---")
-    data_dir = r"C:\Users\micha\code\power-market-analysis-de-hu\data\processed\flows"
+    # networkx/pyarrow/entsoe are only imported once the data is needed
+    from scripts.graph_builder import load_flow_graph
+
+    print("--- Loading the flow graph... ---")
     try:
-        graph = build_flow_graph(data_dir)
-        print("--- Flow graph built successfully. ---")
+        graph = load_flow_graph(DATA_DIR, SNAPSHOT_DIR, fingerprint=fingerprint)
+        print("--- Flow graph loaded successfully. ---")
         return graph
     except Exception as e:
         print(f"!!! Failed to build flow graph: {e} !!!")
         return None
 
-# helper get timestamps and labels
-def get_time_data(flow_graph):
+def precompute_frames(tensor, edges):
     """
-    Extracts timestamps and labels from the flow graph.
+    Geometry of the edges with data, computed once. The flows stay in the (memory-mapped)
+    tensor, styles are derived per timestamp or per window from the slice that is shown.
     """
-    if not flow_graph or not flow_graph.edges:
-        return [], {}
-
-    # first edge that has flow data
-    edge_with_data = next((e for e in flow_graph.edges(data=True) if 'flows' in e[2] and e[2]['flows']), None)
-    
-    if not edge_with_data:
-        return [], {}
+    rows = [tensor.edge_row[edge] for edge in edges]
+    # all edges in tensor order: a plain slice keeps the mmap shared instead of copying it
+    if rows == list(range(len(tensor.edges))):
+        rows = slice(None)
 
-    timestamps = list(edge_with_data[2]['flows'].keys())
-    
-    # labels for the timestamps !!! note the UTC +2.00
-    if timestamps and isinstance(timestamps[0], str):
-        time_labels = {i: pd.to_datetime(ts).strftime('%Y-%m-%d %H:%M') for i, ts in enumerate(timestamps)}
-    elif timestamps:
-        time_labels = {i: ts.strftime('%Y-%m-%d %H:%M') for i, ts in enumerate(timestamps)}
-    else:
-        time_labels = {}
-        
-    return timestamps, time_labels
+    return {
+        'edges': edges,
+        'edge_lons': [[NODE_POSITIONS[u][1], NODE_POSITIONS[v][1]] for u, v in edges],
+        'edge_lats': [[NODE_POSITIONS[u][0], NODE_POSITIONS[v][0]] for u, v in edges],
+        'mid_lons': [(NODE_POSITIONS[u][1] + NODE_POSITIONS[v][1]) / 2 for u, v in edges],
+        'mid_lats': [(NODE_POSITIONS[u][0] + NODE_POSITIONS[v][0]) / 2 for u, v in edges],
+        'values': tensor.values,
+        'rows': rows,
+    }
 
-# only data once
-flow_graph = get_flow_graph()
-timestamps, time_labels = get_time_data(flow_graph)
+def edge_flows(frames, start, stop):
+    """
+    (edges x [start, stop)) flows of the shown edges, only this window is read from the tensor.
+    """
+    if not frames['edges']:
+        return np.empty((0, stop - start), dtype=np.float32)
+    return np.asarray(frames['values'][frames['rows'], start:stop], dtype=np.float32)
 
-def layout():
+def frame_style(frames, time_index):
     """
-    Defines the layout of the page.
+    Edge widths, colours, visibility and hover texts of one timestamp.
     """
-    if not flow_graph or not timestamps:
-        return html.Div([
-            html.H2("Error: Could Not Load Graph Data"),
-            html.P("unable to load or process the flow data, check error messages from the 'build_flow_graph' script.")
-        ])
+    flows = edge_flows(frames, time_index, time_index + 1)[:, 0].astype(float)
+    visible = ~(np.isnan(flows) | (flows == 0))
+    forward = np.nan_to_num(flows) > 0
+    width = np.maximum(1.5, np.log10(np.abs(np.nan_to_num(flows)) + 1))
+    texts = []
+    for (u, v), shown, fwd, flow in zip(frames['edges'], visible, forward, flows):
+        source, target = (u, v) if fwd else (v, u)
+        texts.append(f'Flow from {source} to {target}: {abs(flow):.2f} MW' if shown else '')
+    return {
+        'visible': visible.tolist(),
+        'width': width.round(2).tolist(),
+        'color': np.where(forward, 'green', 'red').tolist(),
+        'text': texts,
+    }
 
-    return html.Div([
-        html.H2("Electricity Flow Map"),
-        dcc.Graph(id='network-map', style={'height': '70vh'}),
-        dcc.Dropdown(
-            id='time-dropdown',
-            options=[{'label': label, 'value': i} for i, label in time_labels.items()],
-            value=0,
-            style={'marginBottom': '20px'},
-            clearable=False
-        ),
-        dcc.Slider(
-            id='time-slider',
-            min=0,
-            max=len(timestamps) - 1,
-            value=0,
-            marks={i: label for i, label in time_labels.items() if pd.to_datetime(label).minute == 0},
-            step=1
-        )
-    ])
+def precompute_overlay(tensor, kind):
+    """
+    (nodes x timestamps) overlay values in NODE_POSITIONS order, 0 for zones without flow data.
+    """
+    from scripts.flow_analytics import node_balances, loop_throughput
 
-@callback(
-    Output('network-map', 'figure'),
-    Input('time-slider', 'value')
-)
-def update_map(time_index):
+    values = node_balances(tensor)['transit'] if kind == 'transit' else loop_throughput(tensor)
+    values = values.reindex(columns=list(NODE_POSITIONS)).fillna(0)
+    return values.to_numpy(dtype=np.float32).T
 
-    if time_index is None:
-        return dash.no_update
+def node_style(overlay, kind, time_index):
+    """
+    Node marker sizes and hover texts of one timestamp, plain markers without an overlay.
+    """
+    if overlay is None:
+        return {'size': [NODE_SIZE] * len(NODE_POSITIONS), 'hovertext': list(NODE_POSITIONS)}
+    values = overlay[:, time_index].astype(float)
+    top = max(float(overlay.max()), 1.0)
+    low, high = NODE_SIZE_RANGE
+    return {
+        'size': (low + (high - low) * np.sqrt(values / top)).round(1).tolist(),
+        'value': values.round().astype(int).tolist(),
+        'hovertext': [f'{zone}: {OVERLAYS[kind].lower()} {value:.0f} MW' for zone, value in zip(NODE_POSITIONS, values)],
+    }
 
-    selected_timestamp = timestamps[time_index]
-
-    edge_traces = []
-    mid_lons, mid_lats, hover_texts = [], [], []
-
-    for u, v, data in flow_graph.edges(data=True):
-        if 'flows' in data and selected_timestamp in data['flows']:
-            flow_value = data['flows'].get(selected_timestamp, 0)
-            
-            if flow_value == 0:
-                continue
-
-            source, target = (u, v) if flow_value > 0 else (v, u)
-            arrow_color = 'green' if flow_value > 0 else 'red'
-            line_width = max(1.5, np.log10(abs(flow_value) + 1))
-            
-            edge_traces.append(go.Scattermapbox(
-                lon=[NODE_POSITIONS[source][1], NODE_POSITIONS[target][1]],
-                lat=[NODE_POSITIONS[source][0], NODE_POSITIONS[target][0]],
-                mode='lines',
-                line=dict(width=line_width, color=arrow_color),
-                hoverinfo='none'
-            ))
-
-            mid_lons.append((NODE_POSITIONS[u][1] + NODE_POSITIONS[v][1]) / 2)
-            mid_lats.append((NODE_POSITIONS[u][0] + NODE_POSITIONS[v][0]) / 2)
-            hover_texts.append(f'Flow from {source} to {target}: {abs(flow_value):.2f} MW')
+def base_figure(frames, title, time_index=0):
+    """
+    The full figure, sent once with the layout. Slider moves only patch it.
+    """
+    style = frame_style(frames, time_index)
+    edge_traces = [
+        go.Scattermapbox(
+            lon=lons, lat=lats, mode='lines', visible=shown,
+            line=dict(width=width, color=color), hoverinfo='none'
+        )
+        for lons, lats, shown, width, color in zip(
+            frames['edge_lons'], frames['edge_lats'], style['visible'], style['width'], style['color'])
+    ]
 
     hover_trace = go.Scattermapbox(
-        lon=mid_lons, lat=mid_lats, text=hover_texts, mode='markers',
+        lon=frames['mid_lons'], lat=frames['mid_lats'], text=style['text'], mode='markers',
         marker=dict(size=20, opacity=0), hoverinfo='text'
     )
 
@@ -132,15 +142,16 @@ def update_map(time_index):
         lon=[pos[1] for pos in NODE_POSITIONS.values()],
         lat=[pos[0] for pos in NODE_POSITIONS.values()],
         text=list(NODE_POSITIONS.keys()),
+        hovertext=list(NODE_POSITIONS.keys()),
         mode='markers+text',
-        marker=dict(size=14, color='rgb(235, 0, 100)'),
+        marker=dict(size=NODE_SIZE, color='rgb(235, 0, 100)'),
         hoverinfo='text',
         textposition='top center'
     )
 
     fig = go.Figure(data=edge_traces + [node_trace, hover_trace])
     fig.update_layout(
-        title=f'Electricity Flow at {time_labels.get(time_index, "")}',
+        title=title,
         showlegend=False,
         mapbox=dict(
             style="open-street-map",
@@ -151,23 +162,313 @@ def update_map(time_index):
     )
     return fig
 
+# loaded on first use, not at import, and shared by the callbacks of this process
+_page_data = {'fingerprint': None, 'checked': 0.0, 'data': None}
+_page_data_lock = threading.Lock()
+
+def get_page_data():
+    """
+    flow_graph and the edges with data. Reloaded when the flow files in DATA_DIR change,
+    checked at most every RECHECK_SECONDS. Resolution levels are added by get_level.
+    """
+    from scripts.graph_builder import flow_fingerprint
+
+    with _page_data_lock:
+        now = time.monotonic()
+        if _page_data['data'] is not None and now - _page_data['checked'] < RECHECK_SECONDS:
+            return _page_data['data']
+
+        fingerprint = flow_fingerprint(DATA_DIR, exclude=[SNAPSHOT_DIR]) if os.path.isdir(DATA_DIR) else None
+        _page_data['checked'] = now
+        if _page_data['data'] is not None and fingerprint == _page_data['fingerprint']:
+            return _page_data['data']
+
+        flow_graph = get_flow_graph(fingerprint) if fingerprint else None
+        edges = [(u, v) for u, v, data in flow_graph.edges(data=True) if 'flows' in data] if flow_graph else []
+        _page_data['fingerprint'] = fingerprint
+        _page_data['data'] = {'flow_graph': flow_graph, 'edges': edges, 'levels': {}}
+        return _page_data['data']
+
+def get_level(level):
+    """
+    timestamps and frames of one resolution level, aggregated from the flow tensor on first use.
+    """
+    from scripts.flow_aggregation import aggregate_flows
+
+    data = get_page_data()
+    with _page_data_lock:
+        if level not in data['levels']:
+            tensor = aggregate_flows(data['flow_graph'].graph['flow_tensor'], level)
+            data['levels'][level] = {'timestamps': tensor.index, 'tensor': tensor,
+                                     'frames': precompute_frames(tensor, data['edges']), 'overlays': {}}
+        return data['levels'][level]
+
+def get_overlay(level, kind):
+    """
+    Overlay values of one resolution level, computed on first use. None for no overlay.
+    """
+    if not kind or kind == 'none':
+        return None
+    data = get_level(level)
+    with _page_data_lock:
+        if kind not in data['overlays']:
+            data['overlays'][kind] = precompute_overlay(data['tensor'], kind)
+        return data['overlays'][kind]
+
+def date_position(timestamps, date, level, end=False):
+    """
+    Position of the start (or the end) of a picked date on a level's time axis.
+    Dates are UTC days, market days for the daily levels.
+    """
+    if not date:
+        return len(timestamps) if end else 0
+    ts = pd.Timestamp(date).tz_localize('UTC' if level in ('raw', 'hourly') else MARKET_TZ)
+    return timestamps.searchsorted(ts + pd.Timedelta(days=1) if end else ts)
+
+def view_bounds(timestamps, start_date, end_date, level='raw'):
+    """
+    [start, stop) positions of a date range, capped at MAX_VIEW_FRAMES.
+    """
+    start = date_position(timestamps, start_date, level)
+    stop = date_position(timestamps, end_date, level, end=True)
+    start = min(start, max(len(timestamps) - 1, 0))
+    return start, max(start + 1, min(stop, start + MAX_VIEW_FRAMES, len(timestamps)))
+
+def view_label(view, position):
+    from scripts.flow_aggregation import format_labels
+
+    timestamps = get_level(view['level'])['timestamps']
+    return format_labels(timestamps[[view['start'] + position]], view['level'])[0]
+
+def layout():
+    """
+    Defines the layout of the page.
+    """
+    from scripts.flow_aggregation import AGGREGATION_LEVELS
+
+    data = get_page_data()
+    if not data['flow_graph'] or not data['edges']:
+        return html.Div([
+            html.H2("Error: Could Not Load Graph Data"),
+            html.P("unable to load or process the flow data, check error messages from the 'build_flow_graph' script.")
+        ])
+
+    timestamps = get_level('raw')['timestamps']
+    first_day = timestamps[0].date()
+    last_day = timestamps[-1].date()
+    default_end = min(last_day, first_day + pd.Timedelta(days=DEFAULT_VIEW_DAYS - 1))
+    view = {'level': 'raw', 'start': 0, 'stop': view_bounds(timestamps, first_day, default_end)[1]}
+
+    return html.Div([
+        html.H2("Electricity Flow Map"),
+        html.Div([
+            dcc.RadioItems(
+                id='resolution',
+                options=[{'label': label, 'value': level} for level, label in AGGREGATION_LEVELS.items()],
+                value='raw',
+                inline=True
+            ),
+            dcc.DatePickerRange(
+                id='date-range',
+                min_date_allowed=first_day,
+                max_date_allowed=last_day,
+                start_date=first_day,
+                end_date=default_end,
+                display_format='YYYY-MM-DD'
+            ),
+            dcc.RadioItems(
+                id='overlay',
+                options=[{'label': label, 'value': kind} for kind, label in OVERLAYS.items()],
+                value='none',
+                inline=True
+            ),
+            html.Span(id='view-info'),
+        ], style={'display': 'flex', 'gap': '20px', 'alignItems': 'center', 'marginBottom': '10px'}),
+        dcc.Graph(id='network-map', figure=base_figure(get_level('raw')['frames'], f'Electricity Flow at {view_label(view, 0)}'),
+                  style={'height': '70vh'}),
+        dcc.Slider(id='time-slider', min=0, max=view['stop'] - 1, value=0, step=1),
+        html.Div([
+            html.Button('Play', id='play-button', n_clicks=0),
+            dcc.Dropdown(
+                id='play-speed',
+                options=[{'label': f'{fps} frames/s', 'value': fps} for fps in PLAY_SPEEDS],
+                value=4,
+                clearable=False,
+                style={'width': '160px'}
+            ),
+            html.Span(id='play-label'),
+        ], style={'display': 'flex', 'gap': '12px', 'alignItems': 'center', 'marginTop': '20px'}),
+        dcc.Interval(id='play-interval', interval=250, disabled=True),
+        # selected resolution and [start, stop) positions on its time axis
+        dcc.Store(id='view-window', data=view),
+        # playback state lives in the browser: buffered window, prefetched window, position
+        dcc.Store(id='frame-meta', data={
+            'n_frames': view['stop'] - view['start'],
+            'edges': [list(edge) for edge in data['edges']],
+            'nodes': list(NODE_POSITIONS),
+            'node_trace': len(data['edges']),
+            'hover_trace': len(data['edges']) + 1,
+        }),
+        dcc.Store(id='frame-buffer'),
+        dcc.Store(id='frame-prefetch'),
+        dcc.Store(id='frame-request'),
+        dcc.Store(id='play-position'),
+    ])
+
 @callback(
+    Output('view-window', 'data'),
+    Output('time-slider', 'max'),
+    Output('time-slider', 'marks'),
     Output('time-slider', 'value', allow_duplicate=True),
-    Output('time-dropdown', 'value', allow_duplicate=True),
+    Output('frame-meta', 'data'),
+    Output('frame-buffer', 'data', allow_duplicate=True),
+    Output('frame-prefetch', 'data', allow_duplicate=True),
+    Output('view-info', 'children'),
+    Input('resolution', 'value'),
+    Input('date-range', 'start_date'),
+    Input('date-range', 'end_date'),
+    State('frame-meta', 'data'),
+    prevent_initial_call='initial_duplicate'
+)
+def set_view(level, start_date, end_date, meta):
+    """
+    Slices the selected resolution to the date range. Only positions and a few slider
+    marks go to the browser, whatever the length of the history.
+    """
+    timestamps = get_level(level)['timestamps']
+    start, stop = view_bounds(timestamps, start_date, end_date, level)
+    view = {'level': level, 'start': int(start), 'stop': int(stop)}
+    n_frames = stop - start
+
+    step = max(1, n_frames // MAX_SLIDER_MARKS)
+    marks = {i: view_label(view, i) for i in range(0, n_frames, step)}
+
+    info = f"{n_frames} frames"
+    if date_position(timestamps, end_date, level, end=True) > stop:
+        info += f" (range cut at {view_label(view, n_frames - 1)}, max {MAX_VIEW_FRAMES} per view, try a coarser resolution)"
+
+    meta = dict(meta or {}, n_frames=n_frames)
+    return view, n_frames - 1, marks, 0, meta, None, None, info
+
+@callback(
+    Output('network-map', 'figure'),
     Input('time-slider', 'value'),
-    Input('time-dropdown', 'value'),
+    Input('view-window', 'data'),
+    Input('overlay', 'value')
+)
+def update_map(time_index, view, overlay_kind):
+    """
+    Patches only the per-timestamp parts of the figure: edge styles, node overlay, hover texts and title.
+    """
+    if time_index is None or not view:
+        return dash.no_update
+
+    frames = get_level(view['level'])['frames']
+    position = min(view['start'] + time_index, view['stop'] - 1)
+    style = frame_style(frames, position)
+    patch = Patch()
+    for i, (shown, width, color) in enumerate(zip(style['visible'], style['width'], style['color'])):
+        patch['data'][i]['visible'] = shown
+        patch['data'][i]['line']['width'] = width
+        patch['data'][i]['line']['color'] = color
+    # traces: edges..., nodes, hover markers
+    nodes = node_style(get_overlay(view['level'], overlay_kind), overlay_kind, position)
+    patch['data'][len(frames['edges'])]['marker']['size'] = nodes['size']
+    patch['data'][len(frames['edges'])]['hovertext'] = nodes['hovertext']
+    patch['data'][len(frames['edges']) + 1]['text'] = style['text']
+    patch['layout']['title']['text'] = f'Electricity Flow at {view_label(view, position - view["start"])}'
+    return patch
+
+@callback(
+    Output('frame-prefetch', 'data'),
+    Input('frame-request', 'data'),
+    State('view-window', 'data'),
+    State('overlay', 'value'),
+    prevent_initial_call=True
+)
+def fetch_frame_window(request, view, overlay_kind):
+    """
+    One compact payload of FRAME_WINDOW frames for the browser: labels,
+    per-frame edge flows (None where an edge has no data) and node overlay styles if one is shown.
+    Positions are relative to the view.
+    """
+    from scripts.flow_aggregation import format_labels
+
+    if not request or not view:
+        return dash.no_update
+
+    level = get_level(view['level'])
+    n_frames = view['stop'] - view['start']
+    start = int(request['start']) % n_frames
+    stop = min(start + FRAME_WINDOW, n_frames)
+    window = edge_flows(level['frames'], view['start'] + start, view['start'] + stop).T.round(2)
+    payload = {
+        'start': start,
+        'labels': format_labels(level['timestamps'][view['start'] + start:view['start'] + stop], view['level']),
+        'flows': np.where(np.isnan(window), None, window).tolist(),
+    }
+    overlay = get_overlay(view['level'], overlay_kind)
+    if overlay is not None:
+        nodes = [node_style(overlay, overlay_kind, view['start'] + i) for i in range(start, stop)]
+        payload['node_sizes'] = [n['size'] for n in nodes]
+        payload['node_values'] = [n['value'] for n in nodes]
+        payload['overlay_label'] = OVERLAYS[overlay_kind].lower()
+    return payload
+
+@callback(
+    Output('frame-buffer', 'data', allow_duplicate=True),
+    Output('frame-prefetch', 'data', allow_duplicate=True),
+    Input('overlay', 'value'),
     prevent_initial_call=True
 )
-def sync_inputs(slider_value, dropdown_value):
+def reset_frame_buffers(overlay_kind):
     """
-    Synchronizes the slider and dropdown components.
+    Buffered frames carry the overlay they were fetched with, drop them when it changes.
     """
-    ctx = dash.callback_context
-    trigger_id = ctx.triggered[0]['prop_id'].split('.')[0]
+    return None, None
 
-    if trigger_id == 'time-slider':
-        return slider_value, slider_value
-    elif trigger_id == 'time-dropdown':
-        return dropdown_value, dropdown_value
-    
-    return dash.no_update, dash.no_update
+clientside_callback(
+    ClientsideFunction(namespace='flowmap', function_name='play_tick'),
+    Output('network-map', 'figure', allow_duplicate=True),
+    Output('play-position', 'data', allow_duplicate=True),
+    Output('frame-buffer', 'data'),
+    Output('frame-request', 'data', allow_duplicate=True),
+    Output('play-label', 'children'),
+    Input('play-interval', 'n_intervals'),
+    State('frame-buffer', 'data'),
+    State('frame-prefetch', 'data'),
+    State('play-position', 'data'),
+    State('frame-request', 'data'),
+    State('network-map', 'figure'),
+    State('frame-meta', 'data'),
+    prevent_initial_call=True
+)
+
+@callback(
+    Output('play-interval', 'disabled'),
+    Output('play-button', 'children'),
+    Output('frame-request', 'data', allow_duplicate=True),
+    Output('play-position', 'data', allow_duplicate=True),
+    Output('time-slider', 'value', allow_duplicate=True),
+    Input('play-button', 'n_clicks'),
+    State('play-interval', 'disabled'),
+    State('time-slider', 'value'),
+    State('play-position', 'data'),
+    prevent_initial_call=True
+)
+def toggle_playback(n_clicks, disabled, slider_value, position):
+    """
+    Play starts from the slider position, pause hands the position back to the slider.
+    """
+    if disabled:
+        start = slider_value or 0
+        # first tick moves to start + 1, step back so playback begins at the slider frame
+        return False, 'Pause', {'start': start}, start - 1, dash.no_update
+    return True, 'Play', dash.no_update, dash.no_update, position if position is not None else dash.no_update
+
+@callback(
+    Output('play-interval', 'interval'),
+    Input('play-speed', 'value')
+)
+def set_play_speed(fps):
+    return int(1000 / (fps or 1))
@@ -0,0 +1,6 @@
+# scripts/config/market_config.py
+# market calendar shared by the aggregation, alignment and spread modules
+
+# days and peak block are taken in market time
+MARKET_TZ = 'Europe/Berlin'
+PEAK_HOURS = (8, 20)  # 08:00-20:00, Monday to Friday
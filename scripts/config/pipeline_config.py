@@ -0,0 +1,92 @@
+# scripts/config/pipeline_config.py
+# stages of the refresh pipeline, run with scripts/pipeline.py
+
+# [since, until) of the data, overridable with --since/--until
+DATE_WINDOW = {
+    'since': '2025-07-07',
+    'until': '2025-08-04',
+}
+
+# script: run from the project root with args, {since}/{until}/{until_inclusive} are filled in
+# inputs/outputs: files or directories, a stage runs after every stage writing one of its inputs
+# resources: stages sharing one never run at the same time (same api token, same fetch manifest)
+STAGES = {
+    'fetch_entsoe': {
+        'script': 'scripts/fetch_entsoe_flow_generation.py',
+        'args': ['--start', '{since}', '--end', '{until}'],
+        'inputs': ['scripts/config/graph_config.py'],
+        'outputs': [
+            'data/store/dataset=flows',
+            'data/store/dataset=prices',
+            'data/store/dataset=generation',
+            'data/store/dataset=load',
+        ],
+        'resources': ['entsoe_api'],
+    },
+    'fetch_net_positions': {
+        'script': 'scripts/fetch_netoposition.py',
+        'args': ['--start', '{since}', '--end', '{until}'],
+        'inputs': [],
+        'outputs': ['data/store/dataset=net_position'],
+        'resources': ['entsoe_api'],
+    },
+    'fetch_weather': {
+        'script': 'scripts/weather_data_fetcher.py',
+        'args': ['--start', '{since}', '--end', '{until_inclusive}'],
+        'inputs': [],
+        'outputs': [
+            'data/raw/hourly_weather_HU_DE_weeks29_30.csv',
+            'data/raw/daily_max_weather_HU_DE_weeks29_30.csv',
+        ],
+        'resources': ['open_meteo_api'],
+    },
+    'process_weather': {
+        'script': 'scripts/process_weather_data.py',
+        'args': [],
+        'inputs': [
+            'data/raw/hourly_weather_HU_DE_weeks29_30.csv',
+            'data/raw/daily_max_weather_HU_DE_weeks29_30.csv',
+            'scripts/config/weather_weights.csv',
+        ],
+        'outputs': [
+            'data/processed/hourly_weather_wide_weeks29_30.csv',
+            'data/processed/daily_max_weather_wide_weeks29_30.csv',
+        ],
+    },
+    'normalize_generation': {
+        'script': 'scripts/generation_mix.py',
+        'args': [],
+        'inputs': ['data/store/dataset=generation'],
+        'outputs': ['data/store/dataset=generation_mix'],
+    },
+    'price_drivers': {
+        'script': 'scripts/price_drivers.py',
+        'args': ['--start', '{since}', '--end', '{until}'],
+        'inputs': [
+            'data/store/dataset=prices',
+            'data/store/dataset=load',
+            'data/store/dataset=generation_mix',
+            'data/processed/hourly_weather_wide_weeks29_30.csv',
+        ],
+        'outputs': [
+            'data/processed/price_driver_contributions.parquet',
+            'data/processed/price_driver_fits.parquet',
+        ],
+    },
+    'leading_indicators': {
+        'script': 'scripts/lagged_correlation.py',
+        'args': ['--start', '{since}', '--end', '{until}', '--csv', 'data/reports/leading_indicators.csv'],
+        'inputs': [
+            'data/store/dataset=prices',
+            'data/store/dataset=flows',
+            'data/processed/hourly_weather_wide_weeks29_30.csv',
+        ],
+        'outputs': ['data/reports/leading_indicators.csv'],
+    },
+    'check_flows': {
+        'script': 'scripts/flow_consistency.py',
+        'args': ['--start', '{since}', '--end', '{until}', '--issues-csv', 'data/reports/flow_consistency_issues.csv'],
+        'inputs': ['data/store/dataset=flows', 'data/store/dataset=net_position'],
+        'outputs': ['data/reports/flow_consistency_issues.csv'],
+    },
+}
@@ -1,11 +1,58 @@
 import os
+import sys
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from entsoe import EntsoePandasClient
+from entsoe.exceptions import NoMatchingDataError
 from entsoe.mappings import NEIGHBOURS
 
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.rate_limit import RateLimiter
+from scripts.response_cache import cached_session
+from scripts.time_chunks import query_chunked
+from scripts.fetch_manifest import FetchManifest, fetch_missing
+from scripts.timeseries_store import TimeSeriesStore
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# data_type -> EntsoePandasClient method
+QUERY_METHODS = {
+    'load': 'query_load',
+    'generation': 'query_generation',
+    'prices': 'query_day_ahead_prices',
+    'net_position': 'query_net_position',
+    'flows': 'query_crossborder_flows',
+}
+
+# throttled or unavailable answers are retried with exponential backoff, or after Retry-After
+RETRY_STATUSES = (429, 503)
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5  # seconds, doubled per retry
+
+
+def entsoe_client(api_key: str, session=None, **kwargs) -> EntsoePandasClient:
+    """
+    EntsoePandasClient retrying RETRY_STATUSES up to MAX_RETRIES times.
+    Responses go through the on-disk cache of scripts/response_cache.py unless a session is given.
+    entsoe-py reads its url from ENTSOE_ENDPOINT_URL when it is imported, which points the
+    fetchers at a local stand-in (benchmarks/replay_server.py).
+    """
+    session = session or cached_session()
+    retry = Retry(total=MAX_RETRIES, connect=0, read=0, status_forcelist=RETRY_STATUSES,
+                  backoff_factor=RETRY_BACKOFF, respect_retry_after_header=True, raise_on_status=False)
+    for prefix in ('http://', 'https://'):
+        session.mount(prefix, HTTPAdapter(max_retries=retry))
+    return EntsoePandasClient(api_key=api_key, session=session, **kwargs)
+
+
 class EntsoeFetcher:
     """
     Attributes:
@@ -13,45 +60,136 @@ class EntsoeFetcher:
         start_date (pd.Timestamp): start date for data queries.
         end_date (pd.Timestamp): end date for data queries.
         output_dir (str): The directory where fetched data will be saved.
+        store (TimeSeriesStore): parquet store rooted at output_dir, every series is written through it.
+        max_workers (int): max number of queries in flight in fetch_batch.
+        limiter (RateLimiter): request budget shared by all worker threads.
+        chunk_freq (str): long ranges are split on these boundaries ('MS' monthly), None sends one request.
+        manifest (FetchManifest): intervals already in output_dir, None when incremental=False.
     """
-    def __init__(self, api_key: str, start_date: pd.Timestamp, end_date: pd.Timestamp, output_dir: str):
-        if not api_key:
+    def __init__(self, api_key: str, start_date: pd.Timestamp, end_date: pd.Timestamp, output_dir: str,
+                 max_workers: int = 4, requests_per_second: float | None = None, client=None,
+                 chunk_freq: str | None = 'MS', incremental: bool = True):
+        if client is None and not api_key:
             raise ValueError("ENTSO-E API key NEEDED, not found.")
         
-        self.client = EntsoePandasClient(api_key=api_key)
+        # a stub client can be passed in for offline runs
+        self.client = client if client is not None else entsoe_client(api_key)
         self.start_date = start_date
         self.end_date = end_date
         self.output_dir = output_dir
+        self.store = TimeSeriesStore(output_dir)
+        self.max_workers = max(1, max_workers)
+        self.limiter = RateLimiter(requests_per_second, burst=self.max_workers)
+        self.chunk_freq = chunk_freq
+        # caps requests in flight, also when jobs fan out into chunks
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        # re-runs only download what is not on disk yet
+        self.manifest = FetchManifest(os.path.join(output_dir, "manifest.json")) if incremental else None
         
         os.makedirs(self.output_dir, exist_ok=True)
         logging.info(f"EntsoeFetcher initialized for date range {start_date.date()} to {end_date.date()}")
 
-    def fetch_data(self, data_type: str, country_code: str):
+    def _query(self, data_type: str, *zones, start: pd.Timestamp | None = None, end: pd.Timestamp | None = None):
+        query_func = getattr(self.client, QUERY_METHODS[data_type])
+
+        def request(*args, start, end):
+            with self._slots:
+                self.limiter.acquire()
+                return query_func(*args, start=start, end=end)
+
+        return query_chunked(
+            request, *zones,
+            start=start if start is not None else self.start_date,
+            end=end if end is not None else self.end_date,
+            chunk_freq=self.chunk_freq, max_workers=self.max_workers,
+            skip_errors=(NoMatchingDataError,),
+        )
+
+    def _run_job(self, data_type: str, country_code: str, neighbour: str | None = None) -> dict:
+        """
+        Fetches and saves one series, raises on failure.
+        """
+        if data_type not in QUERY_METHODS:
+            raise ValueError(f"query '{data_type}' not supported.")
+        if data_type == 'flows' and not neighbour:
+            raise ValueError("flows need a neighbour zone.")
+
+        zones = (country_code, neighbour) if data_type == 'flows' else (country_code,)
+
+        def save(data):
+            return self.store.write(data_type, country_code, data, neighbour=neighbour)
+
+        if self.manifest is None:
+            data = self._query(data_type, *zones)
+            return {'rows': len(data), 'path': save(data)}
+
+        rows = fetch_missing(
+            self.manifest, FetchManifest.key(data_type, country_code, neighbour),
+            lambda start, end: self._query(data_type, *zones, start=start, end=end), save,
+            self.start_date, self.end_date,
+            exists=self.store.has(data_type, country_code, neighbour), chunk_freq=self.chunk_freq,
+        )
+        return {'rows': rows, 'path': self.store.series_dir(data_type, country_code, neighbour)}
 
-        query_methods = {
-            'load': self.client.query_load,
-            'generation': self.client.query_generation,
-            'prices': self.client.query_day_ahead_prices,
-            'net_position': self.client.query_net_position
-        }
+    def fetch_data(self, data_type: str, country_code: str):
 
-        if data_type not in query_methods:
+        if data_type not in QUERY_METHODS or data_type == 'flows':
             logging.error(f" query '{data_type}' not supported.")
             return
 
-        filepath = os.path.join(self.output_dir, f"{data_type}_{country_code}.csv")
         logging.info(f"Fetching {data_type} data for {country_code}...")
 
         try:
-            query_func = query_methods[data_type]
-            data = query_func(country_code, start=self.start_date, end=self.end_date)
-            
-            data.to_csv(filepath)
-            logging.info(f"Fetched and saved data to {filepath}")
+            result = self._run_job(data_type, country_code)
+            logging.info(f"Fetched and saved data to {result['path']}")
 
         except Exception as e:
             logging.error(f"Failed to fetch {data_type} for {country_code}. Error: {e}")
 
+    def fetch_batch(self, jobs) -> pd.DataFrame:
+        """
+        Runs (data_type, zone[, neighbour]) jobs on a thread pool of max_workers,
+        paced by the limiter. Failures are reported, not raised.
+
+        Returns:
+            pd.DataFrame: one row per job with status (ok, empty when ENTSO-E has no data for it,
+            failed), seconds, rows, path and error.
+        """
+        jobs = [tuple(job) + (None,) * (3 - len(job)) for job in jobs]
+        logging.info(f"Running batch of {len(jobs)} jobs with {self.max_workers} workers...")
+
+        def timed(job):
+            t0 = time.perf_counter()
+            try:
+                result = self._run_job(*job)
+                return {'status': 'ok', 'seconds': time.perf_counter() - t0, 'error': None, **result}
+            except NoMatchingDataError as e:
+                return {'status': 'empty', 'seconds': time.perf_counter() - t0, 'error': str(e), 'rows': 0, 'path': None}
+            except Exception as e:
+                return {'status': 'failed', 'seconds': time.perf_counter() - t0, 'error': str(e), 'rows': 0, 'path': None}
+
+        records = []
+        t_batch = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(timed, job): job for job in jobs}
+            for future in as_completed(futures):
+                data_type, zone, neighbour = futures[future]
+                record = {'data_type': data_type, 'zone': zone, 'neighbour': neighbour, **future.result()}
+                label = f"{data_type} {zone}" + (f"->{neighbour}" if neighbour else "")
+                if record['status'] == 'ok':
+                    logging.info(f"{label}: {record['rows']} rows in {record['seconds']:.2f}s")
+                elif record['status'] == 'empty':
+                    logging.warning(f"{label}: no data after {record['seconds']:.2f}s")
+                else:
+                    logging.error(f"{label} failed after {record['seconds']:.2f}s. Error: {record['error']}")
+                records.append(record)
+
+        report = pd.DataFrame(records, columns=['data_type', 'zone', 'neighbour', 'status', 'seconds', 'rows', 'path', 'error'])
+        counts = report['status'].value_counts()
+        logging.info(f"Batch done in {time.perf_counter() - t_batch:.2f}s: {counts.get('ok', 0)} ok, "
+                     f"{counts.get('empty', 0)} empty, {counts.get('failed', 0)} failed.")
+        return report
+
     def fetch_all_crossborder_flows(self, country_code: str):
 
         if country_code not in NEIGHBOURS:
@@ -61,26 +199,12 @@ class EntsoeFetcher:
         neighbours = NEIGHBOURS[country_code]
         logging.info(f"Fetching cross-border flows for {country_code}. Neighbours: {neighbours}")
 
+        # do From -> To and To -> From
+        jobs = []
         for neighbour in neighbours:
-            # do From -> To
-            try:
-                logging.info(f"Fetching flows from {country_code} to {neighbour}...")
-                flows_out = self.client.query_crossborder_flows(country_code, neighbour, start=self.start_date, end=self.end_date)
-                filepath_out = os.path.join(self.output_dir, f"flows_{country_code}_{neighbour}.csv")
-                flows_out.to_csv(filepath_out)
-                logging.info(f"Successfully saved flows to {filepath_out}")
-            except Exception as e:
-                logging.error(f"Could not fetch flows from {country_code} to {neighbour}. Error: {e}")
-            
-            # do To -> From
-            try:
-                logging.info(f"Fetching flows from {neighbour} to {country_code}...")
-                flows_in = self.client.query_crossborder_flows(neighbour, country_code, start=self.start_date, end=self.end_date)
-                filepath_in = os.path.join(self.output_dir, f"flows_{neighbour}_{country_code}.csv")
-                flows_in.to_csv(filepath_in)
-                logging.info(f"Successfully saved flows to {filepath_in}")
-            except Exception as e:
-                logging.error(f"Could not fetch flows from {neighbour} to {country_code}. Error: {e}")
+            jobs.append(('flows', country_code, neighbour))
+            jobs.append(('flows', neighbour, country_code))
+        return self.fetch_batch(jobs)
 
 
 # if __name__ == "__main__":
@@ -106,5 +230,10 @@ class EntsoeFetcher:
 #     # 4. Fetch all cross-border flows for specific countries efficiently
 #     for country in ["HU", "SK", "AT"]:
 #         fetcher.fetch_all_crossborder_flows(country)
+
+#     # or everything at once on the worker pool
+#     jobs = [(data_type, country) for country in countries_to_fetch for data_type in data_types_to_fetch]
+#     jobs += [('flows', 'HU', 'AT'), ('flows', 'AT', 'HU')]
+#     report = fetcher.fetch_batch(jobs)
         
 #     logging.info("--- Data fetching process complete. ---")
\ No newline at end of file
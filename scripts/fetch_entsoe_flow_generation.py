@@ -1,61 +1,126 @@
 import os
+import sys
+import argparse
 import pandas as pd
-from entsoe import EntsoePandasClient
+from entsoe.exceptions import NoMatchingDataError
 from entsoe.mappings import NEIGHBOURS
 from dotenv import load_dotenv
 
-def fetch_entsoe_data(api_key, start_date, end_date, output_dir):
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.entsoe_fetcher import entsoe_client
+from scripts.time_chunks import query_chunked
+from scripts.fetch_manifest import FetchManifest, fetch_missing
+from scripts.flow_planner import plan_flow_jobs, EmptyBorderCache, estimate_requests, print_plan
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR
+
+# FBMC 13 with LU/DE merged
+cwe_countries = ["AT", "BE", "FR", "DE_LU", "NL", "SK", "CZ", "PL"]
+other_countries = ["HU", "RO", "SI", "HR"]
+all_countries = cwe_countries + other_countries
+
+def fetch_entsoe_data(api_key, start_date, end_date, output_dir, chunk_freq='MS', max_workers=4,
+                      dry_run=False, retry_empty=False):
+    """
+    Returns:
+        tuple: the planned flow jobs and the jobs that failed (no data is not a failure).
+    """
 
-    client = EntsoePandasClient(api_key=api_key)
     os.makedirs(output_dir, exist_ok=True)
+    store = TimeSeriesStore(output_dir)
+    manifest = FetchManifest(os.path.join(output_dir, "manifest.json"))
+
+    # only real borders, minus the ones that came back empty before
+    empty_borders = EmptyBorderCache(os.path.join(output_dir, "empty_borders.json"))
+    planned = plan_flow_jobs(all_countries)
+    flow_jobs = planned if retry_empty else empty_borders.filter(planned)
+
+    if dry_run:
+        n_requests = estimate_requests(flow_jobs, start_date, end_date, chunk_freq, manifest,
+                                       key_func=lambda job: FetchManifest.key('flows', *job))
+        print_plan(flow_jobs, n_requests, skipped=[job for job in planned if job not in flow_jobs])
+        return flow_jobs, []
+
+    client = entsoe_client(api_key)
+
+    # only the intervals missing from the store are requested, as parallel monthly (chunk_freq)
+    # requests, and upserted into it
+    def fetch(dataset, zone, query_func, *args, neighbour=None, **kwargs):
+        def query(start, end):
+            return query_chunked(query_func, *args, start=start, end=end, chunk_freq=chunk_freq,
+                                 max_workers=max_workers, skip_errors=(NoMatchingDataError,), **kwargs)
 
+        def save(data):
+            store.write(dataset, zone, data, neighbour=neighbour)
+
+        return fetch_missing(manifest, FetchManifest.key(dataset, zone, neighbour), query, save,
+                             start_date, end_date, exists=store.has(dataset, zone, neighbour), chunk_freq=chunk_freq)
+
+    failed = []
     countries = {"HU", "DE_LU"}
     for country in countries:
         try:
             print(f"Fetching spot prices for {country}...")
-            prices = client.query_day_ahead_prices(country, start=start_date, end=end_date)
-            prices.to_csv(os.path.join(output_dir, f"{country}_spot_prices.csv"))
-            print(f"fetched, saved spot prices for {country}.")
+            rows = fetch('prices', country, client.query_day_ahead_prices, country)
+            print(f"fetched, saved spot prices for {country} ({rows} new rows).")
+        except NoMatchingDataError as e:
+            print(f"no spot prices for {country}: {e}")
         except Exception as e:
+            failed.append(('prices', country))
             print(f"Error for {country}: {e}")
 
     for country in countries:
+        print(f"Fetching generation and load for {country}...")
+        for dataset, query_func, kwargs in [('generation', client.query_generation, {'psr_type': None}),
+                                            ('load', client.query_load, {})]:
+            try:
+                fetch(dataset, country, query_func, country, **kwargs)
+            except NoMatchingDataError as e:
+                print(f"no {dataset} for {country}: {e}")
+            except Exception as e:
+                failed.append((dataset, country))
+                print(f"fetching {dataset} failed for {country}: {e}")
+
+    # total flow 
+    for country_from, country_to in flow_jobs:
         try:
-            print(f"Fetching generation and load for {country}...")
-            generation = client.query_generation(country, start=start_date, end=end_date, psr_type=None)
-            load = client.query_load(country, start=start_date, end=end_date)
-            
-            generation.to_csv(os.path.join(output_dir, f"{country}_generation.csv"))
-            load.to_csv(os.path.join(output_dir, f"{country}_load.csv"))
+            print(f"Fetching cross-border flows from {country_from} to {country_to}...")
+            rows = fetch('flows', country_from, client.query_crossborder_flows, country_from, country_to,
+                         neighbour=country_to)
+            print(f"Successfully fetched and saved cross-border flows from {country_from} to {country_to} ({rows} new rows).")
+        except NoMatchingDataError as e:
+            empty_borders.add(country_from, country_to)
+            print(f"no data for border {country_from} -> {country_to}, cached as empty: {e}")
         except Exception as e:
-            print(f"fetching generation and load failed for {country}: {e}")
+            failed.append(('flows', country_from, country_to))
+            print(f"fetching cross-border flows from {country_from} to {country_to} failed: {e}")
 
-    # total flow 
-    cwe_countries = ["AT", "BE", "FR", "DE_LU", "NL", "SK", "CZ", "PL"]# FBMC 13 with LU/DE merged
-    other_countries = ["HU", "RO", "SI", "HR"]
-    all_countries = cwe_countries + other_countries
-    #all_countries = list(NEIGHBOURS.keys())  # 
-
-    for country_from in all_countries:
-        for country_to in all_countries:
-            if country_from != country_to:
-                try:
-                    print(f"Fetching cross-border flows from {country_from} to {country_to}...")
-                    flows = client.query_crossborder_flows(country_from, country_to, start=start_date, end=end_date)
-                    flows.to_csv(os.path.join(output_dir, f"flows_{country_from}_{country_to}.csv"))
-                    print(f"Successfully fetched and saved cross-border flows from {country_from} to {country_to}.")
-                except Exception as e:
-                    print(f"the countries likely not neighbours, fetching cross-border flows from {country_from} to {country_to}: {e}")
+    if failed:
+        print(f"{len(failed)} fetch jobs failed: {', '.join('/'.join(job) for job in failed)}")
+    return flow_jobs, failed
 
 
 if __name__ == "__main__":
 
+    parser = argparse.ArgumentParser(description="Fetch ENTSO-E prices, generation, load and cross-border flows.")
+    parser.add_argument("--dry-run", action="store_true", help="print the planned flow jobs and request count, fetch nothing")
+    parser.add_argument("--retry-empty", action="store_true", help="also query borders cached as empty")
+    parser.add_argument("--start", default="2025-07-07", help="first day, Europe/Brussels")
+    parser.add_argument("--end", default="2025-08-04", help="end day (exclusive), Europe/Brussels")
+    args = parser.parse_args()
+
     load_dotenv()
     entsoe_api_key = os.getenv("ENTSOE_API_KEY")
     
-    start = pd.Timestamp("2025-07-07", tz="Europe/Brussels")
-    end = pd.Timestamp("2025-08-04", tz="Europe/Brussels")
+    start = pd.Timestamp(args.start, tz="Europe/Brussels")
+    end = pd.Timestamp(args.end, tz="Europe/Brussels")
 
-    output_dir = "C:\\Users\\micha\\code\\power-market-analysis-de-hu\\data\\processed"
+    output_dir = DEFAULT_STORE_DIR
 
-    fetch_entsoe_data(entsoe_api_key, start, end, output_dir)
+    _, failed = fetch_entsoe_data(entsoe_api_key, start, end, output_dir, dry_run=args.dry_run,
+                                  retry_empty=args.retry_empty)
+    # non-zero exit so a pipeline run sees the failure and retries it
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import tempfile
+import threading
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.time_chunks import split_date_range
+
+
+def write_atomic(filepath: str, write):
+    """
+    write(tmp_path) into a temp file next to filepath, then swap it in with os.replace.
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp_", suffix=os.path.splitext(filepath)[1])
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FetchManifest:
+    """
+    Records which UTC intervals of each series are already on disk, keyed by (data_type, zone, direction).
+
+    Attributes:
+        path (str): JSON file the manifest is persisted to.
+        entries (dict): key -> sorted list of disjoint [start, end) UTC intervals.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path) as f:
+                raw = json.load(f)
+            self.entries = {
+                key: [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in intervals]
+                for key, intervals in raw.items()
+            }
+
+    @staticmethod
+    def key(data_type: str, zone: str, direction: str | None = None) -> str:
+        return f"{data_type}|{zone}|{direction or ''}"
+
+    def intervals(self, key: str) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        with self._lock:
+            return list(self.entries.get(key, []))
+
+    def missing(self, key: str, start: pd.Timestamp, end: pd.Timestamp) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+        """
+        Gaps of [start, end) not covered yet, returned in the timezone of start.
+        """
+        tz = start.tz
+        cursor, stop = start.tz_convert('UTC'), end.tz_convert('UTC')
+        gaps = []
+        for s, e in self.intervals(key):
+            if e <= cursor:
+                continue
+            if s >= stop:
+                break
+            if s > cursor:
+                gaps.append((cursor, s))
+            cursor = max(cursor, e)
+        if cursor < stop:
+            gaps.append((cursor, stop))
+        return [(s.tz_convert(tz), e.tz_convert(tz)) for s, e in gaps]
+
+    def record(self, key: str, start: pd.Timestamp, end: pd.Timestamp):
+        """
+        Marks [start, end) as on disk, merges it with touching intervals and saves.
+        """
+        self.record_many(key, [(start, end)])
+
+    def record_many(self, key: str, intervals: list[tuple[pd.Timestamp, pd.Timestamp]]):
+        """
+        record for several [start, end) intervals, saved once.
+        """
+        if not intervals:
+            return
+        new = [(s.tz_convert('UTC'), e.tz_convert('UTC')) for s, e in intervals]
+        with self._lock:
+            merged = []
+            for s, e in sorted(self.entries.get(key, []) + new):
+                if merged and s <= merged[-1][1]:
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+                else:
+                    merged.append((s, e))
+            self.entries[key] = merged
+            self._save()
+
+    def forget(self, key: str):
+        with self._lock:
+            if self.entries.pop(key, None) is not None:
+                self._save()
+
+    def _save(self):
+        raw = {key: [[s.isoformat(), e.isoformat()] for s, e in intervals] for key, intervals in self.entries.items()}
+
+        def write(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(raw, f, indent=1, sort_keys=True)
+
+        write_atomic(self.path, write)
+
+
+def _covered(data, windows: list[tuple[pd.Timestamp, pd.Timestamp]]) -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    The windows (chunks of one request) that returned rows. A window counts up to its last row,
+    so a series stopping early (e.g. today not published yet) is not recorded past it.
+    """
+    index = data.index
+    if not isinstance(index, pd.DatetimeIndex):
+        return windows
+    # 15 min is the finest ENTSO-E resolution, safe guess for a single row
+    step = pd.Series(index).diff().median() if len(index) > 1 else pd.Timedelta('15min')
+    covered = []
+    for s, e in windows:
+        rows = index[(index >= s) & (index < e)]
+        if len(rows):
+            covered.append((s, min(e, rows.max() + step)))
+    return covered
+
+
+def fetch_missing(manifest: FetchManifest, key: str, fetch, save, start: pd.Timestamp, end: pd.Timestamp,
+                  exists: bool = True, chunk_freq: str | None = None) -> int:
+    """
+    Calls fetch(gap_start, gap_end) only for the parts of [start, end) not on disk yet,
+    hands the results to save(data) and records them in the manifest.
+
+    Only the chunks of a gap that returned rows are recorded, so a chunk that came back
+    empty (NoMatchingDataError) or was skipped is requested again on the next run.
+
+    Args:
+        exists (bool): False when the series is gone from disk, the manifest entry is dropped.
+        chunk_freq (str): chunk boundaries fetch splits a gap on, None for one request per gap.
+
+    Returns:
+        int: number of rows saved.
+    """
+    if not exists:
+        manifest.forget(key)
+
+    rows = 0
+    for gap_start, gap_end in manifest.missing(key, start, end):
+        data = fetch(gap_start, gap_end)
+        if data is None or not len(data):
+            continue
+        save(data)
+        manifest.record_many(key, _covered(data, split_date_range(gap_start, gap_end, chunk_freq)))
+        rows += len(data)
+    return rows
@@ -1,37 +1,54 @@
-import pandas as pd
-from dotenv import load_dotenv
 import os
-from entsoe_fetcher import EntsoeFetcher
+import sys
+import argparse
 import logging
+import pandas as pd
+from dotenv import load_dotenv
 
-load_dotenv()
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+from scripts.entsoe_fetcher import EntsoeFetcher
+from scripts.timeseries_store import DEFAULT_STORE_DIR
 
-entsoe_api_key = os.getenv("ENTSOE_API_KEY")
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-start_date = pd.Timestamp('2025-07-07', tz='Europe/Brussels')
-end_date = pd.Timestamp('2025-08-04', tz='Europe/Brussels')
 # CWE FBMC coupled set
 country_codes = ['AT', 'BE', 'BG', 'CZ', 'DE_LU', 'FR', 'HR', 'HU', 'NL', 'PL', 'RO', 'SI', 'SK']
 #what is wrong with RO
-output_dir = os.path.join("data", "processed", "net_balances")
-os.makedirs(output_dir, exist_ok=True)
-
-logging.info(f"doing data fetch for {len(country_codes)} countries from {start_date.date()} to {end_date.date()}.")
-
-fetcher = EntsoeFetcher(
-    api_key=entsoe_api_key, 
-    start_date=start_date, 
-    end_date=end_date, 
-    output_dir=output_dir
-)
-
-logging.info("Fetching net positions...")
-for country_code in country_codes:
-    fetcher.fetch_data(
-        data_type='net_position',
-        country_code=country_code
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch ENTSO-E net positions of the coupled zones.")
+    parser.add_argument("--start", default="2025-07-07", help="first day, Europe/Brussels")
+    parser.add_argument("--end", default="2025-08-04", help="end day (exclusive), Europe/Brussels")
+    args = parser.parse_args()
+
+    load_dotenv()
+    entsoe_api_key = os.getenv("ENTSOE_API_KEY")
+
+    start_date = pd.Timestamp(args.start, tz='Europe/Brussels')
+    end_date = pd.Timestamp(args.end, tz='Europe/Brussels')
+    output_dir = DEFAULT_STORE_DIR  # dataset=net_position in the parquet store
+    os.makedirs(output_dir, exist_ok=True)
+
+    logging.info(f"doing data fetch for {len(country_codes)} countries from {start_date.date()} to {end_date.date()}.")
+
+    fetcher = EntsoeFetcher(
+        api_key=entsoe_api_key, 
+        start_date=start_date, 
+        end_date=end_date, 
+        output_dir=output_dir,
+        chunk_freq='MS'  # monthly requests, stitched, for multi-year ranges
     )
 
-logging.info("fetching done")
+    logging.info("Fetching net positions...")
+    results = fetcher.fetch_batch([('net_position', country_code) for country_code in country_codes])
+
+    logging.info("fetching done")
+    # non-zero exit so a pipeline run sees the failure and retries it, no data is not a failure
+    if (results['status'] == 'failed').any():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
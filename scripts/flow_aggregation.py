@@ -0,0 +1,70 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.graph_builder import FlowTensor
+from scripts.config.market_config import MARKET_TZ, PEAK_HOURS
+
+AGGREGATION_LEVELS = {
+    'raw': 'Raw',
+    'hourly': 'Hourly mean',
+    'daily_mean': 'Daily mean',
+    'daily_max': 'Daily max',
+    'peak': 'Peak hours mean',
+}
+
+LABEL_FORMATS = {
+    'raw': '%Y-%m-%d %H:%M',
+    'hourly': '%Y-%m-%d %H:%M',
+    'daily_mean': '%Y-%m-%d',
+    'daily_max': '%Y-%m-%d',
+    'peak': '%Y-%m-%d',
+}
+
+
+def aggregate_flows(tensor, level):
+    """
+    FlowTensor at another resolution, all edges in one resample.
+
+    daily_max keeps the sign of the largest absolute flow of the day,
+    peak is the mean over the peak block of each working day.
+    """
+    if level == 'raw':
+        return tensor
+    if level not in AGGREGATION_LEVELS:
+        raise ValueError(f"aggregation level '{level}' not supported.")
+
+    frame = pd.DataFrame(np.asarray(tensor.values).T, index=tensor.index)
+
+    if level == 'hourly':
+        out = frame.resample('h').mean()
+    else:
+        local = frame.tz_convert(MARKET_TZ)
+        if level == 'daily_mean':
+            out = local.resample('D').mean()
+        elif level == 'daily_max':
+            days = local.resample('D')
+            high, low = days.max(), days.min()
+            out = high.where(high.abs() >= low.abs(), low)
+        else:
+            hours = local.index.hour
+            in_peak = (local.index.dayofweek < 5) & (hours >= PEAK_HOURS[0]) & (hours < PEAK_HOURS[1])
+            out = local[in_peak].resample('D').mean()
+        out.index = out.index.tz_convert('UTC')
+
+    out = out.dropna(how='all')
+    return FlowTensor(out.index, tensor.edges, np.ascontiguousarray(out.to_numpy(dtype=np.float32).T))
+
+
+def format_labels(index, level):
+    """
+    Slider/title labels for a slice of an aggregated index, daily levels are labelled by market day.
+    """
+    if level in ('raw', 'hourly'):
+        return list(index.strftime(LABEL_FORMATS[level]))
+    return list(index.tz_convert(MARKET_TZ).strftime(LABEL_FORMATS[level]))
@@ -0,0 +1,195 @@
+"""
+Transit, loop-flow and path decomposition of the cross-border flows, for all timestamps at once.
+
+Works on the FlowTensor of the flow graph: the rows of a border are first netted to one
+signed flow per border (a -> b positive, a < b), then
+
+    node_balances  inflow, outflow, net export and transit (min of in and out) per zone
+    loop_flows     circulating component of the border flows, the projection on the cycle space
+    transit_paths  MW from a source zone to a sink zone passing each other zone,
+                   by proportional sharing (flows leave a zone in the mix they arrived in)
+
+Each is a few matrix products or one batched linear solve over the time axis, no per-timestamp
+graph calls.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+# timestamps per batched solve in transit_paths, bounds the (T x N x N) work arrays
+SOLVE_CHUNK = 8760
+
+
+def border_flows(tensor) -> tuple[list, list, np.ndarray]:
+    """
+    Net flow per border as a (borders x time) float64 array, NaN where no row of the border has data.
+
+    Returns:
+        nodes (list), borders (list of (a, b), a < b), flows (np.ndarray)
+    """
+    borders = sorted({tuple(sorted(edge)) for edge in tensor.edges})
+    nodes = sorted({z for border in borders for z in border})
+    position = {border: i for i, border in enumerate(borders)}
+
+    values = np.asarray(tensor.values, dtype=np.float64)
+    flows = np.zeros((len(borders), values.shape[1]))
+    seen = np.zeros((len(borders), values.shape[1]), dtype=bool)
+    for row, (u, v) in enumerate(tensor.edges):
+        i = position[tuple(sorted((u, v)))]
+        sign = 1.0 if u < v else -1.0
+        present = ~np.isnan(values[row])
+        flows[i] += sign * np.where(present, values[row], 0.0)
+        seen[i] |= present
+    flows[~seen] = np.nan
+    return nodes, borders, flows
+
+
+def incidence(nodes: list, borders: list) -> np.ndarray:
+    """
+    (nodes x borders), +1 at a and -1 at b for border (a, b).
+    """
+    position = {z: i for i, z in enumerate(nodes)}
+    B = np.zeros((len(nodes), len(borders)))
+    for k, (a, b) in enumerate(borders):
+        B[position[a], k] = 1.0
+        B[position[b], k] = -1.0
+    return B
+
+
+def node_balances(tensor) -> dict[str, pd.DataFrame]:
+    """
+    (time x zone) frames: inflow, outflow, net (export positive) and transit = min(inflow, outflow).
+    Borders without data count as zero, timestamps without any data are NaN.
+    """
+    nodes, borders, F = border_flows(tensor)
+    B = incidence(nodes, borders)
+    forward, backward = np.maximum(np.nan_to_num(F), 0), np.maximum(-np.nan_to_num(F), 0)
+    Bp, Bm = (B > 0).astype(float), (B < 0).astype(float)
+
+    outflow = (Bp @ forward + Bm @ backward).T
+    inflow = (Bm @ forward + Bp @ backward).T
+    empty = np.isnan(F).all(axis=0)
+    outflow[empty] = inflow[empty] = np.nan
+
+    frame = lambda data: pd.DataFrame(data, index=tensor.index, columns=nodes)
+    return {
+        'inflow': frame(inflow),
+        'outflow': frame(outflow),
+        'net': frame(outflow - inflow),
+        'transit': frame(np.minimum(inflow, outflow)),
+    }
+
+
+def cycle_projector(B: np.ndarray) -> np.ndarray:
+    """
+    (borders x borders) orthogonal projection on the cycle space (kernel of B).
+    """
+    return np.eye(B.shape[1]) - np.linalg.pinv(B) @ B
+
+
+def loop_flows(tensor, flows: tuple | None = None) -> pd.DataFrame:
+    """
+    (time x border) circulating component of the border flows, columns 'a-b'.
+
+    The rest of the flow is the smallest flow pattern that moves the same net positions,
+    the loop part moves power around cycles of the graph without changing any net position.
+
+    Args:
+        flows (tuple): border_flows(tensor) when the caller has it already.
+    """
+    nodes, borders, F = flows if flows is not None else border_flows(tensor)
+    loops = (cycle_projector(incidence(nodes, borders)) @ np.nan_to_num(F)).T
+    loops[np.isnan(F).all(axis=0)] = np.nan
+    return pd.DataFrame(loops, index=tensor.index, columns=[f"{a}-{b}" for a, b in borders])
+
+
+def loop_throughput(tensor) -> pd.DataFrame:
+    """
+    (time x zone) loop flow passing through each zone, half the loop flow on its borders.
+    """
+    flows = border_flows(tensor)
+    nodes, borders, _ = flows
+    loops = loop_flows(tensor, flows).to_numpy()
+    return pd.DataFrame(np.abs(loops) @ np.abs(incidence(nodes, borders)).T / 2,
+                        index=tensor.index, columns=nodes)
+
+
+def _solve(A, b):
+    try:
+        return np.linalg.solve(A, b)
+    except np.linalg.LinAlgError:
+        # a flow cycle without any sink, rare; least squares per timestamp
+        return np.stack([np.linalg.lstsq(a, y, rcond=None)[0] for a, y in zip(A, b)])
+
+
+def _trace(G):
+    """
+    Proportional sharing on (T x N x N) directed flows G[t, i, j] >= 0.
+
+    Returns:
+        origin (T x N x N): MW passing zone j that was injected at zone s, [t, j, s].
+        fate (T x N x N): share of the throughput of zone j that is withdrawn at zone d, [t, j, d].
+        withdrawal (T x N): net import of each zone.
+    """
+    outflow, inflow = G.sum(axis=2), G.sum(axis=1)
+    injection = np.maximum(outflow - inflow, 0)
+    withdrawal = np.maximum(inflow - outflow, 0)
+    throughput = inflow + injection
+    inv = np.divide(1.0, throughput, out=np.zeros_like(throughput), where=throughput > 0)
+
+    eye = np.eye(G.shape[1])
+    # X[j, s] = injection_j [j == s] + sum_i G[i, j] / P_i X[i, s]
+    origin = _solve(eye - np.swapaxes(G, 1, 2) * inv[:, None, :], injection[:, :, None] * eye)
+    # H[j, d] = withdrawal_j / P_j [j == d] + sum_k G[j, k] / P_j H[k, d]
+    fate = _solve(eye - G * inv[:, :, None], (withdrawal * inv)[:, :, None] * eye)
+    return origin, fate, withdrawal
+
+
+def transit_paths(tensor, source: str, sink: str, via=None) -> pd.DataFrame:
+    """
+    (time x zone) MW of source's exports withdrawn at sink that pass each via zone,
+    plus 'delivered', all that gets from source to sink (the via columns need not add up to it,
+    parallel paths can share zones).
+
+    e.g. transit_paths(tensor, 'DE_LU', 'HU', via=['AT', 'SK']) splits DE->HU power by route.
+    """
+    nodes, borders, F = border_flows(tensor)
+    position = {z: i for i, z in enumerate(nodes)}
+    for zone in (source, sink, *(via or [])):
+        if zone not in position:
+            raise KeyError(f"zone '{zone}' has no borders in the flow data.")
+    via = [z for z in (via or nodes) if z not in (source, sink)]
+    s, d = position[source], position[sink]
+    a = np.array([position[x] for x, _ in borders])
+    b = np.array([position[y] for _, y in borders])
+
+    flows = np.nan_to_num(F).T
+    result = np.empty((len(tensor.index), len(via) + 1))
+    for start in range(0, len(flows), SOLVE_CHUNK):
+        chunk = flows[start:start + SOLVE_CHUNK]
+        G = np.zeros((len(chunk), len(nodes), len(nodes)))
+        G[:, a, b] = np.maximum(chunk, 0)
+        G[:, b, a] = np.maximum(-chunk, 0)
+        origin, fate, _ = _trace(G)
+        from_source = origin[:, :, s]               # MW of source's power at each zone
+        result[start:start + len(chunk), :-1] = from_source[:, [position[v] for v in via]] * fate[:, [position[v] for v in via], d]
+        result[start:start + len(chunk), -1] = from_source[:, d] * fate[:, d, d]
+
+    result[np.isnan(F).all(axis=0)] = np.nan
+    return pd.DataFrame(result, index=tensor.index, columns=via + ['delivered'])
+
+
+def dominant_paths(tensor, source: str, sink: str, top: int = 3) -> pd.DataFrame:
+    """
+    Zones carrying most of source->sink power on average, with their mean MW and share of the delivered power.
+    """
+    paths = transit_paths(tensor, source, sink)
+    delivered = paths.pop('delivered')
+    mean = paths.mean().sort_values(ascending=False).head(top)
+    share = mean / delivered.mean() if delivered.mean() > 0 else mean * np.nan
+    return pd.DataFrame({'via': mean.index, 'mean_mw': mean.values, 'share': share.values})
@@ -0,0 +1,233 @@
+"""
+Reconciles physical cross-border flows with reported net positions.
+
+For every timestamp the net position implied by the flows is (exports - imports) over the
+borders of graph_config.NEIGHBORS, computed for all timestamps and zones at once as one
+sparse incidence-matrix product. It is compared with the net_position dataset and the
+validator flags residuals, borders without any flow data and gaps.
+
+Borders to zones outside the graph (e.g. DE_LU-CH) are included when the store has flows
+for them. A zone with an ENTSO-E border that has no flow data is 'open': its residual also
+contains the flows over that border, so it is reported but does not fail the gate.
+
+    python scripts/flow_consistency.py --start 2025-07-01 --end 2025-08-01
+exits with status 1 when a closed zone fails, so it can gate promotion of a dataset.
+"""
+import os
+import sys
+import argparse
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from entsoe.mappings import NEIGHBOURS
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.config import graph_config
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR, to_utc_timestamp
+from scripts.time_alignment import align_long
+
+ABS_TOLERANCE = 50.0   # MW
+REL_TOLERANCE = 0.05   # of the reported net position
+MAX_FLAGGED_SHARE = 0.01
+
+# historic or virtual areas in the ENTSO-E neighbour table, never a physical border today
+LEGACY_ZONES = {'DE_AT_LU', 'IT_NORD_AT', 'IT_NORD_CH', 'IT_NORD_FR'}
+
+
+def graph_borders(neighbors: dict = graph_config.NEIGHBORS) -> list[tuple[str, str]]:
+    """
+    Undirected borders of the graph, each once as (a, b) with a < b.
+    """
+    return sorted({tuple(sorted((zone, other))) for zone, others in neighbors.items() for other in others})
+
+
+def incidence_matrix(zones: list, borders: list) -> sparse.csr_matrix:
+    """
+    (zones x directed flows) matrix: the flow a->b of border (a, b) is column 2i, b->a column 2i+1,
+    +1 in the row of the sender, -1 in the row of the recipient.
+    """
+    position = {zone: i for i, zone in enumerate(zones)}
+    rows, cols, vals = [], [], []
+    for i, (a, b) in enumerate(borders):
+        for col, (sender, recipient) in ((2 * i, (a, b)), (2 * i + 1, (b, a))):
+            rows += [position[sender], position[recipient]]
+            cols += [col, col]
+            vals += [1.0, -1.0]
+    return sparse.csr_matrix((vals, (rows, cols)), shape=(len(zones), 2 * len(borders)))
+
+
+def external_borders(store: TimeSeriesStore, zones: list, neighbors: dict = graph_config.NEIGHBORS) -> list[tuple[str, str]]:
+    """
+    Borders from a graph zone to a zone outside the graph that have flow data in the store.
+    """
+    if not store.has('flows'):
+        return []
+    inside = set(neighbors) | set(zones)
+    out = set()
+    for zone, neighbour in store.series_keys('flows'):
+        if neighbour and (zone in inside) != (neighbour in inside) and not {zone, neighbour} & LEGACY_ZONES:
+            out.add(tuple(sorted((zone, neighbour))))
+    return sorted(out)
+
+
+def open_zones(zones: list, borders: list) -> dict[str, list]:
+    """
+    zone -> ENTSO-E neighbours without a border in borders, only zones that have any.
+    """
+    covered = {(a, b) for a, b in borders} | {(b, a) for a, b in borders}
+    out = {}
+    for zone in zones:
+        missing = sorted(n for n in NEIGHBOURS.get(zone, []) if n not in LEGACY_ZONES and (zone, n) not in covered)
+        if missing:
+            out[zone] = missing
+    return out
+
+
+def _matrix(aligned: pd.DataFrame, grid: pd.DatetimeIndex, columns: list, keys: list) -> np.ndarray:
+    """
+    (time x columns) array from an aligned long frame, NaN where there is no data.
+    """
+    if aligned.empty:
+        return np.full((len(grid), len(columns)), np.nan)
+    index = aligned.set_index(['timestamp'] + keys)['value']
+    index = index[~index.index.duplicated(keep='last')]
+    wide = index.unstack(keys)
+    if len(keys) > 1:
+        wide.columns = list(wide.columns.to_flat_index())
+    return wide.reindex(index=grid, columns=columns).to_numpy(dtype=float)
+
+
+def check_flow_consistency(store: TimeSeriesStore, start=None, end=None, freq: str = 'h',
+                           neighbors: dict = graph_config.NEIGHBORS, abs_tolerance: float = ABS_TOLERANCE,
+                           rel_tolerance: float = REL_TOLERANCE) -> dict[str, pd.DataFrame]:
+    """
+    Implied vs reported net positions for every zone of the graph.
+
+    Net positions are taken as positive for net exports.
+
+    Returns:
+        dict:
+            summary: one row per zone with coverage, residual statistics and the share of flagged timestamps.
+            issues: long (timestamp, zone, kind, implied, reported, residual) table,
+                    kind is 'residual' or 'gap'.
+            missing_borders: graph borders with no flow data in either direction in the window.
+            residuals: (time x zone) residual frame.
+    """
+    graph = graph_borders(neighbors)
+    zones = sorted({z for border in graph for z in border})
+    borders = graph + external_borders(store, zones, neighbors)
+    nodes = zones + sorted({z for border in borders for z in border} - set(zones))
+    A = incidence_matrix(nodes, borders)[:len(zones)]
+    directed = [pair for a, b in borders for pair in ((a, b), (b, a))]
+
+    flows = store.read('flows', zones=nodes, columns=['value'], start=start, end=end) if store.has('flows') else pd.DataFrame()
+    reported = store.read('net_position', zones=zones, columns=['value'], start=start, end=end) \
+        if store.has('net_position') else pd.DataFrame()
+
+    flows = align_long(flows, freq, 'mean', keys=['zone', 'neighbour'], columns=['value']) if len(flows) else flows
+    reported = align_long(reported, freq, 'mean', keys=['zone'], columns=['value']) if len(reported) else reported
+
+    stamps = pd.concat([f['timestamp'] for f in (flows, reported) if len(f)])
+    if stamps.empty:
+        raise ValueError("no flows or net positions in the store for this window.")
+    first = to_utc_timestamp(start) if start is not None else stamps.min()
+    last = to_utc_timestamp(end) if end is not None else stamps.max() + pd.tseries.frequencies.to_offset(freq)
+    grid = pd.date_range(first, last, freq=freq, inclusive='left', name='timestamp')
+
+    F = _matrix(flows, grid, directed, ['zone', 'neighbour'])    # time x directed flows
+    R = _matrix(reported, grid, zones, ['zone'])                  # time x zones
+
+    # a direction never reported while the reverse is, carries no flow
+    empty = np.isnan(F).all(axis=0)
+    reverse = np.arange(F.shape[1]) ^ 1
+    F[:, empty & ~empty[reverse]] = 0.0
+
+    # one sparse product for all timestamps, plus one to find zones touched by a missing flow
+    implied = (A @ np.nan_to_num(F).T).T
+    incomplete = (abs(A) @ np.isnan(F).T).T > 0
+    implied[incomplete] = np.nan
+
+    residual = implied - R
+    tolerance = np.maximum(abs_tolerance, rel_tolerance * np.abs(R))
+    flagged = np.abs(residual) > tolerance
+    gap = np.isnan(residual)
+
+    opened = open_zones(zones, borders)
+    abs_residual = np.abs(residual)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN zones
+        summary = pd.DataFrame({
+            'zone': zones,
+            'open': [z in opened for z in zones],
+            'unmonitored_borders': [", ".join(opened.get(z, [])) for z in zones],
+            'timestamps': len(grid),
+            'coverage': 1 - gap.mean(axis=0),
+            'mean_abs_residual': np.nanmean(abs_residual, axis=0),
+            'p95_abs_residual': np.nanpercentile(abs_residual, 95, axis=0),
+            'max_abs_residual': np.nanmax(abs_residual, axis=0),
+            'flagged': flagged.sum(axis=0),
+        })
+    summary['flagged_share'] = summary['flagged'] / max(1, len(grid))
+
+    t_idx, z_idx = np.nonzero(flagged | gap)
+    issues = pd.DataFrame({
+        'timestamp': grid[t_idx],
+        'zone': np.array(zones)[z_idx],
+        'kind': np.where(gap[t_idx, z_idx], 'gap', 'residual'),
+        'implied': implied[t_idx, z_idx],
+        'reported': R[t_idx, z_idx],
+        'residual': residual[t_idx, z_idx],
+    })
+
+    missing_borders = pd.DataFrame(
+        [(a, b) for i, (a, b) in enumerate(graph) if empty[2 * i] and empty[2 * i + 1]],
+        columns=['zone', 'neighbour'])
+
+    return {
+        'summary': summary,
+        'issues': issues,
+        'missing_borders': missing_borders,
+        'residuals': pd.DataFrame(residual, index=grid, columns=zones),
+    }
+
+
+def passes(result: dict, max_flagged_share: float = MAX_FLAGGED_SHARE) -> bool:
+    """
+    Gate: no missing borders and every closed zone within the flagged share.
+    """
+    closed = result['summary'][~result['summary']['open']]
+    gaps = 1 - closed['coverage']
+    return result['missing_borders'].empty and bool(((closed['flagged_share'] + gaps) <= max_flagged_share).all())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--freq", default='h')
+    parser.add_argument("--abs-tolerance", type=float, default=ABS_TOLERANCE)
+    parser.add_argument("--rel-tolerance", type=float, default=REL_TOLERANCE)
+    parser.add_argument("--max-flagged-share", type=float, default=MAX_FLAGGED_SHARE)
+    parser.add_argument("--issues-csv", help="write the flagged timestamps here")
+    args = parser.parse_args()
+
+    result = check_flow_consistency(TimeSeriesStore(args.store), args.start, args.end, args.freq,
+                                    abs_tolerance=args.abs_tolerance, rel_tolerance=args.rel_tolerance)
+
+    print(result['summary'].to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if not result['missing_borders'].empty:
+        print("\nBorders without flow data:")
+        print(result['missing_borders'].to_string(index=False))
+    if args.issues_csv:
+        os.makedirs(os.path.dirname(args.issues_csv) or ".", exist_ok=True)
+        result['issues'].to_csv(args.issues_csv, index=False)
+        print(f"\n{len(result['issues'])} issues written to {args.issues_csv}")
+
+    ok = passes(result, args.max_flagged_share)
+    print("\nPASS" if ok else "\nFAIL")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import threading
+import pandas as pd
+from entsoe.mappings import NEIGHBOURS
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.config import graph_config
+from scripts.time_chunks import split_date_range
+
+
+def plan_flow_jobs(zones, sources=('graph_config', 'entsoe')) -> list[tuple[str, str]]:
+    """
+    Directed (from, to) flow jobs between neighbouring zones, both directions, each edge once.
+
+    Args:
+        zones (list): zones to plan for, borders to zones outside this set are dropped.
+        sources (tuple): neighbour maps to merge, 'graph_config' (NEIGHBORS) and/or 'entsoe' (NEIGHBOURS).
+    """
+    neighbour_maps = {'graph_config': graph_config.NEIGHBORS, 'entsoe': NEIGHBOURS}
+    zone_set = set(zones)
+
+    edges = set()
+    for source in sources:
+        for zone, neighbours in neighbour_maps[source].items():
+            if zone not in zone_set:
+                continue
+            for neighbour in neighbours:
+                if neighbour in zone_set and neighbour != zone:
+                    edges.add((zone, neighbour))
+                    edges.add((neighbour, zone))
+    return sorted(edges)
+
+
+class EmptyBorderCache:
+    """
+    Negative results: directed borders the API answered with no data, so later runs skip them.
+
+    Attributes:
+        path (str): JSON file with a list of [from, to, recorded_at] entries.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.borders = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.borders = {(a, b): ts for a, b, ts in json.load(f)}
+
+    def __contains__(self, edge) -> bool:
+        return tuple(edge) in self.borders
+
+    def add(self, country_from: str, country_to: str):
+        with self._lock:
+            self.borders[(country_from, country_to)] = pd.Timestamp.now(tz='UTC').isoformat()
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'w') as f:
+                json.dump([[a, b, ts] for (a, b), ts in sorted(self.borders.items())], f, indent=1)
+
+    def filter(self, jobs):
+        return [job for job in jobs if job not in self]
+
+
+def estimate_requests(jobs, start: pd.Timestamp, end: pd.Timestamp, chunk_freq: str | None = 'MS',
+                      manifest=None, key_func=None) -> int:
+    """
+    HTTP requests needed for the jobs: one per chunk of each missing interval (whole window without a manifest).
+    """
+    total = 0
+    for job in jobs:
+        gaps = manifest.missing(key_func(job), start, end) if manifest is not None else [(start, end)]
+        total += sum(len(split_date_range(s, e, chunk_freq)) for s, e in gaps)
+    return total
+
+
+def print_plan(jobs, n_requests: int, skipped=()):
+    print(f"{len(jobs)} flow jobs planned, ~{n_requests} requests:")
+    for country_from, country_to in jobs:
+        print(f"  {country_from} -> {country_to}")
+    if skipped:
+        print(f"{len(skipped)} borders skipped, cached as empty: {', '.join(f'{a}->{b}' for a, b in skipped)}")
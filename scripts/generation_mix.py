@@ -0,0 +1,343 @@
+"""
+Generation mix in long format: one row per (timestamp, zone, psr_type, kind) with the MW value.
+
+query_generation(psr_type=None) comes back wide, (production type, Actual Aggregated/Actual
+Consumption) columns that differ per zone and year, and most cells of a frame spanning many
+zones are empty. normalize_generation rewrites the store's generation dataset as
+
+    root/dataset=generation_mix/zone=<z>/year=<y>/part-0.parquet
+    root/dataset=generation_mix/_index.parquet
+
+where each file holds one row group per (psr_type, kind) series, psr_type/kind are dictionary
+encoded and values float32. The index lists (zone, year, psr_type, kind) -> row group, rows,
+first and last timestamp, so a query for some types reads only their row groups. GenerationMix
+keeps the loaded rows sorted by series with categorical keys (15 bytes a row) plus the row
+range of every series.
+
+    python scripts/generation_mix.py                  # normalise every zone of the store
+    python scripts/generation_mix.py --zones DE_LU HU --residual-load --freq D
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.fetch_manifest import write_atomic
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR, COLUMN_SEP, to_utc_timestamp
+from scripts.time_alignment import align_long
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DATASET = 'generation_mix'
+INDEX_FILE = '_index.parquet'  # pyarrow datasets skip files starting with '_'
+SERIES_METADATA = b'generation_mix_series'
+KINDS = ['generation', 'consumption']
+KEYS = ['zone', 'psr_type', 'kind']
+# weather dependent production subtracted from load for the residual load
+VARIABLE_TYPES = ['Solar', 'Wind Onshore', 'Wind Offshore']
+
+FILE_SCHEMA = pa.schema([
+    ('timestamp', pa.timestamp('ns', tz='UTC')),
+    ('psr_type', pa.dictionary(pa.int8(), pa.string())),
+    ('kind', pa.dictionary(pa.int8(), pa.string())),
+    ('mw', pa.float32()),
+])
+
+
+def split_column(name: str) -> tuple[str, str]:
+    """
+    Store column of the generation dataset -> (psr_type, kind). Zones without consumption
+    come back with single level columns, those are generation.
+    """
+    psr_type, _, metric = name.partition(COLUMN_SEP)
+    return psr_type, 'consumption' if 'Consumption' in metric else 'generation'
+
+
+def to_long(wide: pd.DataFrame) -> pd.DataFrame:
+    """
+    Generation of one zone as read from the store (timestamp + value columns) -> long frame
+    (timestamp, psr_type, kind, mw) sorted by series then time, empty cells dropped.
+    Columns naming the same series (a type that gained a consumption column later) are merged.
+    """
+    wide = wide.sort_values('timestamp')
+    columns = {}
+    for column in wide.columns:
+        if column in ('timestamp', 'zone', 'year'):
+            continue
+        columns.setdefault(split_column(column), []).append(column)
+
+    ts = pd.DatetimeIndex(wide['timestamp']).asi8
+    parts = []
+    for (psr_type, kind), names in sorted(columns.items()):
+        values = wide[names[0]].to_numpy(dtype=np.float32)
+        for name in names[1:]:
+            values = np.where(np.isnan(values), wide[name].to_numpy(dtype=np.float32), values)
+        keep = ~np.isnan(values)
+        if keep.any():
+            parts.append((psr_type, kind, ts[keep], values[keep]))
+
+    psr_types = sorted({p[0] for p in parts})
+    lengths = [len(p[2]) for p in parts]
+    return pd.DataFrame({
+        'timestamp': pd.to_datetime(np.concatenate([p[2] for p in parts]) if parts else np.empty(0, dtype=np.int64),
+                                    unit='ns', utc=True),
+        'psr_type': pd.Categorical.from_codes(
+            np.repeat([psr_types.index(p[0]) for p in parts], lengths).astype(np.int8), categories=psr_types),
+        'kind': pd.Categorical.from_codes(
+            np.repeat([KINDS.index(p[1]) for p in parts], lengths).astype(np.int8), categories=KINDS),
+        'mw': np.concatenate([p[3] for p in parts]) if parts else np.empty(0, dtype=np.float32),
+    })
+
+
+def _series_bounds(codes: list[np.ndarray]) -> np.ndarray:
+    """
+    Start of every run of equal key codes in a frame sorted by those keys, plus its length.
+    """
+    n = len(codes[0])
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+    for c in codes:
+        change[1:] |= c[1:] != c[:-1]
+    return np.append(np.flatnonzero(change), n)
+
+
+def write_partition(path: str, long: pd.DataFrame, compression: str = 'zstd'):
+    """
+    One year of a zone, a row group per series, the series of each row group in the file metadata.
+    """
+    bounds = _series_bounds([long['psr_type'].cat.codes.to_numpy(), long['kind'].cat.codes.to_numpy()])
+    table = pa.Table.from_pandas(long, schema=FILE_SCHEMA, preserve_index=False)
+    series = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        row = long.iloc[start]
+        series.append([row['psr_type'], row['kind'], int(stop - start),
+                       long['timestamp'].iloc[start].isoformat(), long['timestamp'].iloc[stop - 1].isoformat()])
+    schema = FILE_SCHEMA.with_metadata({SERIES_METADATA: json.dumps(series).encode()})
+
+    def write(tmp_path):
+        with pq.ParquetWriter(tmp_path, schema, compression=compression) as writer:
+            for start, stop in zip(bounds[:-1], bounds[1:]):
+                writer.write_table(table.slice(start, stop - start).replace_schema_metadata(schema.metadata),
+                                   row_group_size=stop - start)
+
+    write_atomic(path, write)
+
+
+def build_index(root: str = DEFAULT_STORE_DIR) -> pd.DataFrame:
+    """
+    Scans the file footers of the generation_mix dataset and writes its index.
+
+    Returns:
+        pd.DataFrame: zone, year, psr_type, kind, row_group, rows, first, last.
+    """
+    path = os.path.join(root, f"dataset={DATASET}")
+    records = []
+    for zone_dir in sorted(os.listdir(path)) if os.path.isdir(path) else []:
+        if not zone_dir.startswith("zone="):
+            continue
+        for year_dir in sorted(os.listdir(os.path.join(path, zone_dir))):
+            file = os.path.join(path, zone_dir, year_dir, "part-0.parquet")
+            if not year_dir.startswith("year=") or not os.path.exists(file):
+                continue
+            metadata = pq.read_schema(file).metadata or {}
+            for row_group, (psr_type, kind, rows, first, last) in enumerate(json.loads(metadata[SERIES_METADATA])):
+                records.append({'zone': zone_dir.split("=", 1)[1], 'year': int(year_dir.split("=", 1)[1]),
+                                'psr_type': psr_type, 'kind': kind, 'row_group': row_group, 'rows': rows,
+                                'first': pd.Timestamp(first), 'last': pd.Timestamp(last)})
+
+    index = pd.DataFrame(records, columns=['zone', 'year', 'psr_type', 'kind', 'row_group', 'rows', 'first', 'last'])
+    if os.path.isdir(path):
+        table = pa.Table.from_pandas(index, preserve_index=False)
+        write_atomic(os.path.join(path, INDEX_FILE), lambda tmp_path: pq.write_table(table, tmp_path))
+    return index
+
+
+def read_index(root: str = DEFAULT_STORE_DIR) -> pd.DataFrame:
+    path = os.path.join(root, f"dataset={DATASET}", INDEX_FILE)
+    if not os.path.exists(path):
+        return build_index(root)
+    return pq.read_table(path).to_pandas()
+
+
+def normalize_generation(store: TimeSeriesStore, zones=None) -> pd.DataFrame:
+    """
+    Rewrites the generation of the given zones (default all) as the generation_mix dataset
+    and refreshes its index.
+
+    Returns:
+        pd.DataFrame: the index.
+    """
+    keys = [zone for zone, _ in store.series_keys('generation')]
+    for zone in keys if zones is None else [z for z in zones if z in keys]:
+        long = to_long(store.read('generation', zones=[zone]))
+        years = long['timestamp'].dt.year.to_numpy()
+        for year in np.unique(years):
+            part = long[years == year].reset_index(drop=True)
+            write_partition(os.path.join(store.root, f"dataset={DATASET}", f"zone={zone}", f"year={year}",
+                                         "part-0.parquet"), part, store.compression)
+        logging.info(f"Normalised generation of {zone}: {long['psr_type'].nunique()} types, {len(long)} rows")
+    return build_index(store.root)
+
+
+class GenerationMix:
+    """
+    Long generation frame sorted by zone, psr_type, kind and time.
+
+    Attributes:
+        frame (pd.DataFrame): timestamp (UTC), zone, psr_type, kind (categoricals) and mw (float32).
+        index (pd.DataFrame): start/stop rows of every series, indexed by (zone, psr_type, kind).
+    """
+    def __init__(self, frame: pd.DataFrame):
+        codes = [frame[k].cat.codes.to_numpy() for k in KEYS]
+        order = np.lexsort([pd.DatetimeIndex(frame['timestamp']).asi8] + codes[::-1])
+        if not np.array_equal(order, np.arange(len(frame))):
+            frame = frame.sort_values(KEYS + ['timestamp'], ignore_index=True)
+            codes = [frame[k].cat.codes.to_numpy() for k in KEYS]
+        self.frame = frame
+
+        bounds = _series_bounds(codes) if len(frame) else np.zeros(1, dtype=np.int64)
+        first = frame.iloc[bounds[:-1]]
+        self.index = pd.DataFrame({'start': bounds[:-1], 'stop': bounds[1:]},
+                                  index=pd.MultiIndex.from_arrays([first[k].astype(str) for k in KEYS], names=KEYS))
+
+    @classmethod
+    def load(cls, root: str = DEFAULT_STORE_DIR, zones=None, psr_types=None, kinds=None, start=None, end=None):
+        """
+        Reads only the row groups of the requested series overlapping [start, end) (naive as UTC).
+        """
+        index = read_index(root)
+        keep = np.ones(len(index), dtype=bool)
+        if zones is not None:
+            keep &= index['zone'].isin(list(zones)).to_numpy()
+        if psr_types is not None:
+            keep &= index['psr_type'].isin(list(psr_types)).to_numpy()
+        if kinds is not None:
+            keep &= index['kind'].isin(list(kinds)).to_numpy()
+        if start is not None:
+            keep &= (index['last'] >= to_utc_timestamp(start)).to_numpy()
+        if end is not None:
+            keep &= (index['first'] < to_utc_timestamp(end)).to_numpy()
+        index = index[keep]
+
+        zone_categories = sorted(index['zone'].unique())
+        type_categories = sorted(index['psr_type'].unique())
+        pieces = []
+        for (zone, year), groups in index.groupby(['zone', 'year'], sort=True):
+            file = os.path.join(root, f"dataset={DATASET}", f"zone={zone}", f"year={year}", "part-0.parquet")
+            piece = pq.ParquetFile(file).read_row_groups(sorted(groups['row_group'])).to_pandas()
+            if start is not None:
+                piece = piece[piece['timestamp'] >= to_utc_timestamp(start)]
+            if end is not None:
+                piece = piece[piece['timestamp'] < to_utc_timestamp(end)]
+            piece.insert(1, 'zone', pd.Categorical.from_codes(
+                np.full(len(piece), zone_categories.index(zone), dtype=np.int8), categories=zone_categories))
+            piece['psr_type'] = piece['psr_type'].cat.set_categories(type_categories)
+            piece['kind'] = piece['kind'].cat.set_categories(KINDS)
+            pieces.append(piece)
+
+        if not pieces:
+            frame = pd.DataFrame({
+                'timestamp': pd.DatetimeIndex([], tz='UTC'),
+                'zone': pd.Categorical([], categories=zone_categories),
+                'psr_type': pd.Categorical([], categories=type_categories),
+                'kind': pd.Categorical([], categories=KINDS),
+                'mw': np.empty(0, dtype=np.float32)})
+        else:
+            frame = pd.concat(pieces, ignore_index=True)
+        return cls(frame)
+
+    def series(self, zone: str, psr_type: str, kind: str = 'generation') -> pd.Series:
+        """
+        One series indexed by UTC timestamp, through the row index.
+        """
+        start, stop = self.index.loc[(zone, psr_type, kind)]
+        rows = self.frame.iloc[start:stop]
+        return pd.Series(rows['mw'].to_numpy(), index=pd.DatetimeIndex(rows['timestamp'], name='timestamp'), name=psr_type)
+
+    def aligned(self, freq: str = 'h', kind: str = 'generation', psr_types=None) -> pd.DataFrame:
+        """
+        Series of one kind averaged on a fixed UTC grid (15-minute and hourly zones mix),
+        no rows when none was loaded.
+        """
+        rows = self.index[self.index.index.get_level_values('kind') == kind]
+        if psr_types is not None:
+            rows = rows[rows.index.get_level_values('psr_type').isin(list(psr_types))]
+        take = np.concatenate([np.arange(a, b) for a, b in zip(rows['start'], rows['stop'])]) if len(rows) else []
+        aligned = align_long(self.frame.iloc[take], freq, 'mean', keys=KEYS, columns=['mw'])
+        aligned['mw'] = aligned['mw'].astype(np.float32)
+        return aligned
+
+    def totals(self, freq: str = 'h', kind: str = 'generation', psr_types=None) -> pd.DataFrame:
+        """
+        Sum over production types, time x zone.
+        """
+        aligned = self.aligned(freq, kind, psr_types)
+        return aligned.pivot_table(index='timestamp', columns='zone', values='mw', aggfunc='sum', observed=True)
+
+    def shares(self, freq: str = 'D') -> pd.DataFrame:
+        """
+        Share of every production type in the generation of its zone.
+
+        Returns:
+            pd.DataFrame: timestamp, zone, psr_type and share (float32), categorical keys.
+        """
+        aligned = self.aligned(freq, 'generation')
+        # a type missing in a bin counts as zero, not as unknown
+        total = aligned.groupby(['zone', 'timestamp'], observed=True)['mw'].transform('sum').to_numpy(dtype=float)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            share = (aligned['mw'].to_numpy(dtype=float) / total).astype(np.float32)
+        return aligned[['timestamp', 'zone', 'psr_type']].assign(share=share)
+
+    def residual_load(self, load: pd.DataFrame, freq: str = 'h', psr_types=VARIABLE_TYPES) -> pd.DataFrame:
+        """
+        Load minus variable renewable generation, time x zone.
+
+        Args:
+            load (pd.DataFrame): long load frame as read from the store (timestamp, zone, value column).
+        """
+        column = [c for c in load.columns if c not in ('timestamp', 'zone', 'year')][0]
+        aligned_load = align_long(load, freq, 'mean', keys=['zone'], columns=[column])
+        load_wide = aligned_load.pivot(index='timestamp', columns='zone', values=column)
+        renewables = self.totals(freq, 'generation', psr_types).reindex_like(load_wide).fillna(0.0)
+        return (load_wide - renewables).astype(np.float32)
+
+    def memory_bytes(self) -> int:
+        return int(self.frame.memory_usage(deep=True).sum())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--zones", nargs="+", help="zones to normalise and query, default all")
+    parser.add_argument("--no-normalize", action="store_true", help="only query the existing dataset")
+    parser.add_argument("--residual-load", action="store_true", help="print the residual load")
+    parser.add_argument("--shares", action="store_true", help="print the mean generation share per type")
+    parser.add_argument("--freq", default="h")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    args = parser.parse_args()
+
+    store = TimeSeriesStore(args.store)
+    if not args.no_normalize:
+        index = normalize_generation(store, args.zones)
+        logging.info(f"{DATASET}: {index['zone'].nunique()} zones, {len(index)} series-years, {index['rows'].sum()} rows")
+
+    if args.residual_load or args.shares:
+        mix = GenerationMix.load(args.store, zones=args.zones, start=args.start, end=args.end)
+        logging.info(f"Loaded {len(mix.frame)} rows, {mix.memory_bytes() / 2**20:.1f} MB")
+        if args.shares:
+            shares = mix.shares(args.freq)
+            print(shares.groupby(['zone', 'psr_type'], observed=True)['share'].mean().unstack('zone').round(3).to_string())
+        if args.residual_load:
+            load = store.read('load', zones=args.zones, start=args.start, end=args.end)
+            print(mix.residual_load(load, args.freq, VARIABLE_TYPES).describe().round(1).to_string())
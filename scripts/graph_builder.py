@@ -1,71 +1,310 @@
 import os
 import sys
+import json
+import shutil
+import hashlib
+import tempfile
+import multiprocessing
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import networkx as nx
+from entsoe.mappings import Area
 
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from scripts.config import graph_config
+from scripts.timeseries_store import TimeSeriesStore
 
-def build_flow_graph(data_directory):
+@lru_cache(maxsize=None)
+def known_zones():
     """
-    nx.DiGraph: time-series flow data as edges.
+    Zone codes used to tokenize file names: the graph config plus every ENTSO-E area (IT_NORD, DK_1, ...).
+    """
+    return frozenset(graph_config.NEIGHBORS) | frozenset(graph_config.NODE_POSITIONS) | frozenset(a.name for a in Area)
+
+def parse_flow_filename(filename, zones=None):
+    """
+    flows_<sender>_<recipient>.csv -> (sender, recipient), (None, None) if it can't be parsed.
+    Multi-part codes (DE_LU, IT_NORD, DK_1) are resolved against the known zone set.
+    """
+    zones = known_zones() if zones is None else zones
+    stem = os.path.basename(filename)
+    if not stem.startswith("flows_") or not stem.endswith(".csv"):
+        return None, None
+
+    tokens = stem[len("flows_"):-len(".csv")].split('_')
+    splits = [('_'.join(tokens[:k]), '_'.join(tokens[k:])) for k in range(1, len(tokens))]
+    candidates = [(a, b) for a, b in splits if a in zones and b in zones]
+    if not candidates:
+        # unknown codes, only a plain A_B name is unambiguous
+        return (tokens[0], tokens[1]) if len(tokens) == 2 else (None, None)
+
+    # zones of our own graph first, e.g. DK_1|NO_1 over the DK_1_NO_1 area
+    candidates.sort(key=lambda pair: -((pair[0] in graph_config.NEIGHBORS) + (pair[1] in graph_config.NEIGHBORS)))
+    return candidates[0]
+
+def _read_flow_csv(filepath):
+    df = pd.read_csv(filepath, index_col=0)
+    # standard UTC for consistency, naive stamps are taken as UTC
+    index = pd.to_datetime(df.index, utc=True)
+    return pd.Series(df.iloc[:, 0].to_numpy(dtype=np.float32, na_value=np.nan), index=index)
+
+def _read_flow_store(store):
+    """
+    Every flow series of the store from one pushed-down scan, split by (zone, neighbour).
+    """
+    frame = store.read('flows', columns=['value'])
+    values = frame['value'].to_numpy(dtype=np.float32)
+    index = pd.DatetimeIndex(frame['timestamp'])
+    series = []
+    for (zone, neighbour), rows in frame.groupby(['zone', 'neighbour'], sort=True).indices.items():
+        series.append((zone, neighbour, pd.Series(values[rows], index=index[rows])))
+    return series
+
+def _load_one(task):
+    reader, args, sender, recipient = task
+    return sender, recipient, reader(*args)
+
+def load_flow_series(data_directory, max_workers=None):
+    """
+    [(sender, recipient, pd.Series in UTC)] for every flow series, in file name order.
+    data_directory is the parquet store, read in one scan, or a legacy folder of flows_*.csv
+    files, read and normalised on a process pool of max_workers (None: one per CPU).
+    """
+    store = TimeSeriesStore(data_directory)
+    if store.has('flows'):
+        return _read_flow_store(store)
+
+    tasks = []
+    for filename in sorted(os.listdir(data_directory)):
+        sender, recipient = parse_flow_filename(filename)
+        if not sender or not recipient:
+            print(f"Warning: Could not parse sender/recipient from filename: {filename}. Skipping.")
+            continue
+        tasks.append((_read_flow_csv, (os.path.join(data_directory, filename),), sender, recipient))
+
+    workers = max_workers or os.cpu_count() or 1
+    # no nested pools when already running inside a worker
+    if multiprocessing.parent_process() is not None or workers == 1 or len(tasks) < 2:
+        return [_load_one(task) for task in tasks]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        return list(pool.map(_load_one, tasks))
+
+class FlowTensor:
     """
+    All edge flows on one shared time axis.
+
+    Attributes:
+        index (pd.DatetimeIndex): sorted UTC timestamps, shared by every edge.
+        edges (list): (u, v) per row, in graph orientation.
+        values (np.ndarray): float32 (edges x time), NaN where an edge has no data.
+    """
+    def __init__(self, index, edges, values):
+        self.index = index
+        self.edges = list(edges)
+        self.values = values
+        self.edge_row = {edge: i for i, edge in enumerate(self.edges)}
+
+    @classmethod
+    def from_series(cls, edges, flow_series):
+        """
+        Builds the tensor from (sender, recipient, series) items. A series whose direction is not an edge
+        goes negated onto the reverse edge, later series win on overlapping timestamps.
+        """
+        edge_row = {edge: i for i, edge in enumerate(edges)}
+        rows, stamps, vals = [], [], []
+        for sender, recipient, series in flow_series:
+            if (sender, recipient) in edge_row:
+                row, sign = edge_row[(sender, recipient)], 1.0
+            elif (recipient, sender) in edge_row:
+                row, sign = edge_row[(recipient, sender)], -1.0
+            else:
+                continue
+            stamps.append(series.index.values.astype('datetime64[ns]').view('i8'))
+            vals.append(sign * series.to_numpy(dtype=np.float32, na_value=np.nan))
+            rows.append(np.full(len(series), row, dtype=np.int32))
+
+        if not stamps:
+            return cls(pd.DatetimeIndex([], tz='UTC'), edges, np.empty((len(edges), 0), dtype=np.float32))
+
+        stamps, vals, rows = np.concatenate(stamps), np.concatenate(vals), np.concatenate(rows)
+        axis = np.unique(stamps)
+        cols = np.searchsorted(axis, stamps)
+
+        # keep the last write per (edge, timestamp), like dict.update did
+        flat = rows.astype(np.int64) * len(axis) + cols
+        _, last = np.unique(flat[::-1], return_index=True)
+        keep = len(flat) - 1 - last
+
+        values = np.full((len(edges), len(axis)), np.nan, dtype=np.float32)
+        values[rows[keep], cols[keep]] = vals[keep]
+        return cls(pd.DatetimeIndex(axis.view('datetime64[ns]')).tz_localize('UTC'), edges, values)
+
+    @property
+    def nbytes(self):
+        return self.values.nbytes + self.index.nbytes
+
+    def has_data(self, u, v):
+        row = self.edge_row.get((u, v))
+        return row is not None and not np.isnan(self.values[row]).all()
+
+    def position(self, timestamp):
+        """
+        Column of a timestamp, KeyError if it's not on the axis.
+        """
+        ts = pd.Timestamp(timestamp)
+        ts = ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+        pos = self.index.searchsorted(ts)
+        if pos == len(self.index) or self.index[pos] != ts:
+            raise KeyError(timestamp)
+        return pos
+
+    def series(self, u, v):
+        return pd.Series(self.values[self.edge_row[(u, v)]], index=self.index, name=(u, v)).dropna()
+
+    def at(self, timestamp):
+        """
+        float32 vector of all edge flows at one timestamp.
+        """
+        return self.values[:, self.position(timestamp)]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "index.npy"), self.index.values.astype('datetime64[ns]').view('i8'))
+        np.save(os.path.join(directory, "values.npy"), np.ascontiguousarray(self.values, dtype=np.float32))
+        with open(os.path.join(directory, "edges.json"), 'w') as f:
+            json.dump([list(edge) for edge in self.edges], f)
+
+    @classmethod
+    def load(cls, directory, mmap=True):
+        """
+        Memory-mapped by default, so several processes share one copy through the page cache.
+        """
+        stamps = np.load(os.path.join(directory, "index.npy"))
+        values = np.load(os.path.join(directory, "values.npy"), mmap_mode='r' if mmap else None)
+        with open(os.path.join(directory, "edges.json")) as f:
+            edges = [tuple(edge) for edge in json.load(f)]
+        return cls(pd.DatetimeIndex(stamps.view('datetime64[ns]')).tz_localize('UTC'), edges, values)
+
+
+class EdgeFlows(Mapping):
+    """
+    Read-only {Timestamp: value} view of one tensor row, for code written against the old flows dicts.
+    """
+    def __init__(self, tensor, row):
+        self._tensor = tensor
+        self._row = tensor.values[row]
+
+    def __getitem__(self, timestamp):
+        value = self._row[self._tensor.position(timestamp)]
+        if np.isnan(value):
+            raise KeyError(timestamp)
+        return float(value)
+
+    def __iter__(self):
+        return iter(self._tensor.index[~np.isnan(self._row)])
+
+    def __len__(self):
+        return int((~np.isnan(self._row)).sum())
+
+    def to_series(self):
+        return pd.Series(self._row, index=self._tensor.index).dropna()
+
+
+def base_flow_graph():
     G = nx.DiGraph()
     for country, neighbors_list in graph_config.NEIGHBORS.items():
         G.add_node(country, pos=graph_config.NODE_POSITIONS.get(country))
         for neighbor in neighbors_list:
             G.add_edge(country, neighbor)
+    return G
 
+def flow_graph_from_series(flow_series):
+    """
+    Base graph with the flows attached: G.graph['flow_tensor'] holds the FlowTensor,
+    edges with data get a 'flows' EdgeFlows view on it.
+    """
+    G = base_flow_graph()
     print(f"base graph with {G.number_of_nodes()} nodes and {G.number_of_edges()} vertices.")
+    return flow_graph_from_tensor(FlowTensor.from_series(list(G.edges), flow_series), G)
 
-    for filename in os.listdir(data_directory):
-            
-            parts = filename.replace("flows_", "").replace(".csv", "").split('_')
-            sender = None
-            recipient = None
-
-            if len(parts) == 2:
-                sender, recipient = parts[0], parts[1]
-            elif len(parts) == 3:# edge case
-                if parts[0] == 'DE' and parts[1] == 'LU':
-                    # DE_LU is the sender --> flows_DE_LU_PL.csv
-                    sender = "DE_LU"
-                    recipient = parts[2]
-                elif parts[1] == 'DE' and parts[2] == 'LU':
-                    # DE_LU is the getter --> flows_PL_DE_LU.csv
-                    sender = parts[0]
-                    recipient = "DE_LU"
-            
-            if not sender or not recipient:
-                print(f"Warning: Could not parse sender/recipient from filename: {filename}. Skipping.")
-                continue
-            
-            df = pd.read_csv(os.path.join(data_directory, filename), index_col=0, parse_dates=True)
-            
-            if df.index.tz is None:
-                df.index = df.index.tz_localize('UTC')
-            # standard UTC for consistency
-            else:
-                df.index = df.index.tz_convert('UTC')
-                
-            flow_data = df.iloc[:, 0].to_dict()
-            # merge flow data to right vertex ---
-            if G.has_edge(sender, recipient):
-                existing_flows = G.edges[sender, recipient].get('flows', {})
-                existing_flows.update(flow_data)
-                nx.set_edge_attributes(G, {(sender, recipient): {"flows": existing_flows}})
-            
-            elif G.has_edge(recipient, sender):
-                negated_flow_data = {timestamp: -value for timestamp, value in flow_data.items()}
-                existing_flows = G.edges[recipient, sender].get('flows', {})
-                existing_flows.update(negated_flow_data)
-                nx.set_edge_attributes(G, {(recipient, sender): {"flows": existing_flows}})
+def flow_graph_from_tensor(tensor, G=None):
+    G = base_flow_graph() if G is None else G
+    G.graph['flow_tensor'] = tensor
+    for row, (u, v) in enumerate(tensor.edges):
+        if tensor.has_data(u, v):
+            G.edges[u, v]['flows'] = EdgeFlows(tensor, row)
+    return G
 
+def build_flow_graph(data_directory, max_workers=None):
+    """
+    nx.DiGraph: time-series flow data as edges.
+    """
+    G = flow_graph_from_series(load_flow_series(data_directory, max_workers=max_workers))
     print("built graph with flow data.")
     return G
 
 
-# build_flow_graph("C:\\Users\\micha\\code\\power-market-analysis-de-hu\\data\\processed\\flows")
\ No newline at end of file
+def source_fingerprint(data_directory, exclude=()):
+    """
+    Hash of (path, size, mtime) of every file under data_directory, changes whenever a fetch writes.
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(data_directory):
+        dirnames[:] = sorted(d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) not in exclude)
+        for filename in sorted(filenames):
+            if filename.startswith(".tmp_"):
+                continue
+            stat = os.stat(os.path.join(dirpath, filename))
+            entries.append(f"{os.path.relpath(os.path.join(dirpath, filename), data_directory)}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(entries).encode()).hexdigest()
+
+def flow_fingerprint(data_directory, exclude=()):
+    """
+    source_fingerprint of the flow inputs only: dataset=flows of a store, or the flows_*.csv
+    files of a legacy folder, so writes to prices, load or generation keep the snapshot valid.
+    """
+    store = TimeSeriesStore(data_directory)
+    if store.has('flows'):
+        return source_fingerprint(os.path.join(data_directory, "dataset=flows"), exclude=exclude)
+    entries = []
+    for filename in sorted(os.listdir(data_directory)):
+        if filename.startswith("flows_") and filename.endswith(".csv"):
+            stat = os.stat(os.path.join(data_directory, filename))
+            entries.append(f"{filename}:{stat.st_size}:{stat.st_mtime_ns}")
+    return hashlib.sha1("\n".join(entries).encode()).hexdigest()
+
+def load_flow_graph(data_directory, snapshot_dir, fingerprint=None, max_workers=None):
+    """
+    build_flow_graph through a snapshot in snapshot_dir/<fingerprint>: built once per version of
+    the source files, then memory-mapped by every process that asks for the same version.
+    """
+    fingerprint = fingerprint or flow_fingerprint(data_directory, exclude=[snapshot_dir])
+    target = os.path.join(snapshot_dir, fingerprint)
+
+    if os.path.exists(os.path.join(target, "edges.json")):
+        print(f"loading flow snapshot {fingerprint[:10]}...")
+        return flow_graph_from_tensor(FlowTensor.load(target))
+
+    G = build_flow_graph(data_directory, max_workers=max_workers)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=snapshot_dir, prefix=".tmp_")
+    G.graph['flow_tensor'].save(tmp_dir)
+    try:
+        os.rename(tmp_dir, target)
+    except OSError:
+        # another worker published the same version first
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # older versions are no longer needed
+    for name in os.listdir(snapshot_dir):
+        if name != fingerprint and not name.startswith(".tmp_"):
+            shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+    return G
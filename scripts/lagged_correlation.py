@@ -0,0 +1,232 @@
+"""
+Lagged cross-correlation of every zone-pair price spread with every weather series and every
+border flow, for lags -MAX_LAG..MAX_LAG hours, and a table of the strongest leading indicators.
+
+All series go on one hourly UTC grid. Each is deseasonalised (mean profile per hour of day
+removed) and scaled to unit variance; gaps become 0 with a 0/1 mask. The correlation per pair
+and lag is the Pearson one over the hours both have a value: the sums of spread * driver,
+spread, spread^2, driver, driver^2 and the overlap count over those hours are cross-correlations
+of the values and masks, one rfft per series and an irfft of the spectrum products, chunked over
+spreads to bound memory. A positive lag means the driver leads the spread.
+
+    python scripts/lagged_correlation.py --top 10
+    python scripts/lagged_correlation.py --zones DE_LU HU AT --max-lag 24 --csv data/reports/leading_indicators.csv
+"""
+import os
+import sys
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from scipy import fft
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR, to_utc_timestamp
+from scripts.time_alignment import align_long, to_utc
+
+WEATHER_CSV = os.path.join(project_root, "data", "processed", "hourly_weather_wide_weeks29_30.csv")
+MAX_LAG = 48
+MIN_OVERLAP = 7 * 24       # hours a pair needs at a lag for a correlation
+CHUNK_BYTES = 256 * 2**20  # spectrum products held at once
+HOUR = 3600 * 10**9
+
+
+def spread_frame(store_root: str = DEFAULT_STORE_DIR, zones=None, start=None, end=None) -> pd.DataFrame:
+    """
+    Hourly price spreads a - b of every zone pair (a before b alphabetically), columns 'a-b'.
+    """
+    prices = TimeSeriesStore(store_root).read('prices', zones=zones, start=start, end=end)
+    aligned = align_long(prices, 'h', 'mean', keys=['zone'], columns=['value'])
+    wide = aligned.pivot(index='timestamp', columns='zone', values='value')
+    pairs = itertools.combinations(sorted(wide.columns), 2)
+    return pd.DataFrame({f"{a}-{b}": wide[a] - wide[b] for a, b in pairs}, index=wide.index)
+
+
+def weather_frame(weather_csv: str = WEATHER_CSV) -> pd.DataFrame:
+    """
+    Every series of the processed hourly weather csv (process_weather_data), on UTC hours.
+    """
+    if not weather_csv or not os.path.exists(weather_csv):
+        return pd.DataFrame()
+    weather = pd.read_csv(weather_csv, parse_dates=['datetime'])
+    frame = weather.drop(columns='datetime').set_index(to_utc(weather['datetime'])).select_dtypes('number')
+    return frame[frame.index.notna()]
+
+
+def flow_frame(data_directory: str = DEFAULT_STORE_DIR, max_workers=None) -> pd.DataFrame:
+    """
+    Hourly mean of every border flow of build_flow_graph, columns 'flow A->B'.
+    """
+    from scripts.graph_builder import build_flow_graph
+
+    tensor = build_flow_graph(data_directory, max_workers=max_workers).graph['flow_tensor']
+    rows = [i for i, edge in enumerate(tensor.edges) if tensor.has_data(*edge)]
+    if not rows or not len(tensor.index):
+        return pd.DataFrame()
+    values = tensor.values[rows]
+    hours, starts = np.unique(tensor.index.asi8 // HOUR, return_index=True)
+    present = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(present, values, 0.0), starts, axis=1)
+    counts = np.add.reduceat(present, starts, axis=1)
+    with np.errstate(invalid='ignore'):
+        hourly = sums / counts
+    index = pd.to_datetime(hours * HOUR, unit='ns', utc=True)
+    return pd.DataFrame(hourly.T, index=index, columns=[f"flow {u}->{v}" for u, v in (tensor.edges[i] for i in rows)])
+
+
+def _prepare(frame: pd.DataFrame, deseasonalize: bool) -> tuple[np.ndarray, np.ndarray]:
+    """
+    (series x hours) standardised values with gaps as 0, and the 0/1 mask of valid hours.
+    Standardising only conditions the sums, the correlation is taken over each overlap.
+    """
+    values = np.array(frame.to_numpy(dtype=float).T)
+    mask = ~np.isnan(values)
+    if deseasonalize:
+        hour = frame.index.hour.to_numpy()
+        for h in range(24):
+            at = hour == h
+            with np.errstate(invalid='ignore'):
+                profile = np.nanmean(values[:, at], axis=1) if at.any() else 0.0
+            values[:, at] -= np.nan_to_num(profile)[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.nanmean(values, axis=1, keepdims=True)
+        std = np.nanstd(values, axis=1, keepdims=True)
+        values = (values - mean) / np.where(std > 0, std, np.nan)
+    mask &= ~np.isnan(values)
+    return np.where(mask, values, 0.0), mask.astype(float)
+
+
+def lagged_correlation(targets: pd.DataFrame, drivers: pd.DataFrame, max_lag: int = MAX_LAG,
+                       deseasonalize: bool = True, min_overlap: int = MIN_OVERLAP, workers: int = -1) -> dict:
+    """
+    Pearson correlation of every target with every driver shifted by each lag, over the hours
+    both have a value, all on the hourly grid of the union of both indexes.
+
+    Returns:
+        dict: corr and overlap (targets x drivers x lags), lags (-max_lag..max_lag),
+        targets and drivers (names).
+    """
+    index = targets.index.union(drivers.index)
+    if len(index):
+        index = pd.date_range(index[0], index[-1], freq='h')
+    a, ma = _prepare(targets.reindex(index), deseasonalize)
+    b, mb = _prepare(drivers.reindex(index), deseasonalize)
+
+    T = len(index)
+    lags = np.arange(-max_lag, max_lag + 1)
+    n_fft = fft.next_fast_len(T + max_lag + 1, real=True)
+    positions = lags % n_fft
+    gaps = not (ma.all() and mb.all())
+
+    # sum_t x[t + lag] * y[t] for every x of a chunk, every y and every lag
+    def xcorr(spec_x, spec_y):
+        return fft.irfft(spec_x[:, None, :] * spec_y[None], n_fft, axis=2, workers=workers)[..., positions]
+
+    def spectrum(x, conj=False):
+        spec = fft.rfft(x, n_fft, axis=1, workers=workers)
+        return np.conj(spec) if conj else spec
+
+    # values are 0 outside the mask, so a = a * ma and b = b * mb
+    spec_b, spec_b2, spec_mb = spectrum(b, True), spectrum(b * b, True), spectrum(mb, True)
+
+    S, D = len(a), len(b)
+    shape = (S, D, len(lags))
+    sum_ab, sum_a, sum_a2, sum_b, sum_b2, overlap = (np.empty(shape) for _ in range(6))
+    chunk = max(1, CHUNK_BYTES // max(1, D * spec_b.shape[1] * 16))
+    for start in range(0, S, chunk):
+        part = slice(start, min(S, start + chunk))
+        spec_a, spec_a2, spec_ma = spectrum(a[part]), spectrum(a[part] ** 2), spectrum(ma[part])
+        sum_ab[part] = xcorr(spec_a, spec_b)
+        sum_a[part] = xcorr(spec_a, spec_mb)
+        sum_a2[part] = xcorr(spec_a2, spec_mb)
+        sum_b[part] = xcorr(spec_ma, spec_b)
+        sum_b2[part] = xcorr(spec_ma, spec_b2)
+        overlap[part] = xcorr(spec_ma, spec_mb) if gaps else T - np.abs(lags)
+
+    overlap = np.rint(overlap)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        n = np.where(overlap > 0, overlap, np.nan)
+        cov = sum_ab - sum_a * sum_b / n
+        var_a = sum_a2 - sum_a ** 2 / n
+        var_b = sum_b2 - sum_b ** 2 / n
+        # a series constant over the overlap (up to fft roundoff) has no correlation
+        tiny = 1e-9 * n
+        corr = cov / np.sqrt(np.where(var_a > tiny, var_a, np.nan) * np.where(var_b > tiny, var_b, np.nan))
+    corr = np.where(overlap >= min_overlap, corr, np.nan)
+    return {'corr': corr, 'overlap': overlap.astype(int), 'lags': lags,
+            'targets': list(targets.columns), 'drivers': list(drivers.columns)}
+
+
+def leading_indicators(result: dict, k: int = 10, min_lag: int = 1, kinds: dict | None = None) -> pd.DataFrame:
+    """
+    Per target, the k drivers with the largest |correlation| at a lag >= min_lag (driver leading),
+    each at its best lag, with the same-hour correlation for comparison.
+
+    Args:
+        kinds (dict): driver name -> kind ('weather', 'flow'), shown as a column.
+    """
+    lags = result['lags']
+    leading = lags >= min_lag
+    corr = result['corr'][..., leading]
+    strength = np.nan_to_num(np.abs(corr), nan=-1.0)
+    best = strength.argmax(axis=-1)
+    best_corr = np.take_along_axis(corr, best[..., None], axis=-1)[..., 0]
+    best_overlap = np.take_along_axis(result['overlap'][..., leading], best[..., None], axis=-1)[..., 0]
+    same_hour = result['corr'][..., np.flatnonzero(lags == 0)[0]] if (lags == 0).any() else np.full(best_corr.shape, np.nan)
+
+    S, D = best_corr.shape
+    table = pd.DataFrame({
+        'target': np.repeat(result['targets'], D),
+        'driver': np.tile(result['drivers'], S),
+        'lag_h': lags[leading][best].ravel(),
+        'corr': best_corr.ravel(),
+        'corr_lag0': same_hour.ravel(),
+        'overlap_h': best_overlap.ravel(),
+    })
+    if kinds:
+        table.insert(2, 'kind', table['driver'].map(kinds))
+    table = table.dropna(subset=['corr'])
+    table = table.assign(strength=table['corr'].abs()).sort_values(['target', 'strength'], ascending=[True, False])
+    return table.groupby('target', sort=False).head(k).drop(columns='strength').reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--flow-dir", help="store or csv folder of the flows, default the store")
+    parser.add_argument("--weather-csv", default=WEATHER_CSV)
+    parser.add_argument("--zones", nargs="+", help="zones whose spreads are analysed, default all with prices")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--max-lag", type=int, default=MAX_LAG)
+    parser.add_argument("--min-lag", type=int, default=1, help="smallest lag counted as leading")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--no-deseasonalize", action="store_true", help="keep the daily profile")
+    parser.add_argument("--no-flows", action="store_true")
+    parser.add_argument("--csv", help="write the leading indicators here")
+    args = parser.parse_args()
+
+    spreads = spread_frame(args.store, args.zones, args.start, args.end)
+    drivers = {'weather': weather_frame(args.weather_csv)}
+    if not args.no_flows:
+        drivers['flow'] = flow_frame(args.flow_dir or args.store)
+    kinds = {name: kind for kind, frame in drivers.items() for name in frame.columns}
+    drivers = pd.concat([frame for frame in drivers.values() if len(frame.columns)], axis=1, sort=True) \
+        if any(len(frame.columns) for frame in drivers.values()) else pd.DataFrame()
+    if args.start is not None:
+        drivers = drivers[drivers.index >= to_utc_timestamp(args.start)]
+    if args.end is not None:
+        drivers = drivers[drivers.index < to_utc_timestamp(args.end)]
+    if spreads.empty or drivers.empty:
+        parser.error("need prices of at least two zones and at least one weather or flow series.")
+
+    result = lagged_correlation(spreads, drivers, args.max_lag, not args.no_deseasonalize)
+    table = leading_indicators(result, args.top, args.min_lag, kinds)
+    print(f"{len(result['targets'])} spreads x {len(result['drivers'])} drivers x {len(result['lags'])} lags")
+    print(table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+    if args.csv:
+        os.makedirs(os.path.dirname(os.path.abspath(args.csv)), exist_ok=True)
+        table.to_csv(args.csv, index=False)
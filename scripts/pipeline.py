@@ -0,0 +1,281 @@
+"""
+Runs the refresh pipeline of scripts/config/pipeline_config.py.
+
+Stages form a DAG through their inputs and outputs. Every stage whose dependencies are done
+starts right away (up to --max-workers at once, stages sharing a resource one at a time),
+and a stage is skipped when the hash of its script, arguments and input contents matches
+the last successful run and its outputs are unchanged since. A stage exiting non-zero is
+not recorded (and its last success forgotten), so the next run retries it, and the stages
+depending on it are blocked.
+
+    python scripts/pipeline.py                          # window from the config
+    python scripts/pipeline.py --until 2025-09-01       # nightly refresh up to a new end
+    python scripts/pipeline.py --only process_weather --force
+    python scripts/pipeline.py --dry-run
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+import threading
+from graphlib import TopologicalSorter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.config import pipeline_config
+from scripts.fetch_manifest import write_atomic
+
+STATE_DIR = os.path.join(project_root, "data", "cache", "pipeline")
+
+
+def _covers(output: str, path: str) -> bool:
+    """
+    True if output is path or a directory containing it (or the other way round).
+    """
+    output, path = os.path.normpath(output), os.path.normpath(path)
+    return output == path or path.startswith(output + os.sep) or output.startswith(path + os.sep)
+
+
+def stage_graph(stages: dict) -> dict[str, set]:
+    """
+    stage -> stages it depends on, from matching outputs and inputs.
+    """
+    graph = {}
+    for name, stage in stages.items():
+        graph[name] = {other for other, upstream in stages.items() if other != name
+                       and any(_covers(o, i) for o in upstream.get('outputs', []) for i in stage.get('inputs', []))}
+    return graph
+
+
+class ContentHasher:
+    """
+    sha1 of file contents, directories hashed over their files. Digests are remembered by
+    (size, mtime) so unchanged files are not read again on the next run.
+    """
+    def __init__(self, cache: dict | None = None):
+        self.cache = cache or {}
+        self._lock = threading.Lock()
+
+    def file(self, path: str) -> str:
+        stat = os.stat(path)
+        stamp = [stat.st_size, stat.st_mtime_ns]
+        with self._lock:
+            cached = self.cache.get(path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        h = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        with self._lock:
+            self.cache[path] = [stamp, h.hexdigest()]
+        return h.hexdigest()
+
+    def path(self, path: str) -> str | None:
+        """
+        Digest of a file or a directory tree, None if it does not exist.
+        """
+        full = os.path.join(project_root, path)
+        if os.path.isfile(full):
+            return self.file(full)
+        if not os.path.isdir(full):
+            return None
+        h = hashlib.sha1()
+        for dirpath, dirnames, filenames in os.walk(full):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.startswith(".tmp_"):
+                    continue
+                file_path = os.path.join(dirpath, filename)
+                h.update(f"{os.path.relpath(file_path, full)}:{self.file(file_path)}\n".encode())
+        return h.hexdigest()
+
+    def paths(self, paths: list) -> str:
+        return hashlib.sha1(json.dumps({p: self.path(p) for p in paths}, sort_keys=True).encode()).hexdigest()
+
+
+def stage_command(stage: dict, window: dict) -> list[str]:
+    return [sys.executable, stage['script']] + [arg.format(**window) for arg in stage.get('args', [])]
+
+
+class PipelineState:
+    """
+    Last successful run of every stage and the hasher cache, in STATE_DIR/state.json.
+    """
+    def __init__(self, state_dir: str = STATE_DIR):
+        self.path = os.path.join(state_dir, "state.json")
+        self.log_dir = os.path.join(state_dir, "logs")
+        raw = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                raw = json.load(f)
+        self.stages = raw.get('stages', {})
+        self.hasher = ContentHasher(raw.get('files', {}))
+        self._lock = threading.Lock()
+
+    def save(self):
+        with self._lock:
+            raw = {'stages': self.stages, 'files': self.hasher.cache}
+
+            def write(tmp_path):
+                with open(tmp_path, 'w') as f:
+                    json.dump(raw, f, indent=1, sort_keys=True)
+
+            write_atomic(self.path, write)
+
+
+def input_key(stage: dict, command: list, hasher: ContentHasher) -> str:
+    # the interpreter path is left out, the same run from another venv is still up to date
+    parts = {'command': command[1:], 'script': hasher.path(stage['script']), 'inputs': hasher.paths(stage.get('inputs', []))}
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def is_up_to_date(name: str, stage: dict, key: str, state: PipelineState) -> bool:
+    last = state.stages.get(name)
+    outputs = stage.get('outputs', [])
+    if not last or last.get('key') != key:
+        return False
+    if any(state.hasher.path(o) is None for o in outputs):
+        return False
+    return last.get('outputs') == state.hasher.paths(outputs)
+
+
+def run_stage(name: str, command: list, log_dir: str) -> tuple[int, float, str]:
+    """
+    Runs one stage as a subprocess from the project root, output goes to log_dir/<name>.log.
+    """
+    os.makedirs(log_dir, exist_ok=True)
+    log_path = os.path.join(log_dir, f"{name}.log")
+    t0 = time.perf_counter()
+    with open(log_path, 'w') as log:
+        code = subprocess.call(command, cwd=project_root, stdout=log, stderr=subprocess.STDOUT)
+    return code, time.perf_counter() - t0, log_path
+
+
+def _tail(path: str, lines: int = 15) -> str:
+    with open(path, errors='replace') as f:
+        return "".join(f.readlines()[-lines:])
+
+
+def run_pipeline(stages: dict = pipeline_config.STAGES, since=None, until=None, only=None, force: bool = False,
+                 dry_run: bool = False, max_workers: int = 4, state_dir: str = STATE_DIR) -> pd.DataFrame:
+    """
+    Runs the stages in dependency order with maximum overlap.
+
+    Args:
+        since, until: [since, until) window, the config's DATE_WINDOW by default.
+        only (list): run just these stages (their order among themselves is kept).
+        force (bool): run even if up to date.
+        dry_run (bool): only report what would run, stages downstream of one that would run included.
+
+    Returns:
+        pd.DataFrame: one row per stage with status (ran, skipped, failed, blocked, would run), seconds and log.
+    """
+    window = dict(pipeline_config.DATE_WINDOW)
+    window['since'] = str(pd.Timestamp(since or window['since']).date())
+    window['until'] = str(pd.Timestamp(until or window['until']).date())
+    window['until_inclusive'] = str((pd.Timestamp(window['until']) - pd.Timedelta(days=1)).date())
+
+    if only:
+        unknown = set(only) - set(stages)
+        if unknown:
+            raise KeyError(f"unknown stages: {', '.join(sorted(unknown))}")
+        stages = {name: stage for name, stage in stages.items() if name in only}
+
+    graph = stage_graph(stages)
+    sorter = TopologicalSorter(graph)
+    sorter.prepare()
+
+    state = PipelineState(state_dir)
+    report = {}
+    failed = set()
+    would_run = set()
+    busy = set()
+    waiting = []
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while sorter.is_active():
+            waiting.extend(sorter.get_ready())
+
+            for name in list(waiting):
+                stage = stages[name]
+                if graph[name] & failed:
+                    waiting.remove(name)
+                    failed.add(name)
+                    report[name] = {'status': 'blocked', 'seconds': 0.0, 'log': None}
+                    sorter.done(name)
+                    continue
+
+                resources = set(stage.get('resources', []))
+                if resources & busy or len(running) >= max_workers:
+                    continue
+                waiting.remove(name)
+
+                command = stage_command(stage, window)
+                key = input_key(stage, command, state.hasher)
+                # in a dry run the inputs written by an upstream that would run are not there yet
+                stale = dry_run and graph[name] & would_run
+                if not force and not stale and is_up_to_date(name, stage, key, state):
+                    report[name] = {'status': 'skipped', 'seconds': 0.0, 'log': None}
+                    sorter.done(name)
+                    continue
+                if dry_run:
+                    would_run.add(name)
+                    report[name] = {'status': 'would run', 'seconds': 0.0, 'log': None, 'command': " ".join(command[1:])}
+                    sorter.done(name)
+                    continue
+
+                print(f"[pipeline] start {name}: {' '.join(command[1:])}")
+                busy |= resources
+                running[pool.submit(run_stage, name, command, state.log_dir)] = (name, key, resources)
+
+            if not running:
+                # everything ready was skipped or blocked, new stages may be ready now
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, key, resources = running.pop(future)
+                busy -= resources
+                code, seconds, log_path = future.result()
+                if code == 0:
+                    state.stages[name] = {'key': key, 'outputs': state.hasher.paths(stages[name].get('outputs', [])),
+                                          'finished': pd.Timestamp.now(tz='UTC').isoformat()}
+                    state.save()
+                    report[name] = {'status': 'ran', 'seconds': seconds, 'log': log_path}
+                    print(f"[pipeline] done {name} in {seconds:.1f}s")
+                else:
+                    failed.add(name)
+                    # the outputs may be partly written, the next run must not take them as up to date
+                    if state.stages.pop(name, None) is not None:
+                        state.save()
+                    report[name] = {'status': 'failed', 'seconds': seconds, 'log': log_path}
+                    print(f"[pipeline] FAILED {name} (exit {code}), last lines of {log_path}:\n{_tail(log_path)}")
+                sorter.done(name)
+
+    state.save()
+    return pd.DataFrame([{'stage': name, **report[name]} for name in stages if name in report])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--since", help="first day of the window, default from the config")
+    parser.add_argument("--until", help="end day (exclusive) of the window, default from the config")
+    parser.add_argument("--only", nargs="+", help="run only these stages")
+    parser.add_argument("--force", action="store_true", help="run stages even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="show what would run")
+    parser.add_argument("--max-workers", type=int, default=4)
+    args = parser.parse_args()
+
+    result = run_pipeline(since=args.since, until=args.until, only=args.only, force=args.force,
+                          dry_run=args.dry_run, max_workers=args.max_workers)
+    print(result.to_string(index=False))
+    sys.exit(1 if result['status'].isin(['failed', 'blocked']).any() else 0)
@@ -0,0 +1,306 @@
+"""
+Rolling regressions of hourly prices and spreads on their fundamental drivers.
+
+Drivers per zone, on the hourly UTC grid: load, solar, wind (onshore + offshore, from the
+generation_mix dataset), residual load (load - solar - wind) and the national temperature of
+the processed weather csv. Every zone (and every spread pair) is one regression problem; the
+windows of all problems are fitted together: the cross products of the design are summed per
+step block with one einsum, windows are cumulative sums over blocks, and the normal equations
+of all (problem, window) pairs go through one batched np.linalg.solve.
+
+Window n covers the blocks n .. n + window/step - 1 and explains the hours of its last block,
+so the coefficients of each day come from the window that ends with it. The hourly output
+splits the price into the window mean, one contribution per driver
+beta * (driver - window mean of driver) and the residual.
+
+    python scripts/price_drivers.py --zones DE_LU HU AT --spreads DE_LU:HU --window-days 28
+    python scripts/price_drivers.py --drivers residual_load temperature
+"""
+import os
+import sys
+import argparse
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.fetch_manifest import write_atomic
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR
+from scripts.time_alignment import align_long, to_utc
+from scripts.generation_mix import GenerationMix
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+WEATHER_CSV = os.path.join(project_root, "data", "processed", "hourly_weather_wide_weeks29_30.csv")
+WEATHER_ZONES = {'DE': 'DE_LU', 'HU': 'HU'}  # country of the weather columns -> bidding zone
+OUTPUT_DIR = os.path.join(project_root, "data", "processed")
+
+# driver -> production types summed from generation_mix
+GENERATION_DRIVERS = {
+    'solar': ['Solar'],
+    'wind': ['Wind Onshore', 'Wind Offshore'],
+}
+DRIVERS = ['load', 'solar', 'wind', 'temperature']  # residual_load is load - solar - wind, use one or the other
+WINDOW_DAYS = 28
+STEP_HOURS = 24
+RIDGE = 1e-8  # on the standardised normal equations, keeps constant drivers (no wind data) solvable
+
+
+def _hourly_wide(long: pd.DataFrame, column: str) -> pd.DataFrame:
+    aligned = align_long(long, 'h', 'mean', keys=['zone'], columns=[column])
+    return aligned.pivot(index='timestamp', columns='zone', values=column)
+
+
+def driver_panel(store_root: str = DEFAULT_STORE_DIR, zones=None, start=None, end=None,
+                 weather_csv: str | None = WEATHER_CSV) -> dict:
+    """
+    Hourly time x zone frames of price and every driver on one grid.
+
+    Returns:
+        dict: 'price', 'load', 'solar', 'wind', 'residual_load', 'temperature' -> DataFrame
+        (all-NaN columns where a zone has no data).
+    """
+    store = TimeSeriesStore(store_root)
+    prices = store.read('prices', zones=zones, start=start, end=end)
+    panel = {'price': _hourly_wide(prices, 'value')}
+    zones = list(panel['price'].columns) if zones is None else list(zones)
+
+    load = store.read('load', zones=zones, start=start, end=end)
+    load_column = [c for c in load.columns if c not in ('timestamp', 'zone')][0]
+    panel['load'] = _hourly_wide(load, load_column)
+
+    types = [t for types in GENERATION_DRIVERS.values() for t in types]
+    mix = GenerationMix.load(store_root, zones=zones, psr_types=types, kinds=['generation'], start=start, end=end)
+    for driver, driver_types in GENERATION_DRIVERS.items():
+        totals = mix.totals('h', 'generation', driver_types)
+        totals.columns = totals.columns.astype(str)
+        panel[driver] = totals
+
+    if weather_csv and os.path.exists(weather_csv):
+        weather = pd.read_csv(weather_csv, parse_dates=['datetime'])
+        temperature = pd.DataFrame({zone: weather[f"{country}_avg_temp"].to_numpy()
+                                    for country, zone in WEATHER_ZONES.items() if f"{country}_avg_temp" in weather},
+                                   index=to_utc(weather['datetime']))
+        panel['temperature'] = temperature[temperature.index.notna()]
+    else:
+        panel['temperature'] = pd.DataFrame(columns=zones, dtype=float)
+
+    grid = panel['price'].index
+    if len(grid):
+        grid = pd.date_range(grid[0], grid[-1], freq='h', name='timestamp')
+    panel = {name: frame.reindex(index=grid, columns=zones).astype(float) for name, frame in panel.items()}
+    # same convention as GenerationMix.residual_load: missing production counts as none
+    panel['residual_load'] = panel['load'] - panel['solar'].fillna(0.0) - panel['wind'].fillna(0.0)
+    return panel
+
+
+def rolling_ols(y: np.ndarray, X: np.ndarray, window: int, step: int, min_obs: int | None = None) -> dict:
+    """
+    Least squares of y on X (with intercept) over rolling windows, for a batch of problems at once.
+    Hours with a missing value in y or any driver are left out of their windows.
+
+    Args:
+        y: (problems, hours) targets.
+        X: (problems, hours, drivers) regressors.
+        window, step: window length and stride in hours, window a multiple of step.
+        min_obs: hours a window needs for a fit, default half the window.
+
+    Returns:
+        dict: beta (P, N, K), intercept, r2, nobs, x_mean (P, N, K), y_mean (P, N),
+        window_end (N,) the hour after each window, and window/step.
+    """
+    if window % step:
+        raise ValueError(f"window ({window}) must be a multiple of step ({step}).")
+    P, T, K = X.shape
+    blocks = -(-T // step)
+    per_window = window // step
+    if blocks < per_window:
+        raise ValueError(f"{T} hours are shorter than one window of {window}.")
+    min_obs = window // 2 if min_obs is None else min_obs
+
+    ok = ~np.isnan(y) & ~np.isnan(X).any(axis=-1)
+    count = ok.sum(axis=1)
+    # center on the overall means so the block sums stay small
+    with np.errstate(invalid='ignore', divide='ignore'):
+        y_mu = np.where(ok, y, 0.0).sum(axis=1) / np.maximum(count, 1)
+        x_mu = np.where(ok[..., None], X, 0.0).sum(axis=1) / np.maximum(count, 1)[:, None]
+    design = np.zeros((P, blocks * step, K + 2))
+    design[:, :T, 0] = ok
+    design[:, :T, 1:K + 1] = np.where(ok[..., None], X - x_mu[:, None, :], 0.0)
+    design[:, :T, K + 1] = np.where(ok, y - y_mu[:, None], 0.0)
+
+    # cross products per block, then per window
+    design = design.reshape(P, blocks, step, K + 2)
+    block_sums = np.einsum('pbti,pbtj->pbij', design, design)
+    cumulative = np.concatenate([np.zeros((P, 1, K + 2, K + 2)), np.cumsum(block_sums, axis=1)], axis=1)
+    sums = cumulative[:, per_window:] - cumulative[:, :-per_window]
+
+    n = sums[..., 0, 0]
+    safe_n = np.maximum(n, 1)[..., None]
+    sx, sy = sums[..., 0, 1:K + 1], sums[..., 0, K + 1]
+    sxx = sums[..., 1:K + 1, 1:K + 1] - sx[..., :, None] * sx[..., None, :] / safe_n[..., None]
+    sxy = sums[..., 1:K + 1, K + 1] - sx * sy[..., None] / safe_n
+    syy = sums[..., K + 1, K + 1] - sy ** 2 / safe_n[..., 0]
+
+    # standardised normal equations, one batched solve for every problem and window
+    scale = np.sqrt(np.maximum(np.diagonal(sxx, axis1=-2, axis2=-1), 0.0))
+    scale[scale == 0] = 1.0
+    a = sxx / (scale[..., :, None] * scale[..., None, :]) + RIDGE * np.eye(K)
+    beta = np.linalg.solve(a, (sxy / scale)[..., None])[..., 0] / scale
+
+    x_mean = sx / safe_n + x_mu[:, None, :]
+    y_mean = sy / safe_n[..., 0] + y_mu[:, None]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = np.einsum('pnk,pnk->pn', beta, sxy) / syy
+    fitted = n >= min_obs
+    for array in (beta, x_mean, y_mean, r2):
+        array[~fitted] = np.nan
+
+    return {
+        'beta': beta, 'intercept': y_mean - np.einsum('pnk,pnk->pn', beta, x_mean), 'r2': r2, 'nobs': n.astype(int),
+        'x_mean': x_mean, 'y_mean': y_mean, 'window_end': np.arange(per_window, blocks + 1) * step,
+        'window': window, 'step': step,
+    }
+
+
+def contributions(y: np.ndarray, X: np.ndarray, fit: dict) -> dict:
+    """
+    Hourly decomposition y = baseline + sum of contributions + residual, each hour with the
+    coefficients of the window ending with its block (the first window for the hours before).
+
+    Returns:
+        dict: baseline (P, T), contribution (P, T, K), residual (P, T), window (T,) index of the fit.
+    """
+    T = y.shape[1]
+    per_window = fit['window'] // fit['step']
+    which = np.clip(np.arange(T) // fit['step'] - per_window + 1, 0, len(fit['window_end']) - 1)
+    beta, x_mean, baseline = fit['beta'][:, which], fit['x_mean'][:, which], fit['y_mean'][:, which]
+    contribution = beta * (X - x_mean)
+    return {'baseline': baseline, 'contribution': contribution,
+            'residual': y - baseline - contribution.sum(axis=-1), 'window': which}
+
+
+def _problems(panel: dict, zones, spreads, drivers) -> tuple[list, np.ndarray, np.ndarray, list]:
+    """
+    (names, y, X, driver names) of the zone problems or of the spread problems.
+    """
+    if spreads is None:
+        y = np.stack([panel['price'][z].to_numpy() for z in zones])
+        X = np.stack([np.column_stack([panel[d][z].to_numpy() for d in drivers]) for z in zones])
+        return list(zones), y, X, list(drivers)
+    names = [f"{a}-{b}" for a, b in spreads]
+    y = np.stack([panel['price'][a].to_numpy() - panel['price'][b].to_numpy() for a, b in spreads])
+    X = np.stack([np.column_stack([panel[d][z].to_numpy() for z in (a, b) for d in drivers]) for a, b in spreads])
+    return names, y, X, [f"{side}_{d}" for side in ('a', 'b') for d in drivers]
+
+
+def _usable(panel: dict, drivers: list, min_coverage: float = 0.5) -> dict:
+    """
+    Panel with the drivers a zone reports for less than min_coverage of its priced hours set
+    to 0 (wind in a zone without wind farms, temperature outside DE/HU or outside the weather
+    window), so the zone is still fitted on the other drivers instead of losing those hours.
+    """
+    panel = dict(panel)
+    priced = panel['price'].notna()
+    for d in drivers:
+        coverage = (panel[d].notna() & priced).sum() / priced.sum().clip(lower=1)
+        sparse = coverage < min_coverage
+        if sparse.any():
+            logging.warning(f"Not using {d} for {', '.join(sparse.index[sparse])}: "
+                            f"it covers less than {min_coverage:.0%} of the priced hours")
+            panel[d] = panel[d].copy()
+            panel[d].loc[:, sparse] = 0.0
+    return panel
+
+
+def explain_prices(panel: dict, zones=None, spreads=None, drivers=DRIVERS, window_days: int = WINDOW_DAYS,
+                   step_hours: int = STEP_HOURS) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rolling fits of every zone price (and every spread a - b) on its drivers, spreads on the
+    drivers of both zones.
+
+    Returns:
+        (pd.DataFrame, pd.DataFrame): hourly contributions (timestamp, target, actual, baseline,
+        one column per driver, residual) and the fits (window_end, target, intercept, beta_*, r2, nobs).
+    """
+    zones = list(panel['price'].columns) if zones is None else list(zones)
+    panel = _usable(panel, drivers)
+    index = panel['price'].index
+    problems = []
+    if zones:
+        problems.append(_problems(panel, zones, None, drivers))
+    if spreads:
+        problems.append(_problems(panel, zones, spreads, drivers))
+
+    hourly, fits = [], []
+    for names, y, X, columns in problems:
+        fit = rolling_ols(y, X, window_days * 24, step_hours)
+        parts = contributions(y, X, fit)
+
+        P, T = y.shape
+        frame = pd.DataFrame({
+            'timestamp': np.tile(index, P),
+            'target': pd.Categorical(np.repeat(names, T), categories=names),
+            'actual': y.ravel(),
+            'baseline': parts['baseline'].ravel(),
+        })
+        for k, column in enumerate(columns):
+            frame[column] = parts['contribution'][..., k].ravel()
+        frame['residual'] = parts['residual'].ravel()
+        hourly.append(frame)
+
+        N = len(fit['window_end'])
+        ends = index[0] + pd.to_timedelta(np.minimum(fit['window_end'], T), unit='h')
+        table = pd.DataFrame({'window_end': np.tile(ends, P), 'target': np.repeat(names, N),
+                              'intercept': fit['intercept'].ravel()})
+        for k, column in enumerate(columns):
+            table[f"beta_{column}"] = fit['beta'][..., k].ravel()
+        table['r2'] = fit['r2'].ravel()
+        table['nobs'] = fit['nobs'].ravel()
+        fits.append(table)
+
+    return pd.concat(hourly, ignore_index=True), pd.concat(fits, ignore_index=True)
+
+
+def _write_parquet(frame: pd.DataFrame, path: str):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    write_atomic(path, lambda tmp_path: pq.write_table(table, tmp_path, compression='zstd'))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--zones", nargs="+", help="default every zone with prices")
+    parser.add_argument("--spreads", nargs="*", default=["DE_LU:HU"], help="a:b pairs, the spread is a - b")
+    parser.add_argument("--drivers", nargs="+", default=DRIVERS,
+                        choices=['load', 'solar', 'wind', 'residual_load', 'temperature'])
+    parser.add_argument("--window-days", type=int, default=WINDOW_DAYS)
+    parser.add_argument("--step-hours", type=int, default=STEP_HOURS)
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--weather-csv", default=WEATHER_CSV)
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    spreads = [tuple(pair.split(":", 1)) for pair in args.spreads]
+    zones = args.zones
+    if zones is not None:
+        zones = list(dict.fromkeys(zones + [z for pair in spreads for z in pair]))
+    panel = driver_panel(args.store, zones, args.start, args.end, args.weather_csv)
+    missing = [z for pair in spreads for z in pair if z not in panel['price'].columns]
+    if missing:
+        parser.error(f"no prices for {', '.join(missing)}")
+
+    hourly, fits = explain_prices(panel, args.zones, spreads, args.drivers, args.window_days, args.step_hours)
+    os.makedirs(args.output_dir, exist_ok=True)
+    _write_parquet(hourly, os.path.join(args.output_dir, "price_driver_contributions.parquet"))
+    _write_parquet(fits, os.path.join(args.output_dir, "price_driver_fits.parquet"))
+
+    summary = fits.groupby('target', observed=True)[['r2'] + [c for c in fits.columns if c.startswith('beta_')]].median()
+    print(summary.round(4).to_string())
+    logging.info(f"{len(hourly)} hourly rows and {len(fits)} fits written to {args.output_dir}")
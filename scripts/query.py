@@ -0,0 +1,224 @@
+"""
+SQL over the parquet store with DuckDB, without loading whole datasets into pandas.
+
+Every dataset of the store is a view (prices, load, generation[_mix], flows, net_positions) with
+the columns timestamp (UTC), zone[, neighbour], year and the value columns; the hourly weather
+csv is the view weather (timestamp, country, city, temperature, ...). Zone/year filters prune
+whole files and timestamp filters skip parquet row groups, so only the requested slice is read.
+
+    with MarketQuery() as q:
+        q.sql("SELECT zone, avg(value) FROM prices WHERE year = 2024 GROUP BY zone")
+        q.spread('DE_LU', 'HU', '2021-01-01', '2026-01-01', period='week')
+
+    python scripts/query.py "SELECT zone, count(*) FROM flows GROUP BY zone"
+"""
+import os
+import sys
+import argparse
+import duckdb
+import pandas as pd
+import pyarrow as pa
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.timeseries_store import DEFAULT_STORE_DIR, to_utc_timestamp
+from scripts.config.market_config import MARKET_TZ
+
+# view -> store dataset
+VIEWS = {
+    'prices': 'prices',
+    'load': 'load',
+    'generation': 'generation',
+    'generation_mix': 'generation_mix',
+    'flows': 'flows',
+    'net_positions': 'net_position',
+}
+WEATHER_CSV = os.path.join(project_root, "data", "raw", "hourly_weather_HU_DE_weeks29_30.csv")
+WEATHER_TZ = 'Europe/Berlin'  # the fetcher asks open-meteo for local time
+
+PERIODS = ('hour', 'day', 'week', 'month', 'quarter', 'year')
+AGGREGATES = ('avg', 'sum', 'min', 'max', 'median', 'stddev', 'count')
+
+
+def _quote(text: str) -> str:
+    return "'" + text.replace("'", "''") + "'"
+
+
+class MarketQuery:
+    """
+    DuckDB connection with a view per store dataset.
+
+    Attributes:
+        root (str): store directory.
+        con (duckdb.DuckDBPyConnection): the connection, for anything the helpers don't cover.
+        views (list): views that were created (datasets missing from the store have none).
+    """
+    def __init__(self, root: str = DEFAULT_STORE_DIR, weather_csv: str | None = WEATHER_CSV,
+                 database: str = ':memory:', threads: int | None = None):
+        self.root = root
+        self.con = duckdb.connect(database)
+        self.con.execute("SET TimeZone = 'UTC'")
+        if threads:
+            self.con.execute(f"SET threads = {int(threads)}")
+
+        self.views = []
+        for view, dataset in VIEWS.items():
+            path = os.path.join(root, f"dataset={dataset}")
+            if not os.path.isdir(path):
+                continue
+            files = _quote(os.path.join(path, "zone=*", "**", "*.parquet"))  # not the _index of generation_mix
+            # value columns can differ between files (a new production type), read with the union
+            self.con.execute(f"""
+                CREATE OR REPLACE VIEW {view} AS
+                SELECT * EXCLUDE (dataset)
+                FROM read_parquet({files}, hive_partitioning = true, union_by_name = true,
+                                  hive_types = {{'year': INTEGER}})""")
+            self.views.append(view)
+
+        if weather_csv and os.path.exists(weather_csv):
+            self.con.execute(f"""
+                CREATE OR REPLACE VIEW weather AS
+                SELECT timezone({_quote(WEATHER_TZ)}, datetime) AS timestamp, * EXCLUDE (datetime)
+                FROM read_csv({_quote(weather_csv)}, header = true, timestampformat = '%Y-%m-%d %H:%M:%S')""")
+            self.views.append('weather')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def columns(self, view: str) -> list[str]:
+        self._check(view)
+        return [row[0] for row in self.con.execute(f"DESCRIBE {view}").fetchall()]
+
+    def sql(self, query: str, params=None) -> pd.DataFrame:
+        """
+        Runs a query, ? placeholders are bound from params.
+        """
+        return self.con.execute(query, params or []).df()
+
+    def arrow(self, query: str, params=None) -> pa.Table:
+        return self.con.execute(query, params or []).fetch_arrow_table()
+
+    def _check(self, view: str):
+        if view not in self.views:
+            raise KeyError(f"no view '{view}', the store has {', '.join(self.views) or 'no datasets'}.")
+
+    def _where(self, view: str, zones=None, start=None, end=None, neighbours=None) -> tuple[str, list]:
+        """
+        WHERE clause and parameters for zone and [start, end) filters, with the matching year
+        bounds so files outside the window are never opened. Zones of the weather view are countries.
+        """
+        clauses, params = [], []
+        partitioned = view != 'weather'
+        if zones is not None:
+            zones = list(zones)
+            clauses.append(f"{'zone' if partitioned else 'country'} IN ({', '.join('?' * len(zones))})")
+            params += zones
+        if neighbours is not None:
+            neighbours = list(neighbours)
+            clauses.append(f"neighbour IN ({', '.join('?' * len(neighbours))})")
+            params += neighbours
+        if start is not None:
+            start = to_utc_timestamp(start)
+            if partitioned:
+                clauses.append("year >= ?")
+                params.append(start.year)
+            clauses.append("timestamp >= ?")
+            params.append(start.to_pydatetime())
+        if end is not None:
+            end = to_utc_timestamp(end)
+            if partitioned:
+                clauses.append("year <= ?")
+                params.append(end.year)
+            clauses.append("timestamp < ?")
+            params.append(end.to_pydatetime())
+        return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def read(self, view: str, zones=None, columns=None, start=None, end=None, neighbours=None,
+             period: str | None = None, agg: str = 'avg', arrow: bool = False):
+        """
+        Filtered long frame of a view, optionally aggregated per period.
+
+        Args:
+            columns (list): value columns, None keeps all.
+            period (str): one of PERIODS, buckets are in market time (MARKET_TZ) from 'day' up.
+            agg (str): one of AGGREGATES, applied per series and period.
+            arrow (bool): return a pyarrow Table instead of a DataFrame.
+        """
+        self._check(view)
+        available = self.columns(view)
+        keys = [k for k in ('zone', 'neighbour', 'psr_type', 'kind', 'country', 'city') if k in available]
+        skip = {'timestamp', 'year', *keys}
+        values = [c for c in (columns or available) if c in available and c not in skip]
+        where, params = self._where(view, zones, start, end, neighbours if 'neighbour' in available else None)
+
+        if period is None:
+            select = ", ".join(['timestamp', *keys, *(f'"{c}"' for c in values)])
+            query = f"SELECT {select} FROM {view} {where} ORDER BY {', '.join([*keys, 'timestamp'])}"
+        else:
+            if period not in PERIODS or agg not in AGGREGATES:
+                raise ValueError(f"period must be one of {PERIODS} and agg one of {AGGREGATES}.")
+            bucket = "date_trunc('hour', timestamp)" if period == 'hour' \
+                else f"date_trunc('{period}', timezone({_quote(MARKET_TZ)}, timestamp))"
+            select = ", ".join([f"{bucket} AS period", *keys, *(f'{agg}("{c}") AS "{c}"' for c in values)])
+            query = f"SELECT {select} FROM {view} {where} GROUP BY ALL ORDER BY {', '.join([*keys, 'period'])}"
+
+        return self.arrow(query, params) if arrow else self.sql(query, params)
+
+    def spread(self, zone_a: str, zone_b: str, start=None, end=None, period: str = 'week') -> pd.DataFrame:
+        """
+        Statistics of the hourly price spread zone_a - zone_b per period (market time).
+        Prices are averaged to the hour first, so 15-minute and hourly products mix.
+
+        Returns:
+            pd.DataFrame: period, mean, std, min, max and hours (with both prices).
+        """
+        self._check('prices')
+        if period not in PERIODS:
+            raise ValueError(f"period must be one of {PERIODS}.")
+        where, params = self._where('prices', [zone_a, zone_b], start, end)
+        query = f"""
+            WITH hourly AS (
+                SELECT date_trunc('hour', timestamp) AS hour, zone, avg(value) AS price
+                FROM prices {where}
+                GROUP BY ALL
+            ), spread AS (
+                SELECT hour, first(price) FILTER (WHERE zone = ?) - first(price) FILTER (WHERE zone = ?) AS spread
+                FROM hourly
+                GROUP BY hour
+            )
+            SELECT date_trunc('{period}', timezone({_quote(MARKET_TZ)}, hour)) AS period,
+                   avg(spread) AS mean, stddev_samp(spread) AS std, min(spread) AS min, max(spread) AS max,
+                   count(spread) AS hours
+            FROM spread
+            GROUP BY period
+            ORDER BY period"""
+        return self.sql(query, params + [zone_a, zone_b])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("query", nargs="?", help="SQL to run, without it the views and their columns are listed")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--weather-csv", default=WEATHER_CSV)
+    parser.add_argument("--csv", help="write the result here instead of printing it")
+    args = parser.parse_args()
+
+    with MarketQuery(args.store, args.weather_csv) as q:
+        if not args.query:
+            for view in q.views:
+                print(f"{view}: {', '.join(q.columns(view))}")
+        else:
+            result = q.sql(args.query)
+            if args.csv:
+                result.to_csv(args.csv, index=False)
+                print(f"{len(result)} rows written to {args.csv}")
+            else:
+                print(result.to_string(index=False))
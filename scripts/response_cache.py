@@ -0,0 +1,288 @@
+"""
+On-disk cache of raw API responses, for the ENTSO-E client and the Open-Meteo calls.
+
+CachingSession is a requests.Session that answers a GET it has seen before from disk.
+Entries are keyed by a hash of (method, endpoint, parameters), the time window being part of
+the parameters and the api token not, and stored zlib-compressed, one file per entry. Hits
+touch the file, and when the cache grows past its byte budget the least recently used
+files are removed. Windows that end less than RECENT_DAYS ago may still be revised by the
+source, their entries expire after a TTL; older windows are kept until evicted.
+
+    API_CACHE_DIR      cache directory (default data/cache/api), 'off' disables the cache
+    API_CACHE_MAX_MB   byte budget
+    API_CACHE_TTL_HOURS  lifetime of entries for recent windows
+
+    python scripts/response_cache.py            # size and entry count
+    python scripts/response_cache.py --clear
+"""
+import os
+import sys
+import json
+import time
+import zlib
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import pandas as pd
+import requests
+from requests.structures import CaseInsensitiveDict
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.fetch_manifest import write_atomic
+
+DEFAULT_CACHE_DIR = os.path.join(project_root, "data", "cache", "api")
+DEFAULT_MAX_BYTES = 1024 * 2**20
+DEFAULT_TTL_SECONDS = 6 * 3600
+LOW_WATER = 0.9  # past the budget, evict down to this share of it
+RECENT_DAYS = 7
+
+# parameters that don't change the answer, never part of the key nor written to disk
+IGNORED_PARAMS = {'securityToken', 'apikey'}
+# parameter holding the end of the requested window -> its format
+WINDOW_END_PARAMS = {
+    'periodEnd': '%Y%m%d%H%M',  # ENTSO-E, UTC
+    'end_date': '%Y-%m-%d',     # Open-Meteo archive, inclusive day
+}
+
+
+def request_key(method: str, url: str) -> tuple[str, dict]:
+    """
+    Hash and canonical description of a request, the same for any parameter order or token.
+    """
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in IGNORED_PARAMS)
+    canonical = f"{method.upper()} {parts.scheme}://{parts.netloc}{parts.path}?{urlencode(params)}"
+    return hashlib.sha256(canonical.encode()).hexdigest(), {'request': canonical, 'params': dict(params)}
+
+
+def window_end(params: dict) -> pd.Timestamp | None:
+    for name, fmt in WINDOW_END_PARAMS.items():
+        if params.get(name):
+            try:
+                end = pd.to_datetime(params[name], format=fmt, utc=True)
+            except ValueError:
+                return None
+            return end + pd.Timedelta(days=1) if name == 'end_date' else end
+    return None
+
+
+class ResponseCache:
+    """
+    Compressed responses under root/<2 hex>/<sha256>.z. Past max_bytes the least recently used
+    are evicted down to LOW_WATER of it, so a full cache is not rescanned on every put.
+
+    Attributes:
+        root (str): cache directory.
+        max_bytes (int): budget of the compressed files.
+        ttl (float): seconds an entry of a recent window stays valid, None keeps them.
+        recent_days (int): windows ending later than this many days ago count as recent.
+    """
+    def __init__(self, root: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttl: float | None = DEFAULT_TTL_SECONDS, recent_days: int = RECENT_DAYS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.recent_days = recent_days
+        self._bytes = None
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.z")
+
+    def _entries(self):
+        """
+        (path, size, mtime) of every entry.
+        """
+        if not os.path.isdir(self.root):
+            return
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.name.endswith(".z") and not entry.name.startswith(".tmp_"):
+                    stat = entry.stat()
+                    yield entry.path, stat.st_size, stat.st_mtime
+
+    def size(self) -> tuple[int, int]:
+        """
+        (entries, bytes) on disk.
+        """
+        entries = list(self._entries())
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def _expired(self, meta: dict) -> bool:
+        if self.ttl is None or meta.get('window_end') is None:
+            return False
+        recent = pd.Timestamp(meta['window_end']) > pd.Timestamp.now(tz='UTC') - pd.Timedelta(days=self.recent_days)
+        return recent and time.time() - meta['stored'] > self.ttl
+
+    def _read(self, path: str) -> tuple[dict, bytes] | None:
+        try:
+            with open(path, 'rb') as f:
+                raw = zlib.decompress(f.read())
+        except (FileNotFoundError, zlib.error):
+            return None
+        header, body = raw.split(b"\n", 1)
+        meta = json.loads(header)
+        if self._expired(meta):
+            self._remove(path)
+            return None
+        return meta, body
+
+    def contains(self, key: str) -> bool:
+        return self._read(self.path(key)) is not None
+
+    def get(self, key: str) -> tuple[dict, bytes] | None:
+        """
+        (metadata, body) of a valid entry, None on a miss.
+        """
+        path = self.path(key)
+        entry = self._read(path)
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        try:
+            os.utime(path)  # recently used
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, meta: dict, body: bytes):
+        data = zlib.compress(json.dumps(meta).encode() + b"\n" + body, 6)
+
+        def write(tmp_path):
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+
+        write_atomic(self.path(key), write)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self.size()[1]
+            else:
+                self._bytes += len(data)
+            over = self._bytes > self.max_bytes
+        if over:
+            self.evict(int(self.max_bytes * LOW_WATER))
+
+    def _remove(self, path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self, max_bytes: int | None = None) -> int:
+        """
+        Removes least recently used entries until the cache fits max_bytes (default the budget).
+        Other processes may share the directory, so the sizes are taken from disk.
+
+        Returns:
+            int: entries removed.
+        """
+        budget = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total <= budget:
+                break
+            self._remove(path)
+            total -= size
+            removed += 1
+        with self._lock:
+            self._bytes = total
+        return removed
+
+    def clear(self) -> int:
+        return self.evict(0)
+
+
+class CachingSession(requests.Session):
+    """
+    requests.Session serving repeated GETs from a ResponseCache. Only 200 answers are stored,
+    a hit comes back as a Response with the stored body, content type and an X-Cache: hit header.
+    """
+    def __init__(self, cache: ResponseCache | None = None):
+        super().__init__()
+        self.cache = cache or ResponseCache()
+
+    def cached_response(self, url: str, params=None) -> requests.Response | None:
+        """
+        The cached answer to a GET of url with params, None on a miss.
+        """
+        prepared = self.prepare_request(requests.Request('GET', url, params=params))
+        cached = self.cache.get(request_key('GET', prepared.url)[0])
+        return None if cached is None else self._hit(prepared, *cached)
+
+    @staticmethod
+    def _hit(request, meta: dict, body: bytes) -> requests.Response:
+        response = requests.Response()
+        response.status_code = meta['status']
+        response.reason = 'OK'
+        response._content = body
+        response.headers = CaseInsensitiveDict({'Content-Type': meta['content_type'], 'X-Cache': 'hit'})
+        response.encoding = meta.get('encoding')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def send(self, request, **kwargs):
+        if request.method != 'GET':
+            return super().send(request, **kwargs)
+
+        key, described = request_key(request.method, request.url)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self._hit(request, *cached)
+
+        response = super().send(request, **kwargs)
+        if response.status_code == 200:
+            end = window_end(described['params'])
+            meta = {
+                'request': described['request'],
+                'status': response.status_code,
+                'content_type': response.headers.get('Content-Type', ''),
+                'encoding': response.encoding,
+                'window_end': end.isoformat() if end is not None else None,
+                'stored': time.time(),
+            }
+            self.cache.put(key, meta, response.content)
+        return response
+
+
+def cached_session() -> requests.Session:
+    """
+    Session for the fetchers, configured from the API_CACHE_* environment variables,
+    a plain requests.Session when API_CACHE_DIR is 'off'.
+    """
+    root = os.environ.get("API_CACHE_DIR", DEFAULT_CACHE_DIR)
+    if root.lower() in ("off", "0", "none", ""):
+        return requests.Session()
+    max_bytes = int(float(os.environ.get("API_CACHE_MAX_MB", DEFAULT_MAX_BYTES / 2**20)) * 2**20)
+    ttl_hours = os.environ.get("API_CACHE_TTL_HOURS")
+    ttl = float(ttl_hours) * 3600 if ttl_hours else DEFAULT_TTL_SECONDS
+    return CachingSession(ResponseCache(root, max_bytes=max_bytes, ttl=ttl))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.environ.get("API_CACHE_DIR", DEFAULT_CACHE_DIR))
+    parser.add_argument("--clear", action="store_true", help="remove every entry")
+    parser.add_argument("--evict-to-mb", type=float, help="remove least recently used entries down to this size")
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.dir)
+    if args.clear:
+        print(f"removed {cache.clear()} entries")
+    elif args.evict_to_mb is not None:
+        print(f"removed {cache.evict(int(args.evict_to_mb * 2**20))} entries")
+    entries, size = cache.size()
+    print(f"{args.dir}: {entries} entries, {size / 2**20:.1f} MB")
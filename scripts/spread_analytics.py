@@ -0,0 +1,198 @@
+"""
+Spread and volatility analytics for any set of price zones.
+
+Input is a wide frame of aligned prices (UTC index, one column per zone). Every result
+is computed over all pairs at once with array/window operations and cached on disk
+under a hash of the prices and parameters, keeping the MAX_CACHE_ENTRIES most recently used.
+
+    python scripts/spread_analytics.py --zones DE_LU HU AT SK --start 2023-01-01 --end 2025-08-01
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.config.market_config import MARKET_TZ, PEAK_HOURS
+from scripts.timeseries_store import TimeSeriesStore, DEFAULT_STORE_DIR
+from scripts.time_alignment import align_wide, DATASET_RULES
+
+DEFAULT_CACHE_DIR = os.path.join(project_root, "data", "cache", "spread_analytics")
+MAX_CACHE_ENTRIES = 32  # results kept, least recently used pruned first
+PAIR_SEP = "-"
+DURATION_POINTS = 101  # 0..100 % of time exceeded
+
+
+def price_matrix(store: TimeSeriesStore, zones, start=None, end=None, freq: str = 'h') -> pd.DataFrame:
+    """
+    Day-ahead prices from the store as a wide frame on a common grid, one column per zone.
+    15-minute and hourly products are mixed freely, see time_alignment.
+    """
+    long = store.read('prices', zones=zones, columns=['value'], start=start, end=end)
+    wide = align_wide(long, freq, DATASET_RULES['prices'], start=start, end=end)
+    return wide.reindex(columns=[z for z in zones if z in wide.columns])
+
+
+def all_pairs(zones) -> list[tuple[str, str]]:
+    return list(itertools.combinations(zones, 2))
+
+
+def pairwise_spreads(prices: pd.DataFrame, pairs=None) -> pd.DataFrame:
+    """
+    a - b for every pair, columns named 'a-b' (the notebook's de_hu_spread is 'DE_LU-HU').
+    """
+    pairs = all_pairs(prices.columns) if pairs is None else list(pairs)
+    position = {zone: i for i, zone in enumerate(prices.columns)}
+    a = [position[p[0]] for p in pairs]
+    b = [position[p[1]] for p in pairs]
+
+    values = prices.to_numpy(dtype=float)
+    return pd.DataFrame(values[:, a] - values[:, b], index=prices.index,
+                        columns=[f"{x}{PAIR_SEP}{y}" for x, y in pairs])
+
+
+def rolling_volatility(frame: pd.DataFrame, window: str = '7D', min_fraction: float = 0.5) -> pd.DataFrame:
+    """
+    Rolling standard deviation over a time window, all columns in one pass.
+    """
+    step = frame.index.to_series().diff().median()
+    min_periods = max(2, int(pd.Timedelta(window) / step * min_fraction)) if pd.notna(step) else 2
+    return frame.rolling(window, min_periods=min_periods).std()
+
+
+def _market_time(index: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    return index.tz_convert(MARKET_TZ) if index.tz is not None else index
+
+
+def peak_offpeak(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Daily peak and off-peak means, indexed by market day with ('peak'|'offpeak', column) columns.
+    """
+    local = _market_time(frame.index)
+    in_peak = (local.dayofweek < 5) & (local.hour >= PEAK_HOURS[0]) & (local.hour < PEAK_HOURS[1])
+    block = np.where(in_peak, 'peak', 'offpeak')
+    days = pd.DatetimeIndex(local.date, name='date')
+
+    out = frame.groupby([days, block]).mean().unstack()
+    out.columns = out.columns.swaplevel()
+    return out.reindex(columns=pd.MultiIndex.from_product([['peak', 'offpeak'], frame.columns]))
+
+
+def weekday_profile(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mean by (weekday, hour) in market time.
+    """
+    local = _market_time(frame.index)
+    return frame.groupby([pd.Index(local.dayofweek, name='weekday'), pd.Index(local.hour, name='hour')]).mean()
+
+
+def duration_curves(frame: pd.DataFrame, points: int = DURATION_POINTS) -> pd.DataFrame:
+    """
+    Value exceeded x % of the time, for each column, indexed by x.
+    """
+    exceeded = np.linspace(0, 100, points)
+    values = frame.to_numpy(dtype=float)
+    if not len(values):
+        return pd.DataFrame(index=pd.Index(exceeded, name='exceeded_pct'), columns=frame.columns, dtype=float)
+    curves = np.nanpercentile(values, 100 - exceeded, axis=0)
+    return pd.DataFrame(curves, index=pd.Index(exceeded, name='exceeded_pct'), columns=frame.columns)
+
+
+def input_hash(prices: pd.DataFrame, **params) -> str:
+    """
+    Hash of the price values, index, columns and parameters.
+    """
+    h = hashlib.sha1()
+    h.update(pd.util.hash_pandas_object(prices, index=True).to_numpy().tobytes())
+    h.update(json.dumps([list(map(str, prices.columns)), params], sort_keys=True, default=str).encode())
+    return h.hexdigest()[:16]
+
+
+RESULTS = ('spreads', 'volatility', 'peak_offpeak', 'weekday_profile', 'duration_curves')
+
+
+def prune_cache(cache_dir: str = DEFAULT_CACHE_DIR, keep: int = MAX_CACHE_ENTRIES) -> int:
+    """
+    Removes all but the keep most recently used results. Returns the number removed.
+    """
+    try:
+        entries = [e for e in os.scandir(cache_dir) if e.is_dir() and '.tmp' not in e.name]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[keep:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+    return max(0, len(entries) - keep)
+
+
+def analyze_spreads(prices: pd.DataFrame, pairs=None, window: str = '7D',
+                    cache_dir: str | None = DEFAULT_CACHE_DIR) -> dict[str, pd.DataFrame]:
+    """
+    All spread analytics for the given prices, from cache if the same input was seen before.
+
+    Returns:
+        dict: spreads, volatility (rolling, of the spreads), peak_offpeak,
+              weekday_profile and duration_curves (all of the spreads).
+    """
+    pairs = None if pairs is None else [tuple(p) for p in pairs]
+    key = input_hash(prices, pairs=pairs, window=window)
+    path = os.path.join(cache_dir, key) if cache_dir else None
+
+    if path and os.path.isdir(path):
+        os.utime(path)
+        return {name: pd.read_parquet(os.path.join(path, f"{name}.parquet")) for name in RESULTS}
+
+    spreads = pairwise_spreads(prices, pairs)
+    results = {
+        'spreads': spreads,
+        'volatility': rolling_volatility(spreads, window),
+        'peak_offpeak': peak_offpeak(spreads),
+        'weekday_profile': weekday_profile(spreads),
+        'duration_curves': duration_curves(spreads),
+    }
+
+    if path:
+        # written to a temp dir first, so a half-written entry is never read back
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        os.makedirs(tmp_path, exist_ok=True)
+        for name, frame in results.items():
+            frame.to_parquet(os.path.join(tmp_path, f"{name}.parquet"))
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        prune_cache(cache_dir)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR)
+    parser.add_argument("--zones", nargs="+", default=['DE_LU', 'HU'])
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--freq", default='h', help="common grid, e.g. h or 15min")
+    parser.add_argument("--window", default='7D')
+    parser.add_argument("--no-cache", action="store_true")
+    args = parser.parse_args()
+
+    prices = price_matrix(TimeSeriesStore(args.store), args.zones, args.start, args.end, args.freq)
+    print(f"Prices: {prices.shape[0]} timestamps, zones {list(prices.columns)}")
+
+    t0 = time.perf_counter()
+    results = analyze_spreads(prices, window=args.window, cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR)
+    print(f"Computed in {time.perf_counter() - t0:.2f}s")
+
+    print("\nSpread duration curves (EUR/MWh exceeded x % of the time):")
+    print(results['duration_curves'].iloc[::10].round(1))
+    print("\nMean spread by block:")
+    print(results['peak_offpeak'].mean().unstack(0).round(2))
@@ -0,0 +1,232 @@
+"""
+Puts time series of mixed resolution (15-minute and hourly prices, load, generation, flows,
+hourly weather) on one UTC grid.
+
+Every sample is taken to cover [t, t + d), where d is the shorter of the gaps to its neighbours
+in the same series, so a switch from hourly to quarter-hourly products or a hole in the data
+does not stretch samples. Samples are then spread over or pooled into the grid bins according
+to a rule:
+
+    'mean'         averages (MW, EUR/MWh): time-weighted mean down, repeated up
+    'sum'          energies (MWh): summed down, split evenly up
+    'interpolate'  instantaneous readings (temperature, wind): time-weighted mean down, linear up
+
+All series of a long frame are aligned together in one pass, there is no merge per pair.
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.timeseries_store import to_utc_timestamp
+from scripts.config.market_config import MARKET_TZ
+
+RULES = ('mean', 'sum', 'interpolate')
+
+# default rule per store dataset
+DATASET_RULES = {
+    'prices': 'mean',
+    'load': 'mean',
+    'generation': 'mean',
+    'flows': 'mean',
+    'net_position': 'mean',
+    'weather': 'interpolate',
+}
+
+SERIES_KEYS = ('zone', 'neighbour')
+
+
+def to_utc(values, tz: str = MARKET_TZ) -> pd.DatetimeIndex:
+    """
+    Timestamps as a UTC DatetimeIndex. Naive values are local time in tz: the repeated hour at the
+    end of summer time is resolved from the order of the data, unresolvable and non-existent
+    local times become NaT.
+    """
+    index = pd.DatetimeIndex(values)
+    if index.tz is not None:
+        return index.tz_convert('UTC')
+    try:
+        local = index.tz_localize(tz, ambiguous='infer', nonexistent='NaT')
+    except Exception:  # ValueError in recent pandas, pytz errors in older ones
+        local = index.tz_localize(tz, ambiguous='NaT', nonexistent='NaT')
+    return local.tz_convert('UTC')
+
+
+def _step(freq) -> int:
+    """
+    Grid step in nanoseconds, freq must be a fixed offset.
+    """
+    return pd.tseries.frequencies.to_offset(freq).nanos
+
+
+def _group_codes(long: pd.DataFrame, keys: list) -> tuple[np.ndarray, pd.DataFrame]:
+    """
+    One integer per series and the key values of each code.
+    """
+    if not keys:
+        return np.zeros(len(long), dtype=np.int64), pd.DataFrame(index=[0])
+    codes = np.zeros(len(long), dtype=np.int64)
+    for key in keys:
+        c, u = pd.factorize(long[key], use_na_sentinel=False)
+        codes = codes * len(u) + c
+    groups, first = np.unique(codes, return_index=True)
+    table = long.iloc[first][keys].reset_index(drop=True)
+    return np.searchsorted(groups, codes), table
+
+
+def align_long(long: pd.DataFrame, freq: str = '15min', rule='mean', keys=SERIES_KEYS, time_col: str = 'timestamp',
+               columns=None, start=None, end=None, tz: str = MARKET_TZ, min_coverage: float = 0.0) -> pd.DataFrame:
+    """
+    Long frame (time_col, key columns, value columns) on a fixed UTC grid.
+
+    Args:
+        freq: grid step, a fixed offset ('15min', 'h', ...).
+        rule (str | dict): one of RULES, or a {column: rule} dict.
+        keys: columns identifying a series, missing ones are ignored.
+        start, end: [start, end) window applied to the grid, naive values as UTC.
+        min_coverage (float): fraction of a bin that must be covered by data, else the bin is NaN.
+
+    Returns:
+        pd.DataFrame: time_col (UTC bin start), keys and the value columns, sorted by series and time.
+    """
+    keys = [k for k in keys if k in long.columns]
+    if columns is None:
+        columns = [c for c in long.columns if c not in keys and c != time_col and pd.api.types.is_numeric_dtype(long[c])]
+    rules = {c: rule for c in columns} if isinstance(rule, str) else {c: rule.get(c, 'mean') for c in columns}
+    for c, r in rules.items():
+        if r not in RULES:
+            raise ValueError(f"alignment rule '{r}' for '{c}' not supported.")
+
+    step = _step(freq)
+    ts = to_utc(long[time_col], tz).as_unit('ns').asi8
+    valid = ts != pd.NaT.value
+    groups, table = _group_codes(long, keys)
+    values = long[columns].to_numpy(dtype=float)
+    ts, groups, values = ts[valid], groups[valid], values[valid]
+
+    # sort by series then time, last duplicate wins
+    order = np.lexsort((ts, groups))
+    ts, groups, values = ts[order], groups[order], values[order]
+    last = np.ones(len(ts), dtype=bool)
+    last[:-1] = (groups[1:] != groups[:-1]) | (ts[1:] != ts[:-1])
+    ts, groups, values = ts[last], groups[last], values[last]
+
+    n = len(ts)
+    if n == 0:
+        return pd.DataFrame(columns=[time_col] + keys + columns)
+
+    # span of each sample: shorter gap to a neighbour in the same series, grid step if alone
+    gap = np.diff(ts)
+    same = groups[1:] == groups[:-1]
+    no_gap = np.iinfo(np.int64).max
+    to_next = np.full(n, no_gap)
+    to_next[:-1] = np.where(same, gap, no_gap)
+    to_prev = np.full(n, no_gap)
+    to_prev[1:] = np.where(same, gap, no_gap)
+    span = np.minimum(to_next, to_prev)
+    span[span == no_gap] = step
+
+    # spread each sample over the bins it covers
+    first_bin = ts // step
+    n_bins = np.maximum(1, span // step)
+    sample = np.repeat(np.arange(n), n_bins)
+    offset = np.arange(len(sample)) - np.repeat(np.cumsum(n_bins) - n_bins, n_bins)
+    cell_bin = first_bin[sample] + offset
+    weight = np.minimum(span, step)[sample].astype(float)
+
+    lowest = cell_bin.min()
+    width = cell_bin.max() - lowest + 1
+    key = groups[sample] * width + (cell_bin - lowest)
+    if len(table) * width <= 4 * len(key):
+        # compact grid: index the cells directly instead of sorting
+        occupied = np.bincount(key, minlength=len(table) * width) > 0
+        cells = np.flatnonzero(occupied)
+        inverse = (np.cumsum(occupied) - 1)[key]
+    else:
+        cells, inverse = np.unique(key, return_inverse=True)
+    n_cells = len(cells)
+
+    # next value of the same series, for linear interpolation across a contiguous span
+    has_next = np.zeros(n, dtype=bool)
+    has_next[:-1] = same & (gap == span[:-1])
+    next_values = np.roll(values, -1, axis=0)
+
+    out = {}
+    any_data = np.zeros(n_cells, dtype=bool)
+    for j, column in enumerate(columns):
+        v = values[sample, j]
+        if rules[column] == 'interpolate':
+            fraction = offset * step / span[sample]
+            v = np.where(has_next[sample], v + (next_values[sample, j] - v) * fraction, v)
+        ok = ~np.isnan(v)
+        covered = np.bincount(inverse[ok], weights=weight[ok], minlength=n_cells)
+        if rules[column] == 'sum':
+            result = np.bincount(inverse[ok], weights=(v / n_bins[sample])[ok], minlength=n_cells)
+        else:
+            with np.errstate(invalid='ignore'):
+                result = np.bincount(inverse[ok], weights=(v * weight)[ok], minlength=n_cells) / covered
+        result[covered <= min_coverage * step] = np.nan
+        result[covered == 0] = np.nan
+        any_data |= covered > 0
+        out[column] = result
+
+    cell_groups, cell_bins = np.divmod(cells, width)
+    frame = table.iloc[cell_groups].reset_index(drop=True)
+    frame.insert(0, time_col, pd.to_datetime((cell_bins + lowest) * step, unit='ns', utc=True))
+    for column in columns:
+        frame[column] = out[column]
+    frame = frame[any_data]
+
+    if start is not None:
+        frame = frame[frame[time_col] >= to_utc_timestamp(start)]
+    if end is not None:
+        frame = frame[frame[time_col] < to_utc_timestamp(end)]
+    return frame.reset_index(drop=True)
+
+
+def align_wide(long: pd.DataFrame, freq: str = '15min', rule='mean', key: str = 'zone', column: str = 'value',
+               time_col: str = 'timestamp', start=None, end=None, **kwargs) -> pd.DataFrame:
+    """
+    align_long, then one column per key value on the full grid (missing bins are NaN).
+    """
+    aligned = align_long(long, freq, rule, keys=[key], time_col=time_col, columns=[column], start=start, end=end, **kwargs)
+    wide = aligned.pivot(index=time_col, columns=key, values=column)
+    if len(wide):
+        wide = wide.reindex(pd.date_range(wide.index[0], wide.index[-1], freq=freq, name=time_col))
+    return wide.reindex(columns=list(pd.unique(long[key])))
+
+
+def align_frames(series: dict, freq: str = '15min', rules: dict | None = None, start=None, end=None,
+                 tz: str = MARKET_TZ, **kwargs) -> pd.DataFrame:
+    """
+    Several Series/DataFrames (each with a DatetimeIndex) as columns of one frame on the full grid.
+
+    Args:
+        series (dict): name -> Series or DataFrame, frame columns become 'name|column'.
+        rules (dict): name -> rule, 'mean' when missing.
+    """
+    rules = rules or {}
+    parts = {}
+    for name, data in series.items():
+        frame = data.to_frame(name) if isinstance(data, pd.Series) else data.add_prefix(f"{name}|")
+        index = to_utc(frame.index, tz)
+        for column in frame.columns:
+            parts.setdefault(rules.get(name, 'mean'), []).append(
+                pd.DataFrame({'timestamp': index, 'series': column, 'value': frame[column].to_numpy(dtype=float)}))
+
+    wide = []
+    for rule, frames in parts.items():
+        aligned = align_long(pd.concat(frames, ignore_index=True), freq, rule, keys=['series'], tz=tz, **kwargs)
+        wide.append(aligned.pivot(index='timestamp', columns='series', values='value'))
+    wide = pd.concat(wide, axis=1) if wide else pd.DataFrame()
+    if len(wide):
+        first = to_utc_timestamp(start) if start is not None else wide.index.min()
+        last = to_utc_timestamp(end) - pd.Timedelta(_step(freq)) if end is not None else wide.index.max()
+        wide = wide.reindex(pd.date_range(first, last, freq=freq, name='timestamp'))
+    order = [c for name, data in series.items()
+             for c in ([name] if isinstance(data, pd.Series) else [f"{name}|{col}" for col in data.columns])]
+    return wide.reindex(columns=order)
@@ -0,0 +1,80 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+
+def split_date_range(start: pd.Timestamp, end: pd.Timestamp, freq: str | None = 'MS') -> list[tuple[pd.Timestamp, pd.Timestamp]]:
+    """
+    Splits [start, end) into consecutive windows on `freq` boundaries (e.g. 'MS' monthly, 'YS' yearly).
+    Boundaries are taken in the timezone of `start`, so a month always starts at local midnight
+    whatever the DST offset is.
+    """
+    if not freq or start >= end:
+        return [(start, end)]
+
+    inner = pd.date_range(start, end, freq=freq, tz=start.tz)
+    edges = [start] + [ts for ts in inner if start < ts < end] + [end]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+def stitch_chunks(parts: list, tz=None):
+    """
+    Concatenates chunk results into one series/frame sorted in time.
+
+    Rows are de-duplicated on the UTC instant (last chunk wins), so the overlapping boundary
+    rows go away while the repeated wall-clock hour of the autumn DST switch is kept.
+    Naive indexes are localized to `tz` first.
+    """
+    parts = [p for p in parts if p is not None and len(p)]
+    if not parts:
+        return None
+
+    fixed = []
+    for part in parts:
+        if isinstance(part.index, pd.DatetimeIndex) and part.index.tz is None and tz is not None:
+            part = part.copy()
+            part.index = part.index.tz_localize(tz, ambiguous='infer', nonexistent='shift_forward')
+        fixed.append(part)
+
+    data = pd.concat(fixed)
+    if isinstance(data.index, pd.DatetimeIndex) and data.index.tz is not None:
+        out_tz = data.index.tz
+        data.index = data.index.tz_convert('UTC')
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        data.index = data.index.tz_convert(out_tz)
+    else:
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+    return data
+
+
+def query_chunked(query_func, *args, start: pd.Timestamp, end: pd.Timestamp, chunk_freq: str | None = 'MS',
+                  max_workers: int = 4, skip_errors: tuple = (), **kwargs):
+    """
+    Calls query_func(*args, start=, end=, **kwargs) once per chunk of [start, end), in parallel,
+    and stitches the results.
+
+    Chunks raising one of `skip_errors` (e.g. no data in that month) are dropped; if every chunk
+    fails the last error is raised.
+    """
+    windows = split_date_range(start, end, chunk_freq)
+    if len(windows) == 1:
+        return query_func(*args, start=start, end=end, **kwargs)
+
+    def run(window):
+        try:
+            return query_func(*args, start=window[0], end=window[1], **kwargs), None
+        except skip_errors as e:
+            return None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(windows)))) as pool:
+        results = list(pool.map(run, windows))
+
+    errors = [e for _, e in results if e is not None]
+    data = stitch_chunks([r for r, _ in results], tz=start.tz)
+    if data is None:
+        raise errors[-1] if errors else ValueError("no data returned for any chunk.")
+    if isinstance(data.index, pd.DatetimeIndex) and data.index.tz is not None:
+        data = data[(data.index >= start) & (data.index < end)]
+    if errors:
+        logging.warning(f"{len(errors)} of {len(windows)} chunks returned no data, e.g.: {errors[0]}")
+    return data
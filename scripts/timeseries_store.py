@@ -0,0 +1,261 @@
+import os
+import re
+import sys
+import argparse
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.fetch_manifest import write_atomic
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_STORE_DIR = os.path.join(project_root, "data", "store")
+
+# generation comes back with (production type, aggregated/consumption) columns
+COLUMN_SEP = "|"
+
+
+def _to_frame(data) -> pd.DataFrame:
+    """
+    Series/DataFrame with a DatetimeIndex -> flat frame with a UTC 'timestamp' column first.
+    """
+    if isinstance(data, pd.Series):
+        frame = data.to_frame(name='value')
+    else:
+        frame = data.copy()
+        if isinstance(frame.columns, pd.MultiIndex):
+            frame.columns = [COLUMN_SEP.join(str(level) for level in col if str(level)) for col in frame.columns]
+        else:
+            frame.columns = [str(col) for col in frame.columns]
+
+    index = pd.DatetimeIndex(frame.index)
+    index = index.tz_localize('UTC') if index.tz is None else index.tz_convert('UTC')
+    frame.index = index.as_unit('ns')
+    frame.index.name = 'timestamp'
+    frame = frame.apply(pd.to_numeric, errors='coerce')
+    return frame.reset_index()
+
+
+class TimeSeriesStore:
+    """
+    Parquet store partitioned as root/dataset=<d>/zone=<z>[/neighbour=<n>]/year=<y>/part-0.parquet.
+
+    Every file has a typed UTC 'timestamp' column plus float value columns
+    ('value' for single series). Flows use the neighbour level for the receiving zone.
+
+    Attributes:
+        root (str): store directory.
+        compression (str): parquet codec.
+    """
+    def __init__(self, root: str = DEFAULT_STORE_DIR, compression: str = 'zstd'):
+        self.root = root
+        self.compression = compression
+
+    def series_dir(self, dataset: str, zone: str, neighbour: str | None = None) -> str:
+        parts = [self.root, f"dataset={dataset}", f"zone={zone}"]
+        if neighbour:
+            parts.append(f"neighbour={neighbour}")
+        return os.path.join(*parts)
+
+    def datasets(self) -> list[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(d.split("=", 1)[1] for d in os.listdir(self.root) if d.startswith("dataset="))
+
+    def has(self, dataset: str, zone: str | None = None, neighbour: str | None = None) -> bool:
+        if zone is None:
+            return os.path.isdir(os.path.join(self.root, f"dataset={dataset}"))
+        return os.path.isdir(self.series_dir(dataset, zone, neighbour))
+
+    def series_keys(self, dataset: str) -> list[tuple[str, str | None]]:
+        """
+        (zone, neighbour) of every series in a dataset, neighbour is None outside flows.
+        """
+        path = os.path.join(self.root, f"dataset={dataset}")
+        keys = []
+        for zone_dir in sorted(os.listdir(path)) if os.path.isdir(path) else []:
+            if not zone_dir.startswith("zone="):
+                continue
+            zone = zone_dir.split("=", 1)[1]
+            sub = sorted(d for d in os.listdir(os.path.join(path, zone_dir)) if d.startswith("neighbour="))
+            keys += [(zone, d.split("=", 1)[1]) for d in sub] if sub else [(zone, None)]
+        return keys
+
+    def write(self, dataset: str, zone: str, data, neighbour: str | None = None) -> str:
+        """
+        Upserts a series into its year partitions, new rows win on overlapping timestamps.
+        Each touched partition file is replaced atomically.
+
+        Returns:
+            str: directory of the series.
+        """
+        frame = _to_frame(data)
+        series_dir = self.series_dir(dataset, zone, neighbour)
+
+        for year, part in frame.groupby(frame['timestamp'].dt.year):
+            path = os.path.join(series_dir, f"year={year}", "part-0.parquet")
+            if os.path.exists(path):
+                existing = pq.read_table(path).to_pandas()
+                part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates(subset='timestamp', keep='last')
+            part = part.sort_values('timestamp').reset_index(drop=True)
+
+            table = pa.Table.from_pandas(part, preserve_index=False)
+            write_atomic(path, lambda tmp_path: pq.write_table(table, tmp_path, compression=self.compression))
+        return series_dir
+
+    def _dataset(self, dataset: str):
+        path = os.path.join(self.root, f"dataset={dataset}")
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"dataset '{dataset}' not found in {self.root}")
+
+        data = ds.dataset(path, format='parquet', partitioning='hive')
+        # value columns can differ between files (e.g. a new production type), read with the union
+        schemas = [fragment.physical_schema for fragment in data.get_fragments()]
+        if len({tuple(s.names) for s in schemas}) > 1:
+            schema = pa.unify_schemas(schemas + [data.partitioning.schema])
+            data = ds.dataset(path, format='parquet', partitioning='hive', schema=schema)
+        return data
+
+    def read(self, dataset: str, zones=None, columns=None, start=None, end=None, neighbours=None) -> pd.DataFrame:
+        """
+        Long frame with 'timestamp', the partition columns and the value columns.
+        zone/neighbour/time filters and the column list are pushed down to the parquet scan.
+
+        Args:
+            zones, neighbours (list): partition values to keep, None keeps all.
+            columns (list): value columns to read, None reads all.
+            start, end: [start, end) time window, naive values are taken as UTC.
+        """
+        data = self._dataset(dataset)
+        names = data.schema.names
+
+        predicate = None
+
+        def add(expr):
+            nonlocal predicate
+            predicate = expr if predicate is None else predicate & expr
+
+        if zones is not None:
+            add(ds.field('zone').isin(list(zones)))
+        if neighbours is not None and 'neighbour' in names:
+            add(ds.field('neighbour').isin(list(neighbours)))
+        if start is not None:
+            start = to_utc_timestamp(start)
+            add(ds.field('year') >= start.year)
+            add(ds.field('timestamp') >= pa.scalar(start, type=pa.timestamp('ns', tz='UTC')))
+        if end is not None:
+            end = to_utc_timestamp(end)
+            add(ds.field('year') <= end.year)
+            add(ds.field('timestamp') < pa.scalar(end, type=pa.timestamp('ns', tz='UTC')))
+
+        keys = [k for k in ('zone', 'neighbour') if k in names]
+        selected = None if columns is None else ['timestamp'] + keys + [c for c in columns if c in names]
+
+        frame = data.to_table(columns=selected, filter=predicate).to_pandas()
+        for key in keys:
+            frame[key] = frame[key].astype(str)
+        return frame.drop(columns='year', errors='ignore').sort_values(keys + ['timestamp'], ignore_index=True)
+
+    def read_series(self, dataset: str, zone: str, neighbour: str | None = None, columns=None, start=None, end=None) -> pd.DataFrame:
+        """
+        One series as a frame indexed by UTC timestamp.
+        """
+        frame = self.read(dataset, zones=[zone], columns=columns, start=start, end=end,
+                          neighbours=[neighbour] if neighbour else None)
+        return frame.drop(columns=['zone', 'neighbour'], errors='ignore').set_index('timestamp')
+
+
+def to_utc_timestamp(ts) -> pd.Timestamp:
+    """
+    A date or timestamp as a UTC timestamp, naive values taken as UTC.
+    """
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize('UTC') if ts.tz is None else ts.tz_convert('UTC')
+
+
+# csv file name -> (dataset, zone[, neighbour]), flows are parsed separately
+CSV_PATTERNS = [
+    (re.compile(r"^(?P<zone>.+)_spot_prices\.csv$"), 'prices'),
+    (re.compile(r"^(?P<zone>.+)_generation\.csv$"), 'generation'),
+    (re.compile(r"^(?P<zone>.+)_load\.csv$"), 'load'),
+    (re.compile(r"^prices_(?P<zone>.+)\.csv$"), 'prices'),
+    (re.compile(r"^generation_(?P<zone>.+)\.csv$"), 'generation'),
+    (re.compile(r"^load_(?P<zone>.+)\.csv$"), 'load'),
+    (re.compile(r"^net_position_(?P<zone>.+)\.csv$"), 'net_position'),
+]
+
+
+def read_entsoe_csv(filepath: str):
+    """
+    Reads a csv written by the fetchers, with one or two header rows (generation).
+    """
+    with open(filepath) as f:
+        f.readline()
+        second = f.readline()
+    two_headers = second.startswith(",") or second.split(",")[0] == ""
+    frame = pd.read_csv(filepath, index_col=0, header=[0, 1] if two_headers else 0)
+    frame.index = pd.to_datetime(frame.index, utc=True)
+    if frame.shape[1] == 1 and str(frame.columns[0]) in ('0', 'Unnamed: 1'):
+        return frame.iloc[:, 0]
+    return frame
+
+
+def migrate_csv_tree(csv_root: str, store: TimeSeriesStore) -> pd.DataFrame:
+    """
+    One-shot conversion of the csv tree (e.g. data/processed) into the store.
+
+    Returns:
+        pd.DataFrame: one row per csv with the dataset/zone it went to, or why it was skipped.
+    """
+    # graph_builder reads through this module
+    from scripts.graph_builder import parse_flow_filename
+
+    records = []
+    for dirpath, _, filenames in os.walk(csv_root):
+        for filename in sorted(filenames):
+            if not filename.endswith(".csv"):
+                continue
+            filepath = os.path.join(dirpath, filename)
+
+            target = None
+            if filename.startswith("flows_"):
+                sender, recipient = parse_flow_filename(filename)
+                if sender and recipient:
+                    target = ('flows', sender, recipient)
+            else:
+                for pattern, dataset in CSV_PATTERNS:
+                    match = pattern.match(filename)
+                    if match:
+                        target = (dataset, match.group('zone'), None)
+                        break
+
+            if target is None:
+                logging.warning(f"Skipping {filepath}: not an ENTSO-E series file.")
+                records.append({'file': filepath, 'dataset': None, 'zone': None, 'neighbour': None, 'rows': 0})
+                continue
+
+            dataset, zone, neighbour = target
+            data = read_entsoe_csv(filepath)
+            store.write(dataset, zone, data, neighbour=neighbour)
+            logging.info(f"Migrated {filepath} -> {dataset}/{zone}" + (f"/{neighbour}" if neighbour else ""))
+            records.append({'file': filepath, 'dataset': dataset, 'zone': zone, 'neighbour': neighbour, 'rows': len(data)})
+
+    return pd.DataFrame(records, columns=['file', 'dataset', 'zone', 'neighbour', 'rows'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the processed csv tree into the parquet store.")
+    parser.add_argument("csv_root", nargs="?", default=os.path.join(project_root, "data", "processed"))
+    parser.add_argument("store_root", nargs="?", default=DEFAULT_STORE_DIR)
+    args = parser.parse_args()
+
+    report = migrate_csv_tree(args.csv_root, TimeSeriesStore(args.store_root))
+    logging.info(f"Migrated {report['dataset'].notna().sum()} of {len(report)} csv files into {args.store_root}")
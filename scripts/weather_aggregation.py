@@ -0,0 +1,118 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_WEIGHTS_FILE = os.path.join(project_root, "scripts", "config", "weather_weights.csv")
+
+# weather variable -> weights column used for its national aggregate
+VARIABLE_WEIGHTS = {
+    'temperature': 'population',
+    'max_temperature': 'population',
+    'irradiance': 'pv_capacity_mw',
+    'wind_speed': 'wind_capacity_mw',
+}
+
+# weather variable -> column suffix in the wide output
+COLUMN_SUFFIXES = {
+    'temperature': 'temp',
+    'max_temperature': 'max_temp',
+    'irradiance': 'irradiance',
+    'wind_speed': 'wind',
+}
+
+# prefix of the delta column where it differs from the suffix: the daily max temperature delta
+# has always been temp_delta_{a}_{b}
+DELTA_PREFIXES = {
+    'max_temperature': 'temp',
+}
+
+
+def load_weights(path: str = DEFAULT_WEIGHTS_FILE) -> pd.DataFrame:
+    """
+    weights table indexed by (country, city), one column per weight kind.
+    """
+    return pd.read_csv(path, comment='#').set_index(['country', 'city'])
+
+
+def dense_points(long_df: pd.DataFrame, time_col: str, variables: list) -> tuple[pd.Index, pd.MultiIndex, dict]:
+    """
+    Long data to one dense (time x points) array per variable, duplicates averaged.
+
+    Same result as pivot_table(aggfunc='mean') but with bincount on factorized keys,
+    which stays fast for hundreds of points.
+    """
+    t_codes, times = pd.factorize(long_df[time_col], sort=True)
+    c_codes, countries = pd.factorize(long_df['country'], sort=True)
+    n_codes, names = pd.factorize(long_df['city'], sort=True)
+    p_codes, pairs = pd.factorize(c_codes * len(names) + n_codes, sort=True)
+    points = pd.MultiIndex.from_arrays([countries[pairs // len(names)], names[pairs % len(names)]], names=['country', 'city'])
+    cells = t_codes * len(points) + p_codes
+    size = len(times) * len(points)
+
+    arrays = {}
+    for variable in variables:
+        values = long_df[variable].to_numpy(dtype=float)
+        valid = ~np.isnan(values)
+        sums = np.bincount(cells[valid], weights=values[valid], minlength=size)
+        counts = np.bincount(cells[valid], minlength=size)
+        with np.errstate(invalid='ignore'):
+            arrays[variable] = (sums / counts).reshape(len(times), len(points))
+    return pd.Index(times, name=time_col), points, arrays
+
+
+def weight_matrix(points: pd.MultiIndex, weights: pd.Series) -> tuple[np.ndarray, list]:
+    """
+    (points x countries) matrix, each column sums to one over the points of that country.
+
+    points without a weight get none, a country with no weights at all falls back to equal weights.
+    """
+    countries = list(points.get_level_values('country').unique())
+    member = (points.get_level_values('country').to_numpy()[:, None] == np.array(countries)[None, :]).astype(float)
+
+    w = weights.reindex(points).to_numpy(dtype=float)
+    missing = points[np.isnan(w)]
+    if len(missing):
+        logging.warning(f"No {weights.name} weight for {', '.join(f'{c}/{p}' for c, p in missing)}")
+    W = member * np.nan_to_num(w)[:, None]
+
+    empty = W.sum(axis=0) == 0
+    W[:, empty] = member[:, empty]
+    return W / W.sum(axis=0), countries
+
+
+def weighted_national(long_df: pd.DataFrame, time_col: str, variables: list, weights: pd.DataFrame,
+                      keep_points: bool = True, delta_pair: tuple[str, str] | None = ('HU', 'DE')) -> pd.DataFrame:
+    """
+    Long (country, city, time, variables...) weather data to a wide frame with weighted national series.
+
+    One dense pivot for all variables, then one matrix product per variable. Gaps are handled
+    by renormalising over the points that have a value at each timestamp.
+    Columns are {country}_{city}_{suffix} (if keep_points), {country}_avg_{suffix}
+    and {prefix}_delta_{a}_{b} for the delta_pair (prefix from DELTA_PREFIXES, else the suffix).
+    """
+    times, points, arrays = dense_points(long_df, time_col, variables)
+
+    out = {}
+    for variable in variables:
+        suffix = COLUMN_SUFFIXES.get(variable, variable)
+        W, countries = weight_matrix(points, weights[VARIABLE_WEIGHTS.get(variable, 'population')])
+
+        values = arrays[variable]
+        present = ~np.isnan(values)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            national = (np.where(present, values, 0.0) @ W) / (present @ W)
+
+        if keep_points:
+            for (country, city), column in zip(points, values.T):
+                out[f"{country}_{city}_{suffix}"] = column
+        for country, column in zip(countries, national.T):
+            out[f"{country}_avg_{suffix}"] = column
+        if delta_pair and all(c in countries for c in delta_pair):
+            a, b = delta_pair
+            out[f"{DELTA_PREFIXES.get(variable, suffix)}_delta_{a}_{b}"] = out[f"{a}_avg_{suffix}"] - out[f"{b}_avg_{suffix}"]
+
+    result = pd.DataFrame(out, index=times)
+    return result.reset_index()
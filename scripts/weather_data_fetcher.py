@@ -1,8 +1,20 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+import logging
 import requests
 import pandas as pd
-import logging
-import time
-import os
+from requests.adapters import HTTPAdapter
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.rate_limit import AsyncTokenBucket
+from scripts.fetch_manifest import write_atomic
+from scripts.response_cache import CachingSession, cached_session
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -15,158 +27,246 @@ CITIES = {
 START_DATE = "2025-07-14"
 END_DATE = "2025-07-28"
 
-GEOCODING_API_URL = "https://geocoding-api.open-meteo.com/v1/search"
-HISTORICAL_API_URL = "https://archive-api.open-meteo.com/v1/archive"
+# overridable so the fetcher can run against a local stub
+GEOCODING_API_URL = os.environ.get("OPEN_METEO_GEOCODING_URL", "https://geocoding-api.open-meteo.com/v1/search")
+HISTORICAL_API_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+
+# api variable -> output column
+HOURLY_VARIABLES = {
+    'temperature_2m': 'temperature',
+    'shortwave_radiation': 'irradiance',
+    'wind_speed_100m': 'wind_speed',
+}
+DAILY_VARIABLES = {
+    'temperature_2m_max': 'max_temperature',
+}
+
+LOCATIONS_PER_REQUEST = 20  # the archive api takes comma separated coordinate lists
+MAX_CONNECTIONS = 8
+REQUESTS_PER_SECOND = 5
 
+GEOCODING_CACHE = "data/cache/geocoding.json"
 OUTPUT_HOURLY_CSV = "data/raw/hourly_weather_HU_DE_weeks29_30.csv"
 OUTPUT_DAILY_CSV = "data/raw/daily_max_weather_HU_DE_weeks29_30.csv"
 
-def get_city_coordinates(city_name: str, country_code: str) -> tuple[float, float] | None:
+
+class GeocodingCache:
     """
-   get latitude and longitude for a city using  Open-Meteo Geocoding API.
+    (city, country) -> [lat, lon] kept in a json file, so each city is geocoded once.
     """
-    try:
-        params = {'name': city_name, 'count': 1, 'language': 'en', 'format': 'json'}
-        response = requests.get(GEOCODING_API_URL, params=params, timeout=10)
+    def __init__(self, path: str):
+        self.path = path
+        self._coords = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._coords = json.load(f)
+        self._dirty = False
+
+    @staticmethod
+    def key(city_name: str, country_code: str) -> str:
+        return f"{country_code.upper()}|{city_name}"
+
+    def get(self, city_name: str, country_code: str) -> tuple[float, float] | None:
+        coords = self._coords.get(self.key(city_name, country_code))
+        return tuple(coords) if coords else None
+
+    def set(self, city_name: str, country_code: str, coords: tuple[float, float]):
+        self._coords[self.key(city_name, country_code)] = list(coords)
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(self._coords, f, indent=1, sort_keys=True)
+
+        write_atomic(self.path, write)
+        self._dirty = False
+
+
+class OpenMeteoClient:
+    """
+    Pooled http session driven from asyncio: requests run in worker threads,
+    a semaphore caps open connections and a token bucket paces them.
+    Answers come from the response cache when possible, those skip the token bucket.
+    """
+    def __init__(self, max_connections: int = MAX_CONNECTIONS, requests_per_second: float | None = REQUESTS_PER_SECOND,
+                 session: requests.Session | None = None):
+        self.session = session or cached_session()
+        adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._slots = asyncio.Semaphore(max_connections)
+        self.bucket = AsyncTokenBucket(requests_per_second)
+
+    async def get_json(self, url: str, params: dict, timeout: float = 30):
+        response = None
+        if isinstance(self.session, CachingSession):
+            response = await asyncio.to_thread(self.session.cached_response, url, params)
+        if response is None:
+            async with self._slots:
+                await self.bucket.acquire()
+                response = await asyncio.to_thread(self.session.get, url, params=params, timeout=timeout)
         response.raise_for_status()
-        
-        data = response.json()
-        if 'results' in data:
-            for result in data['results']:
-                if result.get('country_code', '').upper() == country_code.upper():
-                    return result['latitude'], result['longitude']
-        
-        logging.warning(f"Could not find coordinates for {city_name}, {country_code}.")
-        return None
+        return response.json()
+
+
+async def get_city_coordinates(client: OpenMeteoClient, cache: GeocodingCache,
+                               city_name: str, country_code: str) -> tuple[float, float] | None:
+    """
+   get latitude and longitude for a city, from the cache or the Open-Meteo Geocoding API.
+    """
+    coords = cache.get(city_name, country_code)
+    if coords:
+        return coords
+
+    try:
+        params = {'name': city_name, 'count': 10, 'language': 'en', 'format': 'json'}
+        data = await client.get_json(GEOCODING_API_URL, params, timeout=10)
     except requests.exceptions.RequestException as e:
         logging.error(f"Geocoding request failed for {city_name}: {e}")
         return None
 
-def fetch_hourly_weather_data(latitude: float, longitude: float, start_date: str, end_date: str) -> pd.DataFrame | None:
-    
-    try:
-        params = {
-            'latitude': latitude,
-            'longitude': longitude,
-            'start_date': start_date,
-            'end_date': end_date,
-            'hourly': 'temperature_2m',  
-            'timezone': 'Europe/Berlin'  #CET
-        }
-        response = requests.get(HISTORICAL_API_URL, params=params, timeout=30)
-        response.raise_for_status()
+    for result in data.get('results', []):
+        if result.get('country_code', '').upper() == country_code.upper():
+            coords = (result['latitude'], result['longitude'])
+            cache.set(city_name, country_code, coords)
+            return coords
+
+    logging.warning(f"Could not find coordinates for {city_name}, {country_code}.")
+    return None
+
+
+def parse_weather_response(data: dict, country_code: str, city_name: str) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
+    """
+    hourly and daily frames for one location of an archive response.
+    """
+    hourly_df = daily_df = None
+
+    if 'hourly' in data and 'time' in data['hourly']:
+        hourly_df = pd.DataFrame(data['hourly']).rename(columns={'time': 'datetime', **HOURLY_VARIABLES})
+        hourly_df['datetime'] = pd.to_datetime(hourly_df['datetime'])
+        hourly_df.insert(0, 'city', city_name)
+        hourly_df.insert(0, 'country', country_code)
+    else:
+        logging.error(f"No hourly data available for {city_name}, {country_code}")
+
+    if 'daily' in data and 'time' in data['daily']:
+        daily_df = pd.DataFrame(data['daily']).rename(columns={'time': 'date', **DAILY_VARIABLES})
+        daily_df['date'] = pd.to_datetime(daily_df['date'])
+        daily_df.insert(0, 'city', city_name)
+        daily_df.insert(0, 'country', country_code)
+    else:
+        logging.error(f"No daily data available for {city_name}, {country_code}")
 
-        data = response.json()
-        if 'hourly' not in data or 'time' not in data['hourly']:
-            logging.error(f"No hourly data available for lat:{latitude}, lon:{longitude}")
-            return None
-
-        df = pd.DataFrame(data['hourly'])
-        df.rename(columns={
-            'time': 'datetime',
-            'temperature_2m': 'temperature'
-        }, inplace=True)
-        
-        df['datetime'] = pd.to_datetime(df['datetime'])
-        
-        return df
+    return hourly_df, daily_df
 
+
+async def fetch_weather_batch(client: OpenMeteoClient, locations: list, start_date: str, end_date: str) -> list:
+    """
+    Hourly and daily archive data for a batch of (country, city, lat, lon) in one request.
+    """
+    params = {
+        'latitude': ",".join(f"{lat:.4f}" for _, _, lat, _ in locations),
+        'longitude': ",".join(f"{lon:.4f}" for _, _, _, lon in locations),
+        'start_date': start_date,
+        'end_date': end_date,
+        'hourly': ",".join(HOURLY_VARIABLES),
+        'daily': ",".join(DAILY_VARIABLES),
+        'timezone': 'Europe/Berlin'  #CET
+    }
+    names = ", ".join(city for _, city, _, _ in locations)
+    try:
+        data = await client.get_json(HISTORICAL_API_URL, params)
     except requests.exceptions.RequestException as e:
-        logging.error(f"Hourly weather request failed for lat:{latitude}, lon:{longitude}: {e}")
-        return None
-    except (KeyError, TypeError) as e:
-        logging.error(f"Error parsing hourly weather data: {e}")
-        return None
+        logging.error(f"Weather request failed for {names}: {e}")
+        return []
+
+    # a single location comes back as an object, several as a list in request order
+    results = data if isinstance(data, list) else [data]
+    if len(results) != len(locations):
+        logging.error(f"Expected {len(locations)} locations in response for {names}, got {len(results)}")
+        return []
 
-def fetch_daily_max_weather_data(latitude: float, longitude: float, start_date: str, end_date: str) -> pd.DataFrame | None:
+    parsed = []
+    for (country_code, city, _, _), result in zip(locations, results):
+        try:
+            parsed.append(parse_weather_response(result, country_code, city))
+        except (KeyError, TypeError, ValueError) as e:
+            logging.error(f"Error parsing weather data for {city}: {e}")
+    return parsed
+
+
+async def fetch_weather(cities: dict, start_date: str, end_date: str, cache_path: str = GEOCODING_CACHE,
+                        max_connections: int = MAX_CONNECTIONS, requests_per_second: float | None = REQUESTS_PER_SECOND,
+                        locations_per_request: int = LOCATIONS_PER_REQUEST,
+                        session: requests.Session | None = None) -> tuple[pd.DataFrame | None, pd.DataFrame | None]:
     """
-    Fetches historical daily max temperature for a given location and date range.
+    Geocodes all cities, then fetches them in multi-location batches concurrently.
+    The session (default the cached one) is closed at the end, also on errors.
     """
+    client = OpenMeteoClient(max_connections, requests_per_second, session=session)
+    cache = GeocodingCache(cache_path)
+
+    points = [(country_code, city) for country_code, names in cities.items() for city in names]
     try:
-        params = {
-            'latitude': latitude,
-            'longitude': longitude,
-            'start_date': start_date,
-            'end_date': end_date,
-            'daily': 'temperature_2m_max',  # Daily maximum temperature
-            'timezone': 'Europe/Berlin'
-        }
-        response = requests.get(HISTORICAL_API_URL, params=params, timeout=30)
-        response.raise_for_status()
+        try:
+            coords = await asyncio.gather(*(get_city_coordinates(client, cache, city, country_code)
+                                            for country_code, city in points))
+        finally:
+            cache.save()
 
-        data = response.json()
-        if 'daily' not in data or 'time' not in data['daily']:
-            logging.error(f"No daily data available for lat:{latitude}, lon:{longitude}")
-            return None
-
-        df = pd.DataFrame(data['daily'])
-        df.rename(columns={
-            'time': 'date',
-            'temperature_2m_max': 'max_temperature'
-        }, inplace=True)
-        
-        df['date'] = pd.to_datetime(df['date'])
-        
-        return df
+        locations = [(country_code, city, *xy) for (country_code, city), xy in zip(points, coords) if xy]
+        logging.info(f"Geocoded {len(locations)}/{len(points)} locations")
+
+        batches = [locations[i:i + locations_per_request] for i in range(0, len(locations), locations_per_request)]
+        results = await asyncio.gather(*(fetch_weather_batch(client, batch, start_date, end_date) for batch in batches))
+    finally:
+        client.session.close()
+
+    hourly_data = [h for batch in results for h, _ in batch if h is not None and not h.empty]
+    daily_data = [d for batch in results for _, d in batch if d is not None and not d.empty]
+
+    hourly_df = pd.concat(hourly_data, ignore_index=True) if hourly_data else None
+    daily_df = pd.concat(daily_data, ignore_index=True) if daily_data else None
+    return hourly_df, daily_df
 
-    except requests.exceptions.RequestException as e:
-        logging.error(f"Daily weather request failed for lat:{latitude}, lon:{longitude}: {e}")
-        return None
-    except (KeyError, TypeError) as e:
-        logging.error(f"Error parsing daily weather data: {e}")
-        return None
 
 def main():
     """
      funct to fetch h and d data for weeks 29-30 of 2025.
     """
-    logging.info("Starting weather data fetching for weeks 29-30, 2025...")
-    hourly_data = []
-    daily_data = []
-
-    for country_code, cities in CITIES.items():
-        for city in cities:
-            logging.info(f"Processing {city}, {country_code}...")
-            
-            coords = get_city_coordinates(city, country_code)
-            if not coords:
-                continue
-            
-            lat, lon = coords
-            logging.info(f"Coordinates for {city}: Lat={lat:.4f}, Lon={lon:.4f}")
-            
-            hourly_df = fetch_hourly_weather_data(lat, lon, START_DATE, END_DATE)
-            if hourly_df is not None and not hourly_df.empty:
-                hourly_df['city'] = city
-                hourly_df['country'] = country_code
-                hourly_data.append(hourly_df)
-                logging.info(f"Hourly data fetched for {city}: {len(hourly_df)} records")
-            
-            daily_df = fetch_daily_max_weather_data(lat, lon, START_DATE, END_DATE)
-            if daily_df is not None and not daily_df.empty:
-                daily_df['city'] = city
-                daily_df['country'] = country_code
-                daily_data.append(daily_df)
-                logging.info(f"Daily max data fetched for {city}: {len(daily_df)} records")
-            
-            time.sleep(1)
-
-    if hourly_data:
-        final_hourly_df = pd.concat(hourly_data, ignore_index=True)
-        final_hourly_df = final_hourly_df[['country', 'city', 'datetime', 'temperature']]
-        final_hourly_df.to_csv(OUTPUT_HOURLY_CSV, index=False)
-        
-        logging.info(f"Hourly data saved to {OUTPUT_HOURLY_CSV}")
-    
-    if daily_data:
-        final_daily_df = pd.concat(daily_data, ignore_index=True)
-        final_daily_df = final_daily_df[['country', 'city', 'date', 'max_temperature']]
-        final_daily_df.to_csv(OUTPUT_DAILY_CSV, index=False)
-        
-        logging.info(f"Daily max data saved to {OUTPUT_DAILY_CSV}")
-    
-    if not hourly_data and not daily_data:
+    parser = argparse.ArgumentParser(description="Fetch hourly and daily max weather for the CITIES.")
+    parser.add_argument("--start", default=START_DATE, help="first day")
+    parser.add_argument("--end", default=END_DATE, help="last day (inclusive)")
+    args = parser.parse_args()
+
+    logging.info(f"Starting weather data fetching for {args.start} to {args.end}...")
+    hourly_df, daily_df = asyncio.run(fetch_weather(CITIES, args.start, args.end))
+
+    if hourly_df is not None:
+        hourly_df = hourly_df[['country', 'city', 'datetime', *HOURLY_VARIABLES.values()]]
+        os.makedirs(os.path.dirname(OUTPUT_HOURLY_CSV), exist_ok=True)
+        hourly_df.to_csv(OUTPUT_HOURLY_CSV, index=False)
+        logging.info(f"Hourly data saved to {OUTPUT_HOURLY_CSV}: {len(hourly_df)} records")
+
+    if daily_df is not None:
+        daily_df = daily_df[['country', 'city', 'date', *DAILY_VARIABLES.values()]]
+        os.makedirs(os.path.dirname(OUTPUT_DAILY_CSV), exist_ok=True)
+        daily_df.to_csv(OUTPUT_DAILY_CSV, index=False)
+        logging.info(f"Daily max data saved to {OUTPUT_DAILY_CSV}: {len(daily_df)} records")
+
+    if hourly_df is None and daily_df is None:
         logging.warning("No weather data was collected.")
 
+    # non-zero exit so a pipeline run sees the failure and retries it
+    fetched = set() if hourly_df is None else set(zip(hourly_df['country'], hourly_df['city']))
+    missing = [f"{city}, {country}" for country, names in CITIES.items() for city in names if (country, city) not in fetched]
+    if missing:
+        logging.error(f"No hourly weather for {len(missing)} cities: {'; '.join(missing)}")
+        sys.exit(1)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
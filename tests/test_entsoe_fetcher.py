@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import threading
+import pandas as pd
+from entsoe.exceptions import NoMatchingDataError
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.entsoe_fetcher import EntsoeFetcher
+
+START = pd.Timestamp("2025-07-07", tz="Europe/Brussels")
+END = pd.Timestamp("2025-07-08", tz="Europe/Brussels")
+
+
+class SlowClient:
+    """
+    Stand-in for EntsoePandasClient: every query sleeps, and the calls in flight and their
+    start times are recorded.
+    """
+    def __init__(self, latency: float = 0.05, failing=(), empty=()):
+        self.latency = latency
+        self.failing = set(failing)
+        self.empty = set(empty)
+        self.starts = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def _call(self, zone, start, end):
+        with self._lock:
+            self.starts.append(time.monotonic())
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            if zone in self.failing:
+                raise RuntimeError(f"server error for {zone}")
+            if zone in self.empty:
+                raise NoMatchingDataError()
+            index = pd.date_range(start, end, freq="h", inclusive="left")
+            return pd.Series(50.0, index=index)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def query_day_ahead_prices(self, zone, start, end):
+        return self._call(zone, start, end)
+
+    def query_load(self, zone, start, end):
+        return self._call(zone, start, end).to_frame('Actual Load')
+
+
+def make_fetcher(tmp_path, client, **kwargs):
+    return EntsoeFetcher(None, START, END, str(tmp_path), client=client, chunk_freq=None, incremental=False, **kwargs)
+
+
+def test_concurrency_cap_is_never_exceeded(tmp_path):
+    client = SlowClient(latency=0.05)
+    fetcher = make_fetcher(tmp_path, client, max_workers=3)
+    report = fetcher.fetch_batch([('prices', f"Z{i}") for i in range(12)])
+
+    assert (report['status'] == 'ok').all()
+    assert len(client.starts) == 12
+    assert client.max_in_flight <= 3
+    assert client.max_in_flight > 1  # the jobs did overlap
+
+
+def test_requests_per_second_bounds_the_start_rate(tmp_path):
+    client = SlowClient(latency=0.0)
+    rate, workers, jobs = 20.0, 2, 12
+    fetcher = make_fetcher(tmp_path, client, max_workers=workers, requests_per_second=rate)
+    fetcher.fetch_batch([('prices', f"Z{i}") for i in range(jobs)])
+
+    starts = sorted(client.starts)
+    # a burst of `workers` requests, then at most `rate` per second
+    assert starts[-1] - starts[0] >= (jobs - workers) / rate * 0.9
+    for i, t in enumerate(starts):
+        later = [s for s in starts[i:] if s - t <= 0.2]
+        assert len(later) <= workers + 0.2 * rate + 1
+
+
+def test_seconds_are_reported_per_job(tmp_path):
+    client = SlowClient(latency=0.05)
+    report = make_fetcher(tmp_path, client, max_workers=2).fetch_batch([('prices', 'HU'), ('load', 'AT')])
+
+    assert list(report.columns) == ['data_type', 'zone', 'neighbour', 'status', 'seconds', 'rows', 'path', 'error']
+    assert (report['seconds'] >= 0.05).all()
+    assert (report['rows'] == 24).all()
+
+
+def test_failures_and_empty_jobs_are_reported_without_aborting_the_batch(tmp_path):
+    client = SlowClient(latency=0.01, failing={'BAD'}, empty={'EMPTY'})
+    report = make_fetcher(tmp_path, client, max_workers=2).fetch_batch(
+        [('prices', 'HU'), ('prices', 'BAD'), ('prices', 'EMPTY'), ('load', 'AT')])
+    status = report.set_index('zone')['status']
+
+    assert len(report) == 4
+    assert status['HU'] == 'ok' and status['AT'] == 'ok'
+    assert status['BAD'] == 'failed' and status['EMPTY'] == 'empty'
+    failed = report[report['status'] != 'ok']
+    assert (failed['rows'] == 0).all()
+    assert failed['path'].isna().all()
+    assert failed.set_index('zone').loc['BAD', 'error'] == "server error for BAD"
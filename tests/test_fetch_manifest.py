@@ -0,0 +1,64 @@
+import os
+import sys
+import pandas as pd
+import pytest
+from entsoe.exceptions import NoMatchingDataError
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.fetch_manifest import FetchManifest, fetch_missing
+from scripts.time_chunks import query_chunked
+
+START = pd.Timestamp("2025-01-01", tz="Europe/Brussels")
+END = pd.Timestamp("2025-04-01", tz="Europe/Brussels")
+KEY = FetchManifest.key('prices', 'HU')
+
+
+def hourly_query(empty_months=()):
+    """
+    Monthly chunks of hourly values, NoMatchingDataError for the months in empty_months.
+    """
+    def query(start, end):
+        if start.month in empty_months:
+            raise NoMatchingDataError()
+        return pd.Series(1.0, index=pd.date_range(start, end, freq="h", inclusive="left"))
+    return query
+
+
+def fetch(manifest, query, start=START, end=END):
+    def chunked(gap_start, gap_end):
+        return query_chunked(query, start=gap_start, end=gap_end, chunk_freq='MS',
+                             skip_errors=(NoMatchingDataError,))
+    return fetch_missing(manifest, KEY, chunked, lambda data: None, start, end, chunk_freq='MS')
+
+
+def test_empty_middle_chunk_stays_missing(tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    fetch(manifest, hourly_query(empty_months={2}))
+
+    feb = pd.Timestamp("2025-02-01", tz="Europe/Brussels"), pd.Timestamp("2025-03-01", tz="Europe/Brussels")
+    assert manifest.missing(KEY, START, END) == [feb]
+
+    # the next run asks for February only and then has everything
+    rows = fetch(FetchManifest(str(tmp_path / "manifest.json")), hourly_query())
+    assert rows == 28 * 24
+    assert FetchManifest(str(tmp_path / "manifest.json")).missing(KEY, START, END) == []
+
+
+def test_series_ending_early_is_recorded_up_to_its_last_row(tmp_path):
+    def query(start, end):
+        return hourly_query()(start, min(end, pd.Timestamp("2025-03-15", tz="Europe/Brussels")))
+
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    fetch(manifest, query)
+
+    assert manifest.missing(KEY, START, END) == [(pd.Timestamp("2025-03-15", tz="Europe/Brussels"), END)]
+
+
+def test_all_chunks_empty_records_nothing(tmp_path):
+    manifest = FetchManifest(str(tmp_path / "manifest.json"))
+    with pytest.raises(NoMatchingDataError):
+        fetch(manifest, hourly_query(empty_months={1, 2, 3}))
+    assert manifest.missing(KEY, START, END) == [(START, END)]
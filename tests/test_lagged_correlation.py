@@ -0,0 +1,61 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.lagged_correlation import lagged_correlation
+
+INDEX = pd.date_range("2025-01-01", periods=24 * 60, freq="h", tz="UTC")
+
+
+def random_walk(seed: int) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.cumsum(rng.normal(size=len(INDEX))), index=INDEX)
+
+
+def lag_at(result: dict, lag: int) -> int:
+    return int(np.flatnonzero(result['lags'] == lag)[0])
+
+
+def test_series_masked_against_itself_correlates_one_at_lag_zero():
+    series = random_walk(0)
+    masked = series.copy()
+    masked.iloc[24 * 10:24 * 24] = np.nan  # two weeks missing
+    result = lagged_correlation(series.to_frame('spread'), masked.to_frame('driver'), max_lag=24, deseasonalize=False)
+
+    assert result['overlap'][0, 0, lag_at(result, 0)] == len(INDEX) - 24 * 14
+    assert np.isclose(result['corr'][0, 0, lag_at(result, 0)], 1.0)
+
+
+def test_leading_driver_peaks_at_its_lead():
+    driver = random_walk(1)
+    spread = driver.shift(6) + np.random.default_rng(2).normal(scale=0.1, size=len(INDEX))
+    result = lagged_correlation(spread.to_frame('spread'), driver.to_frame('driver'), max_lag=12, deseasonalize=False)
+
+    corr = result['corr'][0, 0]
+    assert result['lags'][np.nanargmax(corr)] == 6
+    assert np.nanmax(corr) <= 1.0
+
+
+def test_matches_pearson_over_the_overlap():
+    spread, driver = random_walk(3), random_walk(4)
+    spread.iloc[100:400] = np.nan
+    driver.iloc[900:1000] = np.nan
+    result = lagged_correlation(spread.to_frame('spread'), driver.to_frame('driver'), max_lag=5, deseasonalize=False)
+
+    for lag in (-5, 0, 3):
+        expected = spread.corr(driver.shift(lag))
+        assert np.isclose(result['corr'][0, 0, lag_at(result, lag)], expected)
+
+
+def test_short_overlap_is_nan():
+    spread, driver = random_walk(5), random_walk(6)
+    driver.iloc[24 * 3:] = np.nan
+    result = lagged_correlation(spread.to_frame('spread'), driver.to_frame('driver'), max_lag=2,
+                                deseasonalize=False, min_overlap=24 * 7)
+
+    assert np.isnan(result['corr']).all()
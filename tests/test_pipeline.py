@@ -0,0 +1,74 @@
+import os
+import sys
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts.pipeline import run_pipeline
+
+# fails while a 'fail' file sits next to it, else writes its output
+FETCH = """import os, sys
+here = os.path.dirname(os.path.abspath(__file__))
+if os.path.exists(os.path.join(here, 'fail')):
+    print('every job failed')
+    sys.exit(1)
+with open(os.path.join(here, 'raw.txt'), 'w') as f:
+    f.write(sys.argv[1])
+"""
+PROCESS = """import os, sys
+here = os.path.dirname(os.path.abspath(__file__))
+with open(os.path.join(here, 'raw.txt')) as f, open(os.path.join(here, 'processed.txt'), 'w') as out:
+    out.write(f.read().upper())
+"""
+
+
+def make_stages(tmp_path):
+    (tmp_path / "fetch.py").write_text(FETCH)
+    (tmp_path / "process.py").write_text(PROCESS)
+    return {
+        'fetch': {'script': str(tmp_path / "fetch.py"), 'args': ['{since}'], 'inputs': [],
+                  'outputs': [str(tmp_path / "raw.txt")]},
+        'process': {'script': str(tmp_path / "process.py"), 'inputs': [str(tmp_path / "raw.txt")],
+                    'outputs': [str(tmp_path / "processed.txt")]},
+    }
+
+
+def run(stages, tmp_path, **kwargs):
+    report = run_pipeline(stages, since='2025-07-07', until='2025-08-04', state_dir=str(tmp_path / "state"), **kwargs)
+    return dict(zip(report['stage'], report['status']))
+
+
+def test_failed_stage_is_retried_and_blocks_its_dependants(tmp_path):
+    stages = make_stages(tmp_path)
+    (tmp_path / "fail").write_text("")
+
+    assert run(stages, tmp_path) == {'fetch': 'failed', 'process': 'blocked'}
+    # same window and inputs: the failure is not taken as up to date
+    assert run(stages, tmp_path) == {'fetch': 'failed', 'process': 'blocked'}
+
+    (tmp_path / "fail").unlink()
+    assert run(stages, tmp_path) == {'fetch': 'ran', 'process': 'ran'}
+    assert (tmp_path / "processed.txt").read_text() == "2025-07-07"
+    assert run(stages, tmp_path) == {'fetch': 'skipped', 'process': 'skipped'}
+
+
+def test_failure_after_a_success_is_retried(tmp_path):
+    stages = make_stages(tmp_path)
+    assert run(stages, tmp_path) == {'fetch': 'ran', 'process': 'ran'}
+
+    (tmp_path / "fail").write_text("")
+    assert run(stages, tmp_path, force=True) == {'fetch': 'failed', 'process': 'blocked'}
+    (tmp_path / "fail").unlink()
+    assert run(stages, tmp_path)['fetch'] == 'ran'
+
+
+def test_dry_run_marks_dependants_of_a_stage_that_would_run(tmp_path):
+    stages = make_stages(tmp_path)
+    assert run(stages, tmp_path) == {'fetch': 'ran', 'process': 'ran'}
+    assert run(stages, tmp_path, dry_run=True) == {'fetch': 'skipped', 'process': 'skipped'}
+
+    # a new window reruns fetch, and so process once fetch has written
+    stages['fetch']['args'] = ['{until}']
+    assert run(stages, tmp_path, dry_run=True) == {'fetch': 'would run', 'process': 'would run'}
+    assert run(stages, tmp_path) == {'fetch': 'ran', 'process': 'ran'}
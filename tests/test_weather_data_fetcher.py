@@ -0,0 +1,106 @@
+import os
+import sys
+import asyncio
+import threading
+import pytest
+import requests
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from scripts import weather_data_fetcher
+from scripts.weather_data_fetcher import fetch_weather
+
+CITIES = {"DE": ["Berlin", "Munich", "Frankfurt"], "HU": ["Budapest", "Szeged"]}
+GEOCODING_URL = "http://stub/v1/search"
+ARCHIVE_URL = "http://stub/v1/archive"
+
+
+class StubResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class StubSession(requests.Session):
+    """
+    Answers the geocoding and archive requests of the fetcher without a network, and records them.
+    """
+    def __init__(self, fail_archive: bool = False):
+        super().__init__()
+        self.fail_archive = fail_archive
+        self.calls = []
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, **kwargs):
+        with self._lock:
+            self.calls.append((url, dict(params)))
+        if url == GEOCODING_URL:
+            lat = 40 + len(params['name'])
+            return StubResponse({'results': [{'country_code': 'XX', 'latitude': 0, 'longitude': 0},
+                                             {'country_code': 'DE' if params['name'] in CITIES['DE'] else 'HU',
+                                              'latitude': lat, 'longitude': 10.0}]})
+        if self.fail_archive:
+            raise RuntimeError("archive down")
+        days = ['2025-07-14', '2025-07-15']
+        hours = [f"{day}T{h:02d}:00" for day in days for h in range(24)]
+        location = {'hourly': {'time': hours, 'temperature_2m': [20.0] * 48, 'shortwave_radiation': [100.0] * 48,
+                               'wind_speed_100m': [5.0] * 48},
+                    'daily': {'time': days, 'temperature_2m_max': [25.0, 26.0]}}
+        n = len(params['latitude'].split(","))
+        return StubResponse(location if n == 1 else [location] * n)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+
+@pytest.fixture(autouse=True)
+def stub_urls(monkeypatch):
+    monkeypatch.setattr(weather_data_fetcher, "GEOCODING_API_URL", GEOCODING_URL)
+    monkeypatch.setattr(weather_data_fetcher, "HISTORICAL_API_URL", ARCHIVE_URL)
+
+
+def run(session, cache_path, **kwargs):
+    return asyncio.run(fetch_weather(CITIES, '2025-07-14', '2025-07-15', cache_path=str(cache_path),
+                                     requests_per_second=None, session=session, **kwargs))
+
+
+def test_locations_are_fetched_in_batches(tmp_path):
+    session = StubSession()
+    hourly, daily = run(session, tmp_path / "geocoding.json", locations_per_request=2)
+
+    archive = [params for url, params in session.calls if url == ARCHIVE_URL]
+    assert sorted(len(params['latitude'].split(",")) for params in archive) == [1, 2, 2]
+    assert len(hourly) == 5 * 48 and len(daily) == 5 * 2
+    assert set(hourly['city']) == {city for cities in CITIES.values() for city in cities}
+    assert hourly.groupby('city')['country'].first()['Szeged'] == 'HU'
+    assert session.closed
+
+
+def test_geocoding_cache_hit_skips_the_geocoding_api(tmp_path):
+    cache_path = tmp_path / "geocoding.json"
+    first = StubSession()
+    run(first, cache_path)
+    assert sum(url == GEOCODING_URL for url, _ in first.calls) == 5
+
+    second = StubSession()
+    hourly, _ = run(second, cache_path)
+    assert not any(url == GEOCODING_URL for url, _ in second.calls)
+    assert len(hourly) == 5 * 48
+
+
+def test_session_is_closed_when_a_batch_raises(tmp_path):
+    session = StubSession(fail_archive=True)
+    with pytest.raises(RuntimeError):
+        run(session, tmp_path / "geocoding.json")
+    assert session.closed
+    # the coordinates found before the failure are kept
+    assert (tmp_path / "geocoding.json").exists()